@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - API HTTP local e linha de comando
+# ============================================================
+# Usa as mesmas regras do app (servicos.py): validação, IDs,
+# permissões e log. Operações em lote rodam numa única gravação.
+#
+#   python api.py serve --porta 8502
+#   python api.py listar vagas --filtro Status=Aberta
+#   python api.py atualizar vagas --ids 1 2 3 --campo Status=Fechada
+#   python api.py importar candidatos planilha.xlsx
+#   python api.py relatorios --clientes 3 7 --formato csv --saida reuniao.zip
+#   python api.py alteracoes --desde 1200 --formato csv --tabela vagas
+#
+# Autenticação: HTTP Basic (API) ou --usuario + variável PARMA_SENHA (CLI).
+# Com vários inquilinos (inquilinos/<nome>/), o login da API é
+# "usuario@inquilino" e a CLI recebe --inquilino (ou PARMA_INQUILINO).
+# ============================================================
+
+import argparse
+import base64
+import getpass
+import io
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import historico
+import indices
+import integridade
+import relatorios
+import salarios
+import servicos
+from servicos import INQUILINO_PADRAO, TABELAS, ErroValidacao, ErroPermissao
+
+PORTA_PADRAO = 8502
+
+_guarda_migracao = threading.Lock()
+_migrados = set()  # inquilinos com ClienteID/VagaID já conferidos neste processo
+
+def _preparar_inquilino():
+    # Uma vez por processo e inquilino: linhas gravadas antes de ClienteID/VagaID (idempotente)
+    with _guarda_migracao:
+        if servicos.inquilino_atual() not in _migrados:
+            servicos.migrar_chaves()
+            _migrados.add(servicos.inquilino_atual())
+
+# ==============================
+# Consultas
+# ==============================
+
+def listar(nome, usuario, filtros=None, de=None, ate=None):
+    # `de`/`ate` (DD/MM/AAAA): período na coluna de data da tabela (indices.COLUNAS_DATA)
+    if nome not in TABELAS:
+        raise ErroValidacao(f"Tabela desconhecida: {nome}")
+    servicos.verificar_permissao(usuario, nome, "consultar")
+    df = servicos.carregar_tabela(nome)
+    for col, valor in (filtros or {}).items():
+        if col not in df.columns:
+            raise ErroValidacao(f"Coluna desconhecida para {nome}: {col}")
+        df = df[df[col] == valor]
+    df = indices.filtrar_periodo(nome, df, de, ate)
+    return df.to_dict(orient="records")
+
+def _com_recrutador(nome, registros):
+    # Vagas/candidatos sem Recrutador recebem o de menor carga (distribuídos entre os itens do lote)
+    sem = [r for r in registros if isinstance(r, dict) and not str(r.get("Recrutador", "")).strip()]
+    if nome in indices.PESO_NOVO_ITEM and sem:
+        for reg, recrutador in zip(sem, indices.sugerir_recrutadores(nome, len(sem))):
+            reg["Recrutador"] = recrutador
+    return registros
+
+def _exportar_alteracoes(saida, registros, formato, tabela):
+    # `saida` binária (conexão ou stdout): o texto sai em UTF-8 sem fechar o fluxo
+    texto = io.TextIOWrapper(saida, encoding="utf-8", newline="")
+    try:
+        return servicos.exportar_alteracoes(texto, registros, formato, tabela)
+    finally:
+        texto.flush()
+        texto.detach()
+
+def _registros(df):
+    # JSON sem NaN: estágios sem passagens ficam com null
+    return json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+
+# ============================================================
+# API HTTP
+# ============================================================
+
+class Arquivo:
+    """Resposta binária gravada direto na conexão por `escrever(saida)` (sem Content-Length)."""
+    def __init__(self, nome, tipo, escrever):
+        self.nome = nome
+        self.tipo = tipo
+        self.escrever = escrever
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "ParmaAPI/1.0"
+
+    # ---------- utilitários ----------
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _enviar_arquivo(self, status, arquivo):
+        # HTTP/1.0: o fim do corpo é o fim da conexão
+        self.send_response(status)
+        self.send_header("Content-Type", arquivo.tipo)
+        self.send_header("Content-Disposition", f'attachment; filename="{arquivo.nome}"')
+        self.end_headers()
+        arquivo.escrever(self.wfile)
+        self.close_connection = True
+
+    def _credenciais(self):
+        # (usuário, senha, inquilino) do login "usuario[@inquilino]:senha", ou None
+        cabecalho = self.headers.get("Authorization", "")
+        if not cabecalho.startswith("Basic "):
+            return None
+        try:
+            usuario, _, senha = base64.b64decode(cabecalho[6:]).decode("utf-8").partition(":")
+        except ValueError:
+            return None
+        usuario, _, inquilino = usuario.partition("@")
+        return usuario, senha, inquilino
+
+    def _pedir_login(self):
+        self.send_response(401)
+        self.send_header("WWW-Authenticate", 'Basic realm="Parma"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _corpo(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(tamanho) if tamanho else b""
+
+    def _json(self):
+        corpo = self._corpo()
+        try:
+            return json.loads(corpo or b"{}")
+        except json.JSONDecodeError:
+            raise ErroValidacao("Corpo da requisição não é um JSON válido.")
+
+    def _despachar(self, metodo):
+        login = self._credenciais()
+        if not login:
+            self._pedir_login()
+            return
+        usuario, senha, inquilino = login
+        try:
+            inquilino = servicos.conferir_inquilino(inquilino)
+        except ErroValidacao as e:
+            self._responder(400, {"erro": str(e)})
+            return
+        # O usuário precisa estar liberado no inquilino (ver servicos.autenticar)
+        if not servicos.autenticar(usuario, senha, inquilino):
+            self._pedir_login()
+            return
+        # Dados, cache e arquivos gerados são os do inquilino até o fim da resposta
+        with servicos.no_inquilino(inquilino):
+            _preparar_inquilino()
+            self._despachar_no_inquilino(metodo, usuario)
+
+    def _despachar_no_inquilino(self, metodo, usuario):
+        url = urlparse(self.path)
+        partes = [p for p in url.path.split("/") if p]
+        try:
+            status, corpo = self._rota(metodo, partes, dict(parse_qsl(url.query)), usuario)
+        except ErroValidacao as e:
+            status, corpo = 400, {"erro": str(e)}
+        except ErroPermissao as e:
+            status, corpo = 403, {"erro": str(e)}
+        if isinstance(corpo, Arquivo):
+            self._enviar_arquivo(status, corpo)
+        else:
+            self._responder(status, corpo)
+
+    # ---------- rotas ----------
+    def _rota(self, metodo, partes, query, usuario):
+        if partes == ["versao"] and metodo == "GET":
+            return 200, {"versao": [list(c) if c else None for c in servicos.versao_dados()]}
+
+        if partes == ["comercial", "mover"] and metodo == "POST":
+            dados = self._json()
+            return 200, {"movidos": servicos.mover_status_comercial(dados.get("ids", []), dados.get("direcao", "+"), usuario)}
+
+        if partes == ["lixeira"] and metodo == "GET":
+            if usuario != "admin":
+                raise ErroPermissao("Somente o admin pode consultar a lixeira.")
+            return 200, {"lotes": servicos.listar_lixeira()}
+        if len(partes) == 3 and partes[0] == "lixeira" and partes[2] == "restaurar" and metodo == "POST":
+            return 200, {"restaurados": servicos.restaurar_lote(partes[1], usuario)}
+
+        if partes and partes[0] == "integridade":
+            if usuario != "admin":
+                raise ErroPermissao("Somente o admin pode consultar e corrigir a integridade dos dados.")
+            if partes == ["integridade"] and metodo == "GET":
+                return 200, {"problemas": _registros(integridade.verificar())}
+            if partes == ["integridade", "corrigir"] and metodo == "POST":
+                dados = self._json()
+                return 200, {"corrigidos": integridade.corrigir(dados.get("correcao", ""), usuario, dados.get("tabela"))}
+
+        if len(partes) == 2 and partes[0] == "backup" and metodo == "GET":
+            if usuario != "admin":
+                raise ErroPermissao("Somente o admin pode consultar os backups.")
+            if "em" not in query:
+                return 200, {"bases": servicos.listar_backups(partes[1])}
+            return 200, {"registros": servicos.tabela_em(partes[1], query["em"]).to_dict(orient="records")}
+
+        if len(partes) == 2 and partes[0] == "indicadores" and metodo == "GET":
+            if "logs" not in servicos.permissoes(usuario):
+                raise ErroPermissao("Sem permissão para consultar os indicadores.")
+            try:
+                dias = int(query.get("dias", 30))
+            except ValueError:
+                raise ErroValidacao("Parâmetro 'dias' deve ser um número inteiro.")
+            return 200, {
+                "tempo_em_estagio": _registros(historico.tempo_em_estagio(partes[1])),
+                "velocidade": _registros(historico.velocidade_funil(partes[1], dias)),
+            }
+
+        if partes == ["recrutadores", "carga"] and metodo == "GET":
+            servicos.verificar_permissao(usuario, "vagas", "consultar")
+            return 200, {"carga": _registros(indices.carga_recrutadores())}
+
+        if partes == ["vagas", "paradas"] and metodo == "GET":
+            servicos.verificar_permissao(usuario, "vagas", "consultar")
+            try:
+                dias = int(query.get("dias", indices.VAGAS_PARADAS_DIAS))
+                limite = int(query.get("limite", indices.VAGAS_PARADAS_LIMITE))
+            except ValueError:
+                raise ErroValidacao("dias e limite devem ser números inteiros.")
+            paradas, total = indices.vagas_paradas(dias, limite)
+            return 200, {"total": total, "vagas": _registros(paradas)}
+
+        if partes == ["relatorios", "clientes"] and metodo == "GET":
+            # Validação e separação por cliente antes do cabeçalho; o zip é gerado já na conexão
+            formato = relatorios.conferir_formato(query.get("formato", "xlsx"))
+            ids = [i for i in query.get("ids", "").split(",") if i.strip()]
+            pacotes = relatorios.preparar_relatorios(usuario, ids, query.get("dias", relatorios.RELATORIO_DIAS_ATIVIDADE))
+            nome = f"relatorios_clientes_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
+            return 200, Arquivo(nome, "application/zip", lambda saida: relatorios.gravar_relatorios(saida, pacotes, formato))
+
+        if partes == ["alteracoes", "ultima"] and metodo == "GET":
+            servicos.tabelas_alteracoes(usuario)
+            return 200, {"seq": servicos.ultima_sequencia()}
+        if partes == ["alteracoes"] and metodo == "GET":
+            # Feed a partir de ?desde= (a última seq já sincronizada); validado antes do cabeçalho
+            formato = servicos.conferir_formato_alteracoes(query.get("formato", "jsonl"))
+            tabelas = servicos.tabelas_alteracoes(usuario, [t for t in query.get("tabela", "").split(",") if t.strip()])
+            registros = servicos.alteracoes_desde(usuario, query.get("desde", 0), tabelas, query.get("limite"))
+            tabela = tabelas[0] if len(tabelas) == 1 else None
+            tipo = "application/x-ndjson" if formato == "jsonl" else "text/csv; charset=utf-8"
+            return 200, Arquivo(f"alteracoes.{formato}", tipo,
+                                lambda saida: _exportar_alteracoes(saida, registros, formato, tabela))
+
+        if partes == ["salarios"] and metodo == "GET":
+            servicos.verificar_permissao(usuario, "vagas", "consultar")
+            por = query.get("por", "cargo")
+            return 200, {
+                "faixas": _registros(salarios.faixas_salariais(por).reset_index()),
+                "fora_da_faixa": _registros(salarios.vagas_fora_da_faixa(por)),
+            }
+
+        if len(partes) < 2 or partes[0] != "tabelas" or partes[1] not in TABELAS:
+            return 404, {"erro": "Rota não encontrada."}
+        nome = partes[1]
+
+        if len(partes) == 3 and partes[2] == "importar" and metodo == "POST":
+            df_upload = servicos.ler_planilha(io.BytesIO(self._corpo()), "upload.csv")
+            importados = servicos.importar_registros(nome, df_upload, usuario, "api")
+            return 200, {"importados": importados, "problemas_integridade": len(integridade.verificar())}
+        if len(partes) != 2:
+            return 404, {"erro": "Rota não encontrada."}
+
+        if metodo == "GET":
+            return 200, {"registros": listar(nome, usuario, query, query.pop("de", None), query.pop("ate", None))}
+        dados = self._json()
+        if metodo == "POST":
+            return 201, {"ids": servicos.criar_registros(nome, _com_recrutador(nome, dados.get("registros", [])), usuario)}
+        if metodo == "PATCH":
+            return 200, {"alterados": servicos.atualizar_registros(nome, dados.get("ids", []), dados.get("campos", {}), usuario)}
+        if metodo == "DELETE":
+            return 200, servicos.excluir_registros(nome, dados.get("ids", []), usuario)
+        return 405, {"erro": "Método não suportado."}
+
+    def do_GET(self):
+        self._despachar("GET")
+
+    def do_POST(self):
+        self._despachar("POST")
+
+    def do_PATCH(self):
+        self._despachar("PATCH")
+
+    def do_DELETE(self):
+        self._despachar("DELETE")
+
+def servir(porta=PORTA_PADRAO, host="127.0.0.1"):
+    servicos.iniciar_observador()
+    servidor = ThreadingHTTPServer((host, porta), ApiHandler)
+    print(f"API Parma em http://{host}:{porta} (Ctrl+C para sair)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+# ============================================================
+# Linha de comando
+# ============================================================
+
+def _pares(itens):
+    campos = {}
+    for item in itens or []:
+        col, sep, valor = item.partition("=")
+        if not sep:
+            raise ErroValidacao(f"Use Coluna=Valor (recebido: {item})")
+        campos[col] = valor
+    return campos
+
+def _usuario_cli(args):
+    senha = os.environ.get("PARMA_SENHA") or getpass.getpass(f"Senha de {args.usuario}: ")
+    if not servicos.autenticar(args.usuario, senha, servicos.inquilino_atual()):
+        raise ErroPermissao("Usuário ou senha inválidos, ou usuário sem acesso ao inquilino.")
+    return args.usuario
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API e linha de comando da Parma Consultoria")
+    parser.add_argument("--usuario", default="admin")
+    parser.add_argument("--inquilino", default=os.environ.get("PARMA_INQUILINO", INQUILINO_PADRAO),
+                        help="Empresa/unidade (subpasta de inquilinos/); vazio = pasta principal")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("serve", help="Sobe a API HTTP local")
+    p.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    p.add_argument("--host", default="127.0.0.1")
+
+    p = sub.add_parser("listar", help="Lista registros (JSON)")
+    p.add_argument("tabela", choices=list(TABELAS))
+    p.add_argument("--filtro", nargs="*", metavar="COL=VALOR")
+    p.add_argument("--de", help="Data inicial (DD/MM/AAAA) na coluna de data da tabela")
+    p.add_argument("--ate", help="Data final (DD/MM/AAAA), inclusive")
+
+    p = sub.add_parser("criar", help="Cria registros a partir de um JSON (lista de objetos)")
+    p.add_argument("tabela", choices=list(TABELAS))
+    p.add_argument("arquivo", help="arquivo .json ou '-' para stdin")
+
+    p = sub.add_parser("atualizar", help="Aplica os mesmos campos a vários IDs")
+    p.add_argument("tabela", choices=list(TABELAS))
+    p.add_argument("--ids", nargs="+", required=True)
+    p.add_argument("--campo", nargs="+", required=True, metavar="COL=VALOR")
+
+    p = sub.add_parser("excluir", help="Envia registros para a lixeira (com cascata)")
+    p.add_argument("tabela", choices=list(TABELAS))
+    p.add_argument("--ids", nargs="+", required=True)
+
+    p = sub.add_parser("restaurar", help="Restaura um lote da lixeira")
+    p.add_argument("lote")
+
+    p = sub.add_parser("importar", help="Importa uma planilha CSV/XLSX")
+    p.add_argument("tabela", choices=list(TABELAS))
+    p.add_argument("arquivo")
+
+    p = sub.add_parser("relatorios", help="Gera os relatórios por cliente num .zip")
+    p.add_argument("--clientes", nargs="*", metavar="ID", help="IDs dos clientes (padrão: todos)")
+    p.add_argument("--formato", choices=relatorios.RELATORIO_FORMATOS, default="xlsx")
+    p.add_argument("--dias", type=int, default=relatorios.RELATORIO_DIAS_ATIVIDADE, help="dias de atividade no log")
+    p.add_argument("--saida", default="relatorios_clientes.zip")
+
+    p = sub.add_parser("alteracoes", help="Exporta as alterações posteriores a uma sequência (sincronização)")
+    p.add_argument("--desde", type=int, default=0, help="última sequência já sincronizada")
+    p.add_argument("--formato", choices=servicos.ALTERACOES_FORMATOS, default="jsonl")
+    p.add_argument("--tabela", nargs="*", choices=list(TABELAS), help="padrão: todas as que o usuário consulta")
+    p.add_argument("--limite", type=int)
+    p.add_argument("--saida", help="arquivo de saída (padrão: tela)")
+
+    p = sub.add_parser("mover", help="Move registros comerciais no funil")
+    p.add_argument("direcao", choices=["+", "-"])
+    p.add_argument("--ids", nargs="+", required=True)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.comando == "serve":
+            servir(args.porta, args.host)  # o inquilino vem de cada requisição
+            return 0
+        servicos.usar_inquilino(args.inquilino)
+        usuario = _usuario_cli(args)
+        _preparar_inquilino()
+        if args.comando == "listar":
+            resultado = listar(args.tabela, usuario, _pares(args.filtro), args.de, args.ate)
+        elif args.comando == "criar":
+            if args.arquivo == "-":
+                registros = json.load(sys.stdin)
+            else:
+                with open(args.arquivo, encoding="utf-8") as f:
+                    registros = json.load(f)
+            resultado = {"ids": servicos.criar_registros(args.tabela, _com_recrutador(args.tabela, registros), usuario)}
+        elif args.comando == "atualizar":
+            resultado = {"alterados": servicos.atualizar_registros(args.tabela, args.ids, _pares(args.campo), usuario)}
+        elif args.comando == "excluir":
+            resultado = servicos.excluir_registros(args.tabela, args.ids, usuario)
+        elif args.comando == "restaurar":
+            resultado = {"restaurados": servicos.restaurar_lote(args.lote, usuario)}
+        elif args.comando == "relatorios":
+            quantidade = relatorios.gerar_relatorios(args.saida, usuario, args.clientes, args.formato, args.dias)
+            resultado = {"clientes": quantidade, "arquivo": args.saida}
+        elif args.comando == "alteracoes":
+            tabelas = servicos.tabelas_alteracoes(usuario, args.tabela)
+            registros = servicos.alteracoes_desde(usuario, args.desde, tabelas, args.limite)
+            tabela = tabelas[0] if len(tabelas) == 1 else None
+            if not args.saida:
+                # O feed vai para a tela; o resumo, para stderr
+                quantidade, ultima = _exportar_alteracoes(sys.stdout.buffer, registros, args.formato, tabela)
+                print(json.dumps({"alteracoes": quantidade, "ultima": ultima}), file=sys.stderr)
+                return 0
+            with open(args.saida, "w", encoding="utf-8", newline="") as f:
+                quantidade, ultima = servicos.exportar_alteracoes(f, registros, args.formato, tabela)
+            resultado = {"alteracoes": quantidade, "ultima": ultima, "arquivo": args.saida}
+        elif args.comando == "importar":
+            df_upload = servicos.ler_planilha(args.arquivo, args.arquivo)
+            resultado = {"importados": servicos.importar_registros(args.tabela, df_upload, usuario, os.path.basename(args.arquivo)),
+                         "problemas_integridade": len(integridade.verificar())}
+        else:
+            resultado = {"movidos": servicos.mover_status_comercial(args.ids, args.direcao, usuario)}
+    except (ErroValidacao, ErroPermissao) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
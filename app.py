@@ -15,154 +15,50 @@
 #     • Ações dentro do card
 #     • Indicador de quantidade por coluna (Status (n))
 #     • Cards colapsáveis (mostrar/ocultar detalhes)
-# - Links de logo/imagens preservados.
+# - CSS (e o logo, quando em static/logo-parma.png) servidos localmente de static/ (app/static).
 # ============================================================
 
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
 import pandas as pd
-from datetime import date, datetime
+import html
 import os
+import threading
+import time
+from datetime import date, datetime
+
+import historico
+import indices
+import integridade
+import relatorios
+import salarios
+import servicos
+import tarefas
+import visoes
+from servicos import (
+    CLIENTES_CSV, VAGAS_CSV, CANDIDATOS_CSV, COMERCIAL_CSV,
+    CLIENTES_COLS, VAGAS_COLS, CANDIDATOS_COLS, COMERCIAL_COLS,
+    COLUNA_VERSAO, ARQUIVO_IDADE_DIAS, LIXEIRA_RETENCAO_DIAS, DESFAZER_SEGUNDOS,
+    VAGAS_STATUS_OPCOES, CANDIDATOS_STATUS_OPCOES, COMERCIAL_STATUS_OPCOES, VAGAS_STATUS_INDISPONIVEIS,
+    USUARIOS_COMERCIAL, RECRUTADORES_PADRAO,
+    CAMPOS_VAGAS_ADMIN, CAMPOS_CANDIDATOS_ADMIN, CAMPOS_COMERCIAL_ADMIN, TABELAS, STATUS_OPCOES,
+    ErroValidacao, ErroPermissao,
+    carregar_tabela, registro_atual, versao_dados, carregar_logs, carregar_arquivados,
+)
 
 # ==============================
 # Configuração inicial da página
 # ==============================
 st.set_page_config(page_title="Parma Consultoria", layout="wide")
 
-# ==============================
-# Arquivos CSV
-# ==============================
-CLIENTES_CSV = "clientes.csv"
-VAGAS_CSV = "vagas.csv"
-CANDIDATOS_CSV = "candidatos.csv"
-LOGS_CSV = "logs.csv"
-COMERCIAL_CSV = "comercial.csv"  # Comercial
-
-# ==============================
-# Colunas esperadas
-# ==============================
-CLIENTES_COLS = ["ID", "Data", "Cliente", "Nome", "Cidade", "UF", "Telefone", "E-mail"]
-VAGAS_COLS = [
-    "ID",
-    "Cliente",
-    "Status",
-    "Data de Abertura",
-    "Cargo",
-    "Recrutador",
-    "Atualização",
-    "Salário 1",
-    "Salário 2"
-]
-CANDIDATOS_COLS = ["ID", "Cliente", "Cargo", "Nome", "Telefone", "Recrutador", "Status", "Data de Início"]
-
-# Comercial (com 'Produto' e 'Telefone' na ordem definida)
-COMERCIAL_COLS = [
-    "ID",
-    "Data",
-    "Empresa",
-    "Cidade",
-    "UF",
-    "Nome",
-    "Telefone",
-    "E-mail",
-    "Produto",
-    "Canal",
-    "Status"
-]
-
-LOGS_COLS = ["DataHora", "Usuario", "Aba", "Acao", "ItemID", "Campo", "ValorAnterior", "ValorNovo", "Detalhe"]
-
-# Opções de status da aba Comercial (ordem do funil)
-COMERCIAL_STATUS_OPCOES = [
-    "Prospect",
-    "Lead Qualificado",
-    "Reunião",
-    "Proposta Enviada",
-    "Negócio Fechado",
-    "Declinado"
-]
-
-# ==============================
-# Usuários e permissões
-# ==============================
-USUARIOS = {
-    "admin":   {"senha": "Parma!123@", "permissoes": ["menu", "clientes", "vagas", "candidatos", "logs", "comercial"]},
-    "andre":   {"senha": "And!123@",   "permissoes": ["clientes", "vagas", "candidatos", "comercial"]},
-    "lorrayne":{"senha": "Lrn!123@",   "permissoes": ["vagas", "candidatos"]},
-    "nikole":  {"senha": "Nkl!123@",   "permissoes": ["vagas", "candidatos"]},
-    "julia":   {"senha": "Jla!123@",   "permissoes": ["vagas", "candidatos"]},
-    "ricardo": {"senha": "Rcd!123@",   "permissoes": ["clientes", "vagas", "candidatos", "comercial"]},
-}
-
-# ==============================
-# Recrutadores padrão
-# ==============================
-RECRUTADORES_PADRAO = ["Lorrayne", "Kaline", "Nikole", "Leila", "Julia"]
-
-# ============================================================
-# Utilidades de CSV / Persistência
-# ============================================================
-
-def load_csv(path, expected_cols):
-    if os.path.exists(path):
-        try:
-            df = pd.read_csv(path, dtype=str)
-            df = df.fillna("")
-            for col in expected_cols:
-                if col not in df.columns:
-                    df[col] = ""
-            df = df[expected_cols]
-            if "ID" in df.columns:
-                df["ID"] = df["ID"].astype(str)
-            return df
-        except Exception:
-            return pd.DataFrame(columns=expected_cols)
-    else:
-        return pd.DataFrame(columns=expected_cols)
-
-def save_csv(df, path):
-    df.to_csv(path, index=False, encoding="utf-8")
-
-def next_id(df, id_col="ID"):
-    if df is None or df.empty:
-        return 1
-    try:
-        vals = pd.to_numeric(df[id_col], errors="coerce").fillna(0).astype(int)
-        return int(vals.max()) + 1
-    except Exception:
-        return 1
+# Intervalo do heartbeat (ping automático do admin)
+HEARTBEAT_SEGUNDOS = 30
 
-def ensure_logs_file():
-    if not os.path.exists(LOGS_CSV):
-        save_csv(pd.DataFrame(columns=LOGS_COLS), LOGS_CSV)
+# Linhas por página nas tabelas de cadastro
+LINHAS_POR_PAGINA = 100
 
-def registrar_log(aba, acao, item_id="", campo="", valor_anterior="", valor_novo="", detalhe=""):
-    ensure_logs_file()
-    datahora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    usuario = st.session_state.get("usuario", "admin")
-    log_df = pd.DataFrame([{
-        "DataHora": datahora,
-        "Usuario": usuario,
-        "Aba": aba,
-        "Acao": acao,
-        "ItemID": str(item_id) if item_id is not None else "",
-        "Campo": campo,
-        "ValorAnterior": "" if valor_anterior is None else str(valor_anterior),
-        "ValorNovo": "" if valor_novo is None else str(valor_novo),
-        "Detalhe": detalhe
-    }])
-    if os.path.exists(LOGS_CSV):
-        atual = pd.read_csv(LOGS_CSV, dtype=str).fillna("")
-        log_df = pd.concat([atual, log_df], ignore_index=True)
-    save_csv(log_df, LOGS_CSV)
-
-def carregar_logs():
-    ensure_logs_file()
-    try:
-        df = pd.read_csv(LOGS_CSV, dtype=str)
-        return df.fillna("")
-    except Exception:
-        return pd.DataFrame(columns=LOGS_COLS)
+# Exportações maiores que isso viram tarefa em segundo plano; painel de tarefas atualiza a cada N s
+LIMITE_EXPORTACAO_DIRETA = 5000
+TAREFAS_POLL_SEGUNDOS = 2
 
 # ============================================================
 # Estado inicial (Session State)
@@ -172,302 +68,329 @@ for key, default in [
     ("page", "login"),
     ("logged_in", False),
     ("usuario", ""),
+    ("inquilino", None),
     ("permissoes", []),
     ("edit_mode", None),
     ("edit_record", {}),
     ("confirm_delete", {"df_name": None, "row_id": None}),
+    ("edit_conflito", None),
+    ("ultima_exclusao", None),
 ]:
     if key not in st.session_state:
         st.session_state[key] = default
 
-# Carregamento inicial dos DataFrames em sessão
-for df_key, csv_path, cols in [
-    ("clientes_df", CLIENTES_CSV, CLIENTES_COLS),
-    ("vagas_df", VAGAS_CSV, VAGAS_COLS),
-    ("candidatos_df", CANDIDATOS_CSV, CANDIDATOS_COLS),
-    ("comercial_df", COMERCIAL_CSV, COMERCIAL_COLS),
-]:
-    if df_key not in st.session_state:
-        st.session_state[df_key] = load_csv(csv_path, cols)
+@st.cache_resource(show_spinner=False)
+def observar_dados():
+    # Uma vez por processo: gravações de outros workers/api.py invalidam só as tabelas afetadas neste cache
+    return servicos.iniciar_observador()
 
-# ============================================================
-# Estilos (CSS) — mantido e ampliado com melhorias do Comercial
-# ============================================================
+observar_dados()
 
-st.markdown(
-    """
-    <style>
-    :root {
-        --parma-blue-dark: #004488;
-        --parma-blue-medium: #0066AA;
-        --parma-blue-light: #E0F2F7;
-        --parma-text-dark: #333333;
-        --kanban-bg: #f8fafc;
-        --kanban-col-bg: #f1f5f9;
-        --kanban-card-bg: #ffffff;
-    }
-    div.stButton > button {
-        background-color: var(--parma-blue-dark) !important;
-        color: white !important;
-        border-radius: 8px;
-        height: 2.5em;
-        font-size: 14px;
-        font-weight: bold;
-        border: none;
-    }
-    div.stButton > button:hover {
-        background-color: var(--parma-blue-medium) !important;
-    }
-    .parma-header {
-        background-color: var(--parma-blue-light);
-        padding:6px;
-        font-weight:bold;
-        color:var(--parma-text-dark);
-        border-radius:4px;
-        text-align:center;
-        font-size:13px;
-        border-bottom: 1px solid #cfcfcf;
-    }
-    .parma-cell {
-        padding:6px;
-        text-align:center;
-        color:var(--parma-text-dark);
-        font-size:13px;
-        background-color: white;
-        border: none;
-    }
-    .stDataFrame div[data-testid="stStyledTable"] table {
-        font-size: 13px !important;
-        border-collapse: collapse !important;
-    }
-    .stDataFrame div[data-testid="stStyledTable"] thead th {
-        font-size: 13px !important;
-        background-color: #f6f9fb !important;
-        padding: 6px !important;
-        border-bottom: 1px solid #cfcfcf !important;
-        border-left: none !important;
-        border-right: none !important;
-    }
-    .stDataFrame div[data-testid="stStyledTable"] td {
-        padding: 6px !important;
-        border: none !important;
-    }
-    hr.parma-hr {
-        border: none;
-        border-bottom: 1px solid #e0e0e0;
-        margin: 0;
-    }
-    .streamlit-expanderHeader, .stMarkdown, .stText {
-        font-size:13px !important;
-    }
+@st.cache_resource(show_spinner=False)
+def agendar_tarefas():
+    # Uma vez por processo: candidata-se a rodar as tarefas periódicas (um processo só roda)
+    tarefas.iniciar_agendador()
+    return True
 
-    /* ===== Kanban base ===== */
-    .kanban-col {
-        background: var(--kanban-col-bg);
-        border-radius: 12px;
-        padding: 10px;
-        border: 1px solid #e5e7eb;
-        min-height: 120px;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.03);
-    }
-    .kanban-col-title {
-        font-weight: 800;
-        text-align: center;
-        margin-bottom: 10px;
-        font-size: 13px;
-        color: #0f172a;
-        letter-spacing: .2px;
-    }
-    .kanban-card {
-        background: var(--kanban-card-bg);
-        border: 1px solid #e2e8f0;
-        border-radius: 12px;
-        padding: 14px;            /* mais respiro */
-        margin-bottom: 10px;
-        box-shadow: 0 2px 6px rgba(2,6,23,0.06);
-        font-size: 12.5px;
-        color: #334155;
-    }
-    .kanban-card strong {
-        color: #0f172a;
-        font-weight: 700;
-        font-size: 13px;         /* título levemente maior */
-    }
-    .kanban-sub {
-        color: #475569;
-        font-weight: 600;
-    }
-    .kanban-meta {
-        font-size: 11px;
-        color: #94a3b8;
-        margin-bottom: 6px;      /* ID e Data no topo em cinza claro */
-    }
-    .badge-status {
-        display: inline-block;
-        padding: 3px 8px;
-        border-radius: 999px;
-        font-size: 11px;
-        font-weight: 700;
-        color: #ffffff;
-        margin: 4px 0 8px 0;     /* espaçamento vertical do badge */
-    }
-    .kanban-actions {
-        display: flex;
-        gap: 6px;
-        margin-top: 10px;
-        justify-content: space-between;
-    }
-    .kanban-actions .action-btn {
-        background: #fff;
-        border: 1px solid #e2e8f0;
-        border-radius: 8px;
-        padding: 6px 10px;
-        font-size: 12px;
-        line-height: 1;
-        box-shadow: 0 1px 1px rgba(0,0,0,0.02);
-        cursor: pointer;
-    }
-    .kanban-actions .action-btn:hover {
-        background: #f8fafc;
-    }
+agendar_tarefas()
 
-    /* ===== Cores por coluna (data-status) ===== */
-    .kanban-col[data-status="Prospect"] { background: #fef9c3; }
-    .kanban-col[data-status="Lead Qualificado"] { background: #d1fae5; }
-    .kanban-col[data-status="Reunião"] { background: #e0f2fe; }
-    .kanban-col[data-status="Proposta Enviada"] { background: #fce7f3; }
-    .kanban-col[data-status="Negócio Fechado"] { background: #dcfce7; }
-    .kanban-col[data-status="Declinado"] { background: #fee2e2; }
-
-    /* ===== Botões pequenos específicos do kanban ===== */
-    /* (mantém a compatibilidade com os botões globais do app) */
-    .kanban-actions button {
-        height: 2.0em !important;
-        font-size: 12px !important;
-        padding: 0.1rem 0.5rem !important;
-        border-radius: 6px !important;
-        min-width: 0 !important;
-        border: 1px solid #e2e8f0 !important;
-        background: #ffffff !important;
-        color: #0f172a !important;
-    }
-    .kanban-actions button:hover {
-        background: #f8fafc !important;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+@st.cache_resource(show_spinner=False)
+def migrar_dados(inquilino):
+    # Uma vez por processo e inquilino: preenche ClienteID/VagaID das linhas antigas (não faz nada se já migrado)
+    return servicos.migrar_chaves()
+
+def usar_inquilino_da_sessao():
+    # Cada execução do script (ou de um fragmento) pode rodar numa thread diferente:
+    # o inquilino escolhido no login vale para esta execução
+    if not st.session_state.logged_in:
+        return
+    try:
+        inquilino = servicos.usar_inquilino(st.session_state.inquilino)
+    except ErroValidacao:
+        # Diretório do inquilino removido (ou unidades criadas) com a sessão aberta: novo login
+        st.session_state.update(logged_in=False, page="login", inquilino=None)
+        return
+    migrar_dados(inquilino)
+
+usar_inquilino_da_sessao()
+
+# Dados e regras ficam em servicos.py (compartilhados com api.py); o app só registra quem está logado
+def registrar_log(aba, acao, item_id="", campo="", valor_anterior="", valor_novo="", detalhe=""):
+    servicos.registrar_log(aba, acao, item_id, campo, valor_anterior, valor_novo, detalhe,
+                           usuario=st.session_state.get("usuario", "admin"))
+
+# ============================================================
+# Arquivos estáticos (logo e CSS) — servidos em app/static
+# ============================================================
+# Requer server.enableStaticServing (ver .streamlit/config.toml). O navegador
+# guarda os arquivos em cache (ETag/Last-Modified), então cada rerun manda só
+# a referência, e não o CSS e o logo inteiros.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+CSS_ARQUIVO = "parma.css"
+# O logo oficial vai em static/logo-parma.png; enquanto o arquivo não estiver
+# no repositório, continua vindo do site da empresa, como antes
+LOGO_ARQUIVO = "logo-parma.png"
+LOGO_URL_ORIGEM = "https://parmaconsultoria.com.br/wp-content/uploads/2023/10/logo-parma-1.png"
+
+def _preparar_em_segundo_plano():
+    servicos.aquecer_dependencias()
+
+@st.cache_resource(show_spinner=False)
+def preparar_estaticos():
+    # Uma vez por processo: CSS lido do disco, logo local localizado; dependências opcionais fora do caminho da requisição
+    threading.Thread(target=_preparar_em_segundo_plano, daemon=True).start()
+    css_path = os.path.join(STATIC_DIR, CSS_ARQUIVO)
+    with open(css_path, encoding="utf-8") as f:
+        css = f.read()
+    logo_path = os.path.join(STATIC_DIR, LOGO_ARQUIVO)
+    logo = logo_path if os.path.exists(logo_path) else None
+    return {"css": css, "css_versao": int(os.path.getmtime(css_path)), "logo": logo}
+
+def injetar_css():
+    estaticos = preparar_estaticos()
+    if st.get_option("server.enableStaticServing"):
+        # ?v= muda quando o CSS é editado, invalidando o cache do navegador
+        st.markdown(f"<link rel='stylesheet' href='app/static/{CSS_ARQUIVO}?v={estaticos['css_versao']}'>", unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{estaticos['css']}</style>", unsafe_allow_html=True)
+
+def mostrar_logo(largura):
+    logo = preparar_estaticos()["logo"]
+    if logo is None:
+        st.image(LOGO_URL_ORIGEM, width=largura)
+    elif st.get_option("server.enableStaticServing"):
+        st.markdown(f"<img src='app/static/{LOGO_ARQUIVO}' width='{largura}' alt='Parma Consultoria'>", unsafe_allow_html=True)
+    else:
+        st.image(logo, width=largura)
+
+injetar_css()
 
 # ============================================================
 # Componentes auxiliares
 # ============================================================
 
 def download_button(df, filename, label="⬇️ Baixar CSV"):
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button(label=label, data=csv, file_name=filename, mime="text/csv", use_container_width=True)
+    if len(df) <= LIMITE_EXPORTACAO_DIRETA:
+        csv = df.to_csv(index=False).encode("utf-8")
+        st.download_button(label=label, data=csv, file_name=filename, mime="text/csv", use_container_width=True)
+        return
+    # Listas grandes: o CSV é gerado por uma tarefa e baixado pelo painel de tarefas
+    if st.button(f"{label} ({len(df)} linhas — gerar em segundo plano)", key=f"exportar_{filename}", use_container_width=True):
+        tarefas.submeter("exportar_csv", st.session_state.usuario, f"Exportar {filename}", df=df, nome_arquivo=filename)
+        st.rerun()
+
+def seletor_recrutador(key):
+    """
+    Recrutador já posicionado no de menor carga (indices.carga_recrutadores); cada opção
+    mostra a carga atual. Depois de salvar, apague `key` para a próxima sugestão.
+    """
+    carga = indices.carga_recrutadores().set_index("Recrutador")["Carga"]
+    return st.selectbox(
+        "Recrutador *", options=RECRUTADORES_PADRAO, index=RECRUTADORES_PADRAO.index(carga.index[0]), key=key,
+        format_func=lambda r: f"{r} (carga {carga.get(r, 0):g})",
+        help="Sugestão: menor carga entre vagas em andamento, candidatos pendentes e ações nos últimos dias.",
+    )
+
+def seletor_com_busca(rotulo, indice, key, placeholder=""):
+    """
+    Busca + seletor: o selectbox recebe só os melhores resultados do índice de rótulos
+    (indices.py) para o texto digitado, não a tabela inteira. Devolve o ID escolhido ou None.
+    """
+    termo = st.text_input(f"🔎 Buscar {rotulo.rstrip(' *').lower()}", key=f"{key}_busca", placeholder=placeholder)
+    opcoes = dict(indices.buscar_rotulos(indice, termo))
+    if not opcoes:
+        st.caption("Nenhum resultado para a busca.")
+        return None
+    if st.session_state.get(key) not in opcoes:
+        st.session_state.pop(key, None)
+    return st.selectbox(rotulo, options=list(opcoes), format_func=opcoes.get, key=key)
+
+def importar_em_segundo_plano(tabela, arquivo):
+    # O uploader mantém o arquivo entre reruns: cada upload é enviado uma única vez
+    chave = f"upload_enviado_{tabela}"
+    if st.session_state.get(chave) == arquivo.file_id:
+        st.caption("Arquivo enviado para importação — acompanhe no painel de tarefas.")
+        return
+    caminho = tarefas.caminho_temporario(arquivo.name)
+    with open(caminho, "wb") as f:
+        f.write(arquivo.getbuffer())
+    tarefas.submeter("importar", st.session_state.usuario, f"Importar {tabela} ({arquivo.name})",
+                     tabela=tabela, caminho=caminho, nome_arquivo=arquivo.name)
+    st.session_state[chave] = arquivo.file_id
+    st.rerun()
+
+def _filtrar_igualdade(df, filtros):
+    for col, valor in filtros.items():
+        if valor != "(todos)":
+            df = df[df[col] == valor]
+    return df
+
+def filtro_periodo(tabela):
+    """Seletor de período na coluna de data da tabela; devolve (início, fim), None = sem limite."""
+    periodo = st.date_input(
+        f"📅 Período ({indices.COLUNAS_DATA[tabela]})", value=(), min_value=date(2000, 1, 1),
+        format="DD/MM/YYYY", key=f"periodo_{tabela}",
+    )
+    # Só a primeira data escolhida (seleção em andamento): a partir dela
+    return (periodo[0] if periodo else None), (periodo[1] if len(periodo) > 1 else None)
+
+def _filtrar_comercial(df, empresa, status, cidade):
+    if empresa:
+        df = df[df["Empresa"].str.contains(empresa, case=False, na=False)]
+    if status != "(todos)":
+        df = df[df["Status"] == status]
+    if cidade:
+        df = df[df["Cidade"].str.contains(cidade, case=False, na=False)]
+    return df
+
+# ==============================
+# Visões salvas (filtros nomeados por usuário)
+# ==============================
+
+SEM_VISAO = "(nenhuma)"
+FILTROS_CADASTRO = ["Cliente", "Cargo", "Recrutador", "Status"]
+FILTROS_COMERCIAL = ["Empresa", "Status", "Cidade"]
+
+def _chave_filtro(tabela, col):
+    return f"filtro_{tabela}_{col}"
+
+def _filtro_vazio(tabela, col):
+    return "" if col in visoes.COLUNAS_BUSCA.get(tabela, []) else visoes.TODOS
+
+def _manter_opcao(chave, opcoes):
+    # Valor vindo de uma visão que não existe mais nas opções (ex.: cargo de outro cliente) volta para "(todos)"
+    if st.session_state.get(chave, opcoes[0]) not in opcoes:
+        st.session_state[chave] = opcoes[0]
+
+def _aplicar_visao(tabela, colunas):
+    # Callback do seletor: leva os filtros da visão para os widgets da tela
+    nome = st.session_state[f"visao_{tabela}"]
+    filtros = visoes.listar(st.session_state.usuario, tabela).get(nome, {})
+    for col in colunas:
+        st.session_state[_chave_filtro(tabela, col)] = filtros.get(col, _filtro_vazio(tabela, col))
+
+def _salvar_visao(tabela, colunas):
+    nome = st.session_state.get(f"visao_nome_{tabela}", "").strip()
+    filtros = {col: st.session_state.get(_chave_filtro(tabela, col), "") for col in colunas}
+    try:
+        visoes.salvar(st.session_state.usuario, tabela, nome, filtros)
+    except (ErroValidacao, ErroPermissao) as e:
+        st.session_state[f"visao_erro_{tabela}"] = str(e)
+        return
+    st.session_state[f"visao_{tabela}"] = nome
+    st.session_state[f"visao_nome_{tabela}"] = ""
+
+def _excluir_visao(tabela):
+    visoes.excluir(st.session_state.usuario, tabela, st.session_state[f"visao_{tabela}"])
+    st.session_state[f"visao_{tabela}"] = SEM_VISAO
+
+def barra_visoes(tabela, colunas):
+    """Seletor das visões salvas do usuário + salvar os filtros atuais como visão."""
+    chave = f"visao_{tabela}"
+    nomes = [SEM_VISAO] + list(visoes.listar(st.session_state.usuario, tabela))
+    _manter_opcao(chave, nomes)
+    col_sel, col_excluir, col_nome, col_salvar = st.columns([3, 1, 3, 1], vertical_alignment="bottom")
+    with col_sel:
+        st.selectbox("⭐ Visões salvas", nomes, key=chave, on_change=_aplicar_visao, args=(tabela, colunas))
+    with col_excluir:
+        st.button("🗑️ Excluir visão", key=f"visao_excluir_{tabela}", disabled=st.session_state[chave] == SEM_VISAO,
+                  on_click=_excluir_visao, args=(tabela,), use_container_width=True)
+    with col_nome:
+        st.text_input("Salvar filtros atuais como", key=f"visao_nome_{tabela}", placeholder="Ex.: Minhas vagas abertas")
+    with col_salvar:
+        st.button("💾 Salvar visão", key=f"visao_salvar_{tabela}", on_click=_salvar_visao, args=(tabela, colunas),
+                  use_container_width=True)
+    erro = st.session_state.pop(f"visao_erro_{tabela}", None)
+    if erro:
+        st.warning(f"⚠️ {erro}")
+
+def visao_ativa(tabela, filtros):
+    """Nome da visão selecionada se os filtros da tela ainda são os dela (senão None: filtra normalmente)."""
+    nome = st.session_state.get(f"visao_{tabela}", SEM_VISAO)
+    if nome == SEM_VISAO:
+        return None
+    salvos = visoes.listar(st.session_state.usuario, tabela).get(nome)
+    atuais = {c: v for c, v in filtros.items() if v not in ("", visoes.TODOS)}
+    return nome if salvos == atuais else None
+
+def mostrar_arquivados(tabela, cols, filtrar):
+    # Registros do arquivo morto: somente leitura, fora do fluxo de edição/exclusão.
+    # O arquivo só é lido quando o usuário liga o toggle.
+    if not st.toggle("🗄️ Incluir arquivados", key=f"incluir_arquivados_{tabela}"):
+        return
+    df_arquivado = filtrar(carregar_arquivados(tabela, cols))
+    if df_arquivado.empty:
+        st.info("Nenhum registro arquivado para os filtros selecionados.")
+        return
+    st.caption(f"{len(df_arquivado)} registro(s) arquivado(s) — somente leitura.")
+    st.dataframe(df_arquivado, hide_index=True, use_container_width=True)
+
+def _html_tabela(df, cols):
+    # Tabela inteira num único elemento (um st.markdown), com valores escapados
+    cabecalho = "".join(f"<th class='parma-header'>{html.escape(str(c))}</th>" for c in cols)
+    valores = df[cols].fillna("").astype(str).map(html.escape)
+    linhas = "".join(
+        "<tr>" + "".join(f"<td class='parma-cell'>{v}</td>" for v in linha) + "</tr>"
+        for linha in valores.itertuples(index=False, name=None)
+    )
+    return f"<div class='parma-table-wrap'><table class='parma-table'><thead><tr>{cabecalho}</tr></thead><tbody>{linhas}</tbody></table></div>"
 
 def show_table(df, cols, df_name, csv_path):
     if df is None or df.empty:
         st.info("Nenhum registro para exibir.")
         return
 
-    col_widths = [1] * len(cols) + [0.5, 0.5]
-    header_cols = st.columns(col_widths)
-    for i, c in enumerate(cols):
-        header_cols[i].markdown(f"<div class='parma-header'>{c}</div>", unsafe_allow_html=True)
-    header_cols[-2].markdown("<div class='parma-header'>Editar</div>", unsafe_allow_html=True)
-    header_cols[-1].markdown("<div class='parma-header'>Excluir</div>", unsafe_allow_html=True)
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    for _, row in df.iterrows():
-        row_cols = st.columns(col_widths)
-        for i, c in enumerate(cols):
-            value = row.get(c, "")
-            if pd.isna(value):
-                value = ""
-            row_cols[i].markdown(f"<div class='parma-cell'>{value}</div>", unsafe_allow_html=True)
-        with row_cols[-2]:
-            if st.button("✏️", key=f"edit_{df_name}_{str(row.get('ID',''))}", use_container_width=True):
-                st.session_state.edit_mode = df_name
-                st.session_state.edit_record = row.to_dict()
-                st.rerun()
-        with row_cols[-1]:
-            if df_name in ["clientes_df", "vagas_df", "candidatos_df"] and st.session_state.usuario != "admin":
-                st.markdown("<div class='parma-cell'>—</div>", unsafe_allow_html=True)  # mostra traço
-            else:
-                if st.button("🗑️", key=f"del_{df_name}_{str(row.get('ID',''))}", use_container_width=True):
-                    st.session_state.confirm_delete = {"df_name": df_name, "row_id": row["ID"]}
-                    st.rerun()
-
-        st.markdown("<hr class='parma-hr' />", unsafe_allow_html=True)
+    # Paginação: só a página visível vai para o navegador
+    total = len(df)
+    paginas = max(1, -(-total // LINHAS_POR_PAGINA))
+    pagina = 1
+    if paginas > 1:
+        col_pag, col_info = st.columns([1, 4])
+        pagina = col_pag.number_input("Página", min_value=1, max_value=paginas, value=1, step=1, key=f"pagina_{df_name}")
+    inicio = (pagina - 1) * LINHAS_POR_PAGINA
+    df_pagina = df.iloc[inicio:inicio + LINHAS_POR_PAGINA]
+    if paginas > 1:
+        col_info.caption(f"Mostrando {inicio + 1}–{inicio + len(df_pagina)} de {total} registros")
+
+    st.markdown(_html_tabela(df_pagina, cols), unsafe_allow_html=True)
+
+    # Ações da linha: um seletor de registro + Editar/Excluir
+    rotulo_col = cols[1] if len(cols) > 1 else cols[0]
+    rotulos = dict(zip(df_pagina["ID"].astype(str), df_pagina[rotulo_col].fillna("").astype(str)))
+    pode_excluir = not (df_name in ["clientes_df", "vagas_df", "candidatos_df"] and st.session_state.usuario != "admin")
+    col_sel, col_edit, col_del = st.columns([4, 1, 1])
+    with col_sel:
+        row_id = st.selectbox(
+            "Registro", options=list(rotulos), index=None, key=f"sel_{df_name}",
+            format_func=lambda i: f"{i} - {rotulos.get(i, '')}",
+            placeholder="Selecione um registro para editar ou excluir...", label_visibility="collapsed",
+        )
+    with col_edit:
+        if st.button("✏️ Editar", key=f"edit_{df_name}", disabled=row_id is None, use_container_width=True):
+            st.session_state.edit_mode = df_name
+            st.session_state.edit_record = registro_atual(_nome_tabela(df_name), row_id)
+            st.session_state.edit_conflito = None
+            st.rerun()
+    with col_del:
+        if st.button("🗑️ Excluir", key=f"del_{df_name}", disabled=row_id is None or not pode_excluir, use_container_width=True):
+            st.session_state.confirm_delete = {"df_name": df_name, "row_id": row_id}
+            st.rerun()
 
     # Confirmação de exclusão
     if st.session_state.confirm_delete["df_name"] == df_name:
         row_id = st.session_state.confirm_delete["row_id"]
-        st.error(f"⚠️ Deseja realmente excluir o registro **ID {row_id}**? Esta ação é irreversível.")
+        st.error(f"⚠️ Deseja realmente excluir o registro **ID {row_id}**? Ele vai para a lixeira (dá para desfazer por {DESFAZER_SEGUNDOS // 60} min).")
         col_sp1, col_yes, col_no, col_sp2 = st.columns([2, 1, 1, 2])
 
         with col_yes:
             if st.button("✅ Sim, excluir", key=f"confirm_{df_name}_{row_id}", use_container_width=True):
-                if df_name == "clientes_df":
-                    base = st.session_state.clientes_df.copy()
-                    cliente_row = base[base["ID"] == row_id]
-                    cliente_nome = cliente_row.iloc[0]["Cliente"] if not cliente_row.empty else None
-                    st.session_state.clientes_df = base[base["ID"] != row_id]
-                    save_csv(st.session_state.clientes_df, CLIENTES_CSV)
-
-                    vagas_rel = st.session_state.vagas_df[st.session_state.vagas_df["Cliente"] == cliente_nome]["ID"].tolist() if cliente_nome else []
-                    st.session_state.vagas_df = st.session_state.vagas_df[st.session_state.vagas_df["Cliente"] != cliente_nome]
-                    save_csv(st.session_state.vagas_df, VAGAS_CSV)
-
-                    st.session_state.candidatos_df = st.session_state.candidatos_df[st.session_state.candidatos_df["Cliente"] != cliente_nome]
-                    save_csv(st.session_state.candidatos_df, CANDIDATOS_CSV)
-
-                    registrar_log("Clientes", "Excluir", item_id=row_id, detalhe=f"Cliente {row_id} excluído. Vagas removidas: {vagas_rel}")
-                    registrar_log("Vagas", "Excluir em Cascata", detalhe=f"Cliente {row_id} excluído. Vagas removidas: {vagas_rel}")
-                    registrar_log("Candidatos", "Excluir em Cascata", detalhe=f"Cliente {row_id} excluído. Candidatos removidos.")
-
-                elif df_name == "vagas_df":
-                    base = st.session_state.vagas_df.copy()
-                    vaga_row = base[base["ID"] == row_id]
-                    vaga_cliente = vaga_row.iloc[0]["Cliente"] if not vaga_row.empty else None
-                    vaga_cargo = vaga_row.iloc[0]["Cargo"] if not vaga_row.empty else None
-
-                    st.session_state.vagas_df = base[base["ID"] != row_id]
-                    save_csv(st.session_state.vagas_df, VAGAS_CSV)
-
-                    candidatos_rel = []
-                    if vaga_cliente is not None and vaga_cargo is not None:
-                        candidatos_rel = st.session_state.candidatos_df[
-                            (st.session_state.candidatos_df["Cliente"] == vaga_cliente) &
-                            (st.session_state.candidatos_df["Cargo"] == vaga_cargo)
-                        ]["ID"].tolist()
-
-                    st.session_state.candidatos_df = st.session_state.candidatos_df[
-                        ~(
-                            (st.session_state.candidatos_df["Cliente"] == vaga_cliente) &
-                            (st.session_state.candidatos_df["Cargo"] == vaga_cargo)
-                        )
-                    ]
-                    save_csv(st.session_state.candidatos_df, CANDIDATOS_CSV)
-
-                    registrar_log("Vagas", "Excluir", item_id=row_id, detalhe=f"Vaga {row_id} excluída. Candidatos removidos: {candidatos_rel}")
-                    registrar_log("Candidatos", "Excluir em Cascata", detalhe=f"Vaga {row_id} excluída. Candidatos removidos: {candidatos_rel}")
-
-                elif df_name == "candidatos_df":
-                    base = st.session_state.candidatos_df.copy()
-                    st.session_state.candidatos_df = base[base["ID"] != row_id]
-                    save_csv(st.session_state.candidatos_df, CANDIDATOS_CSV)
-                    registrar_log("Candidatos", "Excluir", item_id=row_id, detalhe=f"Candidato {row_id} excluído.")
-
-                elif df_name == "comercial_df":
-                    base = st.session_state.comercial_df.copy()
-                    st.session_state.comercial_df = base[base["ID"] != row_id]
-                    save_csv(st.session_state.comercial_df, COMERCIAL_CSV)
-                    registrar_log("Comercial", "Excluir", item_id=row_id, detalhe=f"Registro comercial {row_id} excluído.")
-
-                st.success(f"✅ Registro {row_id} excluído com sucesso!")
+                try:
+                    resultado = servicos.excluir_registros(_nome_tabela(df_name), [row_id], st.session_state.usuario)
+                except ErroPermissao as e:
+                    st.error(f"❌ {e}")
+                    st.stop()
+                _registrar_desfazer(resultado, f"Registro {row_id} excluído")
                 st.session_state.confirm_delete = {"df_name": None, "row_id": None}
                 st.rerun()
 
@@ -478,18 +401,110 @@ def show_table(df, cols, df_name, csv_path):
 
     st.divider()
 
-# Atualiza campo "Atualização" da vaga atrelada ao cliente/cargo quando mexe no candidato
-def atualizar_vaga_data_atualizacao(cliente, cargo):
-    vagas_df = st.session_state.vagas_df.copy()
-    vaga_match = vagas_df[(vagas_df["Cliente"] == cliente) & (vagas_df["Cargo"] == cargo)]
-    if not vaga_match.empty:
-        idx = vaga_match.index[0]
-        hoje = datetime.now().strftime("%d/%m/%Y")
-        antigo = vagas_df.at[idx, "Atualização"]
-        vagas_df.at[idx, "Atualização"] = hoje
-        st.session_state.vagas_df = vagas_df
-        save_csv(vagas_df, VAGAS_CSV)
-        registrar_log("Vagas", "Atualização", item_id=vagas_df.at[idx, "ID"], campo="Atualização", valor_anterior=antigo, valor_novo=hoje, detalhe=f"Atualização de status de candidato atrelado à vaga.")
+def acoes_em_lote(df, df_name):
+    """
+    Seleção múltipla + ação aplicada a todos os registros de uma vez:
+    uma atualização vetorizada, uma gravação e um append no log (servicos).
+    As regras de campos restritos ao admin são as mesmas do formulário de edição.
+    """
+    tabela = _nome_tabela(df_name)
+    usuario = st.session_state.usuario
+    editaveis = servicos.campos_editaveis(tabela, TABELAS[tabela][1], usuario)
+
+    acoes = []
+    if "Status" in editaveis:
+        acoes.append("Definir Status")
+    if "Recrutador" in editaveis:
+        acoes.append("Definir Recrutador")
+    if tabela == "comercial":
+        acoes += ["Avançar no funil ⮞", "Voltar no funil ⮜"]
+    try:
+        servicos.verificar_permissao(usuario, tabela, "excluir")
+        acoes.append("Excluir")
+    except ErroPermissao:
+        pass
+
+    msg = st.session_state.pop(f"lote_msg_{df_name}", None)
+    if msg:
+        st.success(msg)
+
+    with st.expander("☑️ Ações em lote", expanded=False):
+        rotulo_col = {"vagas": "Cargo", "candidatos": "Nome", "comercial": "Empresa"}[tabela]
+        rotulos = dict(zip(df["ID"], df["ID"] + " - " + df[rotulo_col].fillna("")))
+        if st.checkbox(f"Selecionar todos os {len(df)} registros filtrados", key=f"lote_todos_{df_name}"):
+            ids = list(rotulos)
+        else:
+            ids = st.multiselect("Registros", options=list(rotulos), format_func=lambda i: rotulos.get(i, i),
+                                 key=f"lote_ids_{df_name}", placeholder="Selecione os registros...")
+
+        col_acao, col_valor = st.columns(2)
+        acao = col_acao.selectbox("Ação", acoes, key=f"lote_acao_{df_name}")
+        valor = None
+        confirmado = True
+        with col_valor:
+            if acao == "Definir Status":
+                valor = st.selectbox("Novo Status", STATUS_OPCOES[tabela], key=f"lote_status_{df_name}")
+            elif acao == "Definir Recrutador":
+                valor = st.selectbox("Novo Recrutador", RECRUTADORES_PADRAO, key=f"lote_recrutador_{df_name}")
+            elif acao == "Excluir":
+                confirmado = st.checkbox("Confirmo a exclusão (vai para a lixeira)", key=f"lote_confirma_{df_name}")
+
+        if st.button(f"Aplicar a {len(ids)} registro(s)", key=f"lote_aplicar_{df_name}",
+                     disabled=not ids or not confirmado, use_container_width=True):
+            try:
+                if acao in ("Definir Status", "Definir Recrutador"):
+                    campo = "Status" if acao == "Definir Status" else "Recrutador"
+                    alterados = servicos.atualizar_registros(tabela, ids, {campo: valor}, usuario)
+                    msg = f"✅ {campo} = {valor} aplicado a {len(alterados)} registro(s)."
+                elif acao.startswith("Avançar") or acao.startswith("Voltar"):
+                    movidos = servicos.mover_status_comercial(ids, "+" if acao.startswith("Avançar") else "-", usuario)
+                    msg = f"✅ {len(movidos)} registro(s) movido(s) no funil."
+                else:
+                    resultado = servicos.excluir_registros(tabela, ids, usuario)
+                    msg = f"🗑️ {len(resultado['removidos'].get(tabela, []))} registro(s) movido(s) para a lixeira."
+                    _registrar_desfazer(resultado, msg)
+            except (ErroValidacao, ErroPermissao) as e:
+                st.error(f"❌ {e}")
+                st.stop()
+            for chave in (f"lote_ids_{df_name}", f"lote_todos_{df_name}", f"lote_confirma_{df_name}"):
+                st.session_state.pop(chave, None)
+            st.session_state[f"lote_msg_{df_name}"] = msg
+            st.rerun()
+
+def _registrar_desfazer(resultado, descricao):
+    # Guarda a última exclusão da sessão para o botão "Desfazer" do topo
+    if resultado.get("lote"):
+        st.session_state.ultima_exclusao = {"lote": resultado["lote"], "descricao": descricao, "quando": time.time()}
+
+def oferecer_desfazer():
+    ultima = st.session_state.get("ultima_exclusao")
+    if not ultima:
+        return
+    if time.time() - ultima["quando"] > DESFAZER_SEGUNDOS:
+        st.session_state.ultima_exclusao = None
+        return
+    col_msg, col_btn = st.columns([5, 1])
+    col_msg.info(f"🗑️ {ultima['descricao']} (enviado para a lixeira).")
+    if col_btn.button("↩️ Desfazer", key="desfazer_exclusao", use_container_width=True):
+        try:
+            servicos.restaurar_lote(ultima["lote"], st.session_state.usuario)
+        except (ErroValidacao, ErroPermissao) as e:
+            st.error(f"❌ {e}")
+        st.session_state.ultima_exclusao = None
+        st.rerun()
+
+def _nome_tabela(df_name):
+    # Chaves de tela ("vagas_df") -> nome da tabela em servicos ("vagas")
+    return df_name.replace("_df", "")
+
+def _encerrar_edicao():
+    st.session_state.edit_mode = None
+    st.session_state.edit_record = {}
+    st.session_state.edit_conflito = None
+
+def _concluir_edicao():
+    _encerrar_edicao()
+    st.rerun()
 
 # Formulário de edição genérico (com regras por aba)
 def show_edit_form(df_name, cols, csv_path):
@@ -498,15 +513,6 @@ def show_edit_form(df_name, cols, csv_path):
 
     st.subheader(f"✏️ Editando {df_name.replace('_df','').capitalize()}")
 
-    campos_vagas_admin = [
-        "Cliente", "Data de Abertura", "Cargo", "Recrutador", "Salário 1", "Salário 2"
-    ]
-    campos_candidatos_admin = [
-        "Cliente", "Cargo", "Nome", "Telefone", "Recrutador"
-    ]
-    # Campos somente admin na página Comercial (inclui Produto)
-    campos_comercial_somente_admin = ["Empresa", "Cidade", "UF", "Canal", "Produto"]
-
     with st.form("edit_form", clear_on_submit=False):
         new_data = {}
         for c in cols:
@@ -516,12 +522,12 @@ def show_edit_form(df_name, cols, csv_path):
                 new_data[c] = st.text_input(c, value=val, disabled=True)
 
             elif c == "Status" and df_name == "candidatos_df":
-                opcoes = ["Enviado", "Não entrevistado", "Validado", "Não validado", "Desistência"]
+                opcoes = CANDIDATOS_STATUS_OPCOES
                 idx = opcoes.index(val) if val in opcoes else 0
                 new_data[c] = st.selectbox(c, options=opcoes, index=idx)
 
             elif c == "Status" and df_name == "vagas_df":
-                opcoes = ["Aberta", "Ag. Inicio", "Cancelada", "Fechada", "Reaberta", "Pausada"]
+                opcoes = VAGAS_STATUS_OPCOES
                 idx = opcoes.index(val) if val in opcoes else 0
                 new_data[c] = st.selectbox(c, options=opcoes, index=idx)
 
@@ -544,13 +550,13 @@ def show_edit_form(df_name, cols, csv_path):
                 idx = RECRUTADORES_PADRAO.index(val) if val in RECRUTADORES_PADRAO else 0
                 new_data[c] = st.selectbox(c, options=RECRUTADORES_PADRAO, index=idx)
 
-            elif df_name == "vagas_df" and c in campos_vagas_admin:
+            elif df_name == "vagas_df" and c in CAMPOS_VAGAS_ADMIN:
                 new_data[c] = st.text_input(c, value=val, disabled=(usuario != "admin"))
 
-            elif df_name == "candidatos_df" and c in campos_candidatos_admin:
+            elif df_name == "candidatos_df" and c in CAMPOS_CANDIDATOS_ADMIN:
                 new_data[c] = st.text_input(c, value=val, disabled=(usuario != "admin"))
 
-            elif df_name == "comercial_df" and c in campos_comercial_somente_admin:
+            elif df_name == "comercial_df" and c in CAMPOS_COMERCIAL_ADMIN:
                 new_data[c] = st.text_input(c, value=val, disabled=(usuario != "admin"))
 
             else:
@@ -559,54 +565,56 @@ def show_edit_form(df_name, cols, csv_path):
         submitted = st.form_submit_button("✅ Salvar Alterações", use_container_width=True)
 
         if submitted:
-            df = st.session_state[df_name].copy()
-            idx = df[df["ID"] == record["ID"]].index
-            if not idx.empty:
-                idx0 = idx[0]
-                for c in cols:
-                    if c in df.columns and c != "Atualização":
-                        if df_name == "vagas_df" and c in campos_vagas_admin and usuario != "admin":
-                            continue
-                        if df_name == "candidatos_df" and c in campos_candidatos_admin and usuario != "admin":
-                            continue
-                        if df_name == "comercial_df":
-                            if c == "Data":
-                                continue
-                            if (c in campos_comercial_somente_admin) and (usuario != "admin"):
-                                continue
-
-                        antigo = df.at[idx0, c]
-                        novo = new_data.get(c, "")
-                        if str(antigo) != str(novo):
-                            registrar_log(
-                                aba=df_name.replace('_df','').capitalize(),
-                                acao="Editar",
-                                item_id=record["ID"],
-                                campo=c,
-                                valor_anterior=antigo,
-                                valor_novo=novo,
-                                detalhe=f"Registro {record['ID']} alterado"
-                            )
-                            df.at[idx0, c] = novo
-
-                st.session_state[df_name] = df
-                save_csv(df, csv_path)
-
-                if df_name == "candidatos_df":
-                    cliente_nome = df.at[idx0, "Cliente"]
-                    cargo_nome = df.at[idx0, "Cargo"]
-                    atualizar_vaga_data_atualizacao(cliente_nome, cargo_nome)
-
+            try:
+                status, detalhes = servicos.salvar_edicao(_nome_tabela(df_name), record, new_data, usuario)
+            except (ErroValidacao, ErroPermissao) as e:
+                status, detalhes = "erro", str(e)
+            if status == "ok":
                 st.success("✅ Registro atualizado com sucesso!")
-                st.session_state.edit_mode = None
-                st.session_state.edit_record = {}
+                _concluir_edicao()
+            elif status == "conflito":
+                st.session_state.edit_conflito = {**detalhes, "novos": new_data}
                 st.rerun()
+            elif status == "erro":
+                st.error(f"❌ {detalhes}")
             else:
                 st.error("❌ Registro não encontrado para edição.")
 
+    conflito = st.session_state.get("edit_conflito")
+    if conflito:
+        st.warning("⚠️ Este registro foi alterado por outro usuário enquanto você editava. Campos em conflito:")
+        st.dataframe(pd.DataFrame(conflito["conflitos"]), hide_index=True, use_container_width=True)
+        col_manter, col_descartar = st.columns(2)
+        with col_manter:
+            if st.button("💾 Manter meus valores", use_container_width=True):
+                # Rebase: aceita a versão atual como base e reaplica só os campos do usuário
+                atual = conflito["atual"]
+                base = dict(record)
+                for item in conflito["conflitos"]:
+                    base[item["Campo"]] = atual[item["Campo"]]
+                base[COLUNA_VERSAO] = atual[COLUNA_VERSAO]
+                st.session_state.edit_record = base
+                try:
+                    status, detalhes = servicos.salvar_edicao(_nome_tabela(df_name), base, conflito["novos"], usuario)
+                except (ErroValidacao, ErroPermissao) as e:
+                    status, detalhes = "erro", str(e)
+                if status == "ok":
+                    _concluir_edicao()
+                elif status == "conflito":
+                    st.session_state.edit_conflito = {**detalhes, "novos": conflito["novos"]}
+                    st.rerun()
+                elif status == "erro":
+                    st.error(f"❌ {detalhes}")
+                else:
+                    st.error("❌ Registro não encontrado para edição.")
+        with col_descartar:
+            if st.button("🔄 Descartar e recarregar", use_container_width=True):
+                st.session_state.edit_record = conflito["atual"]
+                st.session_state.edit_conflito = None
+                st.rerun()
+
     if st.button("❌ Cancelar Edição", use_container_width=True):
-        st.session_state.edit_mode = None
-        st.session_state.edit_record = {}
+        _encerrar_edicao()
         st.rerun()
 
 # ============================================================
@@ -614,23 +622,28 @@ def show_edit_form(df_name, cols, csv_path):
 # ============================================================
 
 def tela_login():
-    st.image("https://parmaconsultoria.com.br/wp-content/uploads/2023/10/logo-parma-1.png", width=250)
+    mostrar_logo(250)
     st.title("🔒 Login - Parma Consultoria")
+    inquilinos = servicos.listar_inquilinos()
     with st.form("login_form"):
         usuario = st.text_input("Usuário")
         senha = st.text_input("Senha", type="password")
+        # Um servidor para várias empresas/unidades: cada uma com os seus dados
+        inquilino = st.selectbox("Unidade", inquilinos, key="login_inquilino") if len(inquilinos) > 1 else inquilinos[0]
         submitted = st.form_submit_button("Entrar", use_container_width=True)
         if submitted:
-            if usuario in USUARIOS and senha == USUARIOS[usuario]["senha"]:
+            if servicos.autenticar(usuario, senha, inquilino):
+                st.session_state.inquilino = servicos.usar_inquilino(inquilino)
+                migrar_dados(st.session_state.inquilino)
                 st.session_state.usuario = usuario
                 st.session_state.logged_in = True
                 st.session_state.page = "menu"
-                st.session_state.permissoes = USUARIOS[usuario]["permissoes"]
+                st.session_state.permissoes = servicos.permissoes(usuario)
                 registrar_log("Login", "Login", detalhe=f"Usuário {usuario} entrou no sistema.")
                 st.success("✅ Login realizado com sucesso!")
                 st.rerun()
             else:
-                st.error("❌ Usuário ou senha inválidos.")
+                st.error("❌ Usuário ou senha inválidos." if len(inquilinos) == 1 else "❌ Usuário ou senha inválidos, ou usuário sem acesso a esta unidade.")
 
 # ============================================================
 # Tela de Menu Interno
@@ -654,14 +667,10 @@ def tela_menu_interno():
                     st.success("Ping automático iniciado!")
                     st.rerun()
 
-        if (
-            st.session_state.get("logged_in", False)
-            and st.session_state.get("usuario", "") == "admin"
-            and st.session_state.get("ping_auto", False)
-        ):
-            st_autorefresh(interval=30_000, key="ping_admin")
+        if st.session_state["ping_auto"]:
+            st.caption(f"💓 Heartbeat a cada {HEARTBEAT_SEGUNDOS}s: mantém o servidor ativo e recarrega a tela só quando os dados mudam.")
 
-    st.image("https://parmaconsultoria.com.br/wp-content/uploads/2023/10/logo-parma-1.png", width=250)
+    mostrar_logo(250)
     st.title("📊 Sistema Parma Consultoria")
     st.subheader("Bem-vindo! Escolha uma opção para começar.")
     st.divider()
@@ -674,7 +683,7 @@ def tela_menu_interno():
                 st.rerun()
     with col2:
         if "vagas" in st.session_state.permissoes:
-            if st.button("📋 Vagas", use_container_width=True):
+            if st.button(rotulo_vagas("📋 Vagas"), key="menu_interno_vagas", use_container_width=True):
                 st.session_state.page = "vagas"
                 st.rerun()
     with col3:
@@ -696,6 +705,123 @@ def tela_menu_interno():
                 st.session_state.page = "comercial"
                 st.rerun()
 
+    if st.session_state.usuario == "admin":
+        st.divider()
+        with st.expander("🗄️ Arquivar Registros Encerrados", expanded=False):
+            st.caption(
+                "Move vagas Fechadas/Canceladas (com seus candidatos) e registros comerciais em "
+                "'Negócio Fechado'/'Declinado' para o arquivo morto compactado por ano. "
+                "Os registros continuam consultáveis pelo botão 'Incluir arquivados' de cada tela."
+            )
+            idade = st.number_input("Idade mínima (dias sem atualização)", min_value=0, value=ARQUIVO_IDADE_DIAS, step=30)
+            if st.button("🗄️ Arquivar agora", use_container_width=True):
+                tarefas.submeter("arquivar", st.session_state.usuario, "Arquivar registros encerrados", idade_dias=idade)
+                st.rerun()
+        with st.expander("🗑️ Lixeira", expanded=False):
+            mostrar_lixeira()
+        with st.expander("📦 Exportar Base Completa", expanded=False):
+            st.caption("Gera um .zip com todas as tabelas e o log do sistema. O download aparece no painel de tarefas.")
+            if st.button("📦 Gerar exportação", use_container_width=True):
+                tarefas.submeter("exportar_base", st.session_state.usuario, "Exportar base completa")
+                st.rerun()
+        with st.expander("🕰️ Backup e consulta no tempo", expanded=False):
+            mostrar_backups()
+        with st.expander("🧩 Integridade dos dados", expanded=False):
+            mostrar_integridade()
+
+def mostrar_indicadores_status():
+    # Tempo em cada estágio / para fechar vagas / velocidade do funil, a partir do histórico incremental do log
+    rotulos = {nome: TABELAS[nome][2] for nome in historico.TABELAS_COM_STATUS}
+    col_tab, col_dias = st.columns([2, 1])
+    with col_tab:
+        nome = st.selectbox("Tabela", options=list(rotulos), format_func=rotulos.get, key="indicadores_tabela")
+    with col_dias:
+        dias = st.number_input("Período (dias)", min_value=1, value=30, step=1, key="indicadores_dias")
+    st.markdown("**Tempo em cada status**")
+    st.dataframe(historico.tempo_em_estagio(nome), hide_index=True, use_container_width=True)
+    st.markdown(f"**Movimento nos últimos {dias} dias**")
+    st.dataframe(historico.velocidade_funil(nome, dias), hide_index=True, use_container_width=True)
+    if nome == "vagas":
+        preenchidas = historico.tempo_para_preencher()
+        st.markdown("**Tempo para fechar a vaga**")
+        if preenchidas.empty:
+            st.info("Nenhuma vaga fechada registrada no histórico.")
+        else:
+            st.caption(f"{len(preenchidas)} vaga(s) — mediana de {preenchidas['Dias'].median():.1f} dias")
+            st.dataframe(preenchidas, hide_index=True, use_container_width=True)
+
+def mostrar_backups():
+    # Somente admin: tabela como estava numa data/hora (base do backup + alterações até o momento)
+    st.caption(
+        f"Uma base compactada de cada tabela é gerada por dia; entre as bases ficam só as linhas alteradas. "
+        f"Bases com mais de {servicos.BACKUP_RETENCAO_DIAS} dias são removidas."
+    )
+    rotulos = {nome: aba for nome, (_, _, aba) in TABELAS.items()}
+    nome = st.selectbox("Tabela", options=list(rotulos), format_func=rotulos.get, key="backup_tabela")
+    bases = servicos.listar_backups(nome)
+    if not bases:
+        st.info("Ainda não há backup desta tabela.")
+    else:
+        st.dataframe(pd.DataFrame(bases), hide_index=True, use_container_width=True)
+        col_data, col_hora = st.columns(2)
+        data = col_data.date_input("Data", format="DD/MM/YYYY", key="backup_data")
+        hora = col_hora.time_input("Hora", key="backup_hora", step=60)
+        if st.button("🔎 Ver tabela nesse momento", use_container_width=True):
+            try:
+                df = servicos.tabela_em(nome, pd.Timestamp.combine(data, hora).to_pydatetime())
+            except ErroValidacao as e:
+                st.error(str(e))
+            else:
+                st.caption(f"{len(df)} registro(s) em {data:%d/%m/%Y} {hora:%H:%M}")
+                st.dataframe(df, hide_index=True, use_container_width=True)
+                download_button(df, f"{nome}_{data:%Y%m%d}_{hora:%H%M}.csv")
+    if st.button("🗃️ Gerar base agora", use_container_width=True):
+        tarefas.submeter("backup_base", st.session_state.usuario, "Backup base das tabelas")
+        st.rerun()
+
+def mostrar_integridade():
+    # Somente admin: IDs repetidos e vagas/candidatos sem cliente/vaga válidos, com correção em lote
+    relatorio = integridade.verificar()
+    if relatorio.empty:
+        st.success("✅ Nenhum problema de integridade encontrado.")
+        return
+    st.caption(f"{len(relatorio)} problema(s). Problemas sem correção sugerida pedem edição manual do registro.")
+    st.dataframe(relatorio, hide_index=True, use_container_width=True)
+    por_correcao = relatorio["Correção"].value_counts()
+    for correcao in integridade.CORRECOES:
+        if correcao in por_correcao:
+            if st.button(f"🛠️ {correcao} ({por_correcao[correcao]})", key=f"integridade_{correcao}", use_container_width=True):
+                corrigidos = integridade.corrigir(correcao, st.session_state.usuario)
+                st.success(f"✅ {correcao}: {', '.join(f'{t}: {n}' for t, n in corrigidos.items())}")
+                st.rerun()
+
+def mostrar_lixeira():
+    # Somente admin: lotes excluídos ainda restauráveis + compactação manual
+    lotes = servicos.listar_lixeira()
+    st.caption(
+        f"Registros excluídos ficam aqui por {LIXEIRA_RETENCAO_DIAS} dias e depois são removidos "
+        "definitivamente pela compactação automática."
+    )
+    if not lotes:
+        st.info("A lixeira está vazia.")
+    else:
+        resumo = pd.DataFrame([
+            {"Lote": r["Lote"], "Excluído em": r["DataHora"], "Usuário": r["Usuario"], "Detalhe": r["Detalhe"],
+             "Registros": ", ".join(f"{t}: {len(ids)}" for t, ids in r["IDs"].items())}
+            for r in lotes
+        ])
+        st.dataframe(resumo, hide_index=True, use_container_width=True)
+        rotulos = {r["Lote"]: f"{r['DataHora']} — {r['Detalhe']}" for r in lotes}
+        lote = st.selectbox("Restaurar", options=list(rotulos), format_func=rotulos.get, key="lixeira_lote")
+        if st.button("↩️ Restaurar selecionado", use_container_width=True):
+            restaurados = servicos.restaurar_lote(lote, st.session_state.usuario)
+            st.success(f"✅ Restaurado: {', '.join(f'{t}: {len(ids)}' for t, ids in restaurados.items())}")
+            st.rerun()
+    idade = st.number_input("Compactar itens com mais de (dias)", min_value=0, value=LIXEIRA_RETENCAO_DIAS, step=1)
+    if st.button("🧹 Compactar agora", use_container_width=True):
+        tarefas.submeter("compactar_lixeira", st.session_state.usuario, "Compactar lixeira", idade_dias=idade)
+        st.rerun()
+
 # ============================================================
 # Tela de Clientes
 # ============================================================
@@ -716,30 +842,9 @@ def tela_clientes():
                 key="upload_clientes"
             )
             if arquivo is not None:
-                try:
-                    if arquivo.name.lower().endswith('.csv'):
-                        df_upload = pd.read_csv(arquivo, dtype=str)
-                    else:
-                        df_upload = pd.read_excel(arquivo, dtype=str)
-
-                    missing = [c for c in CLIENTES_COLS if c not in df_upload.columns]
-                    if missing:
-                        st.error(f"Colunas faltando: {missing}")
-                    else:
-                        df_upload = df_upload[CLIENTES_COLS].fillna("")
-                        base = st.session_state.clientes_df.copy()
-                        combined = pd.concat([base, df_upload], ignore_index=True)
-                        combined = combined.drop_duplicates(subset=["ID"], keep="first")
-                        st.session_state.clientes_df = combined
-                        save_csv(combined, CLIENTES_CSV)
-                        registrar_log("Clientes", "Importar", detalhe=f"Importação de clientes via upload ({arquivo.name}).")
-                        st.success("✅ Clientes importados com sucesso!")
-                        st.rerun()
-                except Exception as e:
-                    st.error(f"Erro ao processar o arquivo: {e}")
+                importar_em_segundo_plano("clientes", arquivo)
 
     with st.expander("➕ Cadastrar Novo Cliente", expanded=False):
-        data_hoje = date.today().strftime("%d/%m/%Y")
         with st.form("form_clientes", enter_to_submit=False):
             col1, col2 = st.columns(2)
             with col1:
@@ -756,31 +861,30 @@ def tela_clientes():
                 if not all([cliente, nome, cidade, uf, telefone, email]):
                     st.warning("⚠️ Preencha todos os campos obrigatórios.")
                 else:
-                    prox_id = str(next_id(st.session_state.clientes_df, "ID"))
-                    novo = pd.DataFrame([{
-                        "ID": prox_id,
-                        "Data": data_hoje,
+                    prox_id = servicos.criar_registros("clientes", [{
                         "Cliente": cliente,
                         "Nome": nome,
                         "Cidade": cidade,
-                        "UF": uf.upper(),
+                        "UF": uf,
                         "Telefone": telefone,
                         "E-mail": email,
-                    }])
-                    st.session_state.clientes_df = pd.concat([st.session_state.clientes_df, novo], ignore_index=True)
-                    save_csv(st.session_state.clientes_df, CLIENTES_CSV)
-                    registrar_log("Clientes", "Criar", item_id=prox_id, detalhe=f"Cliente criado (ID {prox_id}).")
+                    }], st.session_state.usuario)[0]
                     st.success(f"✅ Cliente cadastrado com sucesso! ID: {prox_id}")
                     st.rerun()
 
     st.subheader("📋 Clientes Cadastrados")
-    df = st.session_state.clientes_df.copy()
+    df = carregar_tabela("clientes")
     if df.empty:
         st.info("Nenhum cliente cadastrado.")
     else:
-        filtro = st.text_input("🔎 Buscar por Cliente")
+        col_busca, col_periodo = st.columns(2)
+        with col_busca:
+            filtro = st.text_input("🔎 Buscar por Cliente")
+        with col_periodo:
+            periodo = filtro_periodo("clientes")
         df_filtrado = df[df["Cliente"].str.contains(filtro, case=False, na=False)] if filtro else df
-        download_button(df_filtrado, "clientes.csv", "⬇️ Baixar Lista de Clientes")
+        df_filtrado = indices.filtrar_periodo("clientes", df_filtrado, *periodo)
+        download_button(df_filtrado[CLIENTES_COLS], "clientes.csv", "⬇️ Baixar Lista de Clientes")
         show_table(df_filtrado, CLIENTES_COLS, "clientes_df", CLIENTES_CSV)
 
 # ============================================================
@@ -795,35 +899,37 @@ def tela_vagas():
     st.header("📋 Vagas")
     st.markdown("Gerencie as vagas de emprego da consultoria.")
 
-    df_all = st.session_state.vagas_df.copy()
+    df_all = carregar_tabela("vagas")
 
+    barra_visoes("vagas", FILTROS_CADASTRO)
     col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
     with col1:
         cliente_opts = ["(todos)"] + sorted(df_all["Cliente"].dropna().unique().tolist())
-        cliente_filter = st.selectbox("Filtrar por Cliente", cliente_opts, index=0)
+        _manter_opcao(_chave_filtro("vagas", "Cliente"), cliente_opts)
+        cliente_filter = st.selectbox("Filtrar por Cliente", cliente_opts, index=0, key=_chave_filtro("vagas", "Cliente"))
         if cliente_filter != "(todos)":
             cargos_do_cliente = df_all[df_all["Cliente"] == cliente_filter]["Cargo"].dropna().unique().tolist()
             cargo_opts = ["(todos)"] + sorted(cargos_do_cliente)
         else:
             cargo_opts = ["(todos)"] + sorted(df_all["Cargo"].dropna().unique().tolist())
     with col2:
-        cargo_filter = st.selectbox("Filtrar por Cargo", cargo_opts, index=0)
+        _manter_opcao(_chave_filtro("vagas", "Cargo"), cargo_opts)
+        cargo_filter = st.selectbox("Filtrar por Cargo", cargo_opts, index=0, key=_chave_filtro("vagas", "Cargo"))
     with col3:
         recrutador_opts = ["(todos)"] + sorted(df_all["Recrutador"].dropna().unique().tolist())
-        recrutador_filter = st.selectbox("Filtrar por Recrutador", recrutador_opts, index=0)
+        _manter_opcao(_chave_filtro("vagas", "Recrutador"), recrutador_opts)
+        recrutador_filter = st.selectbox("Filtrar por Recrutador", recrutador_opts, index=0, key=_chave_filtro("vagas", "Recrutador"))
     with col4:
         status_opts = ["(todos)"] + sorted(df_all["Status"].dropna().unique().tolist())
-        status_filter = st.selectbox("Filtrar por Status", status_opts, index=0)
-
-    df = df_all.copy()
-    if cliente_filter != "(todos)":
-        df = df[df["Cliente"] == cliente_filter]
-    if cargo_filter != "(todos)":
-        df = df[df["Cargo"] == cargo_filter]
-    if recrutador_filter != "(todos)":
-        df = df[df["Recrutador"] == recrutador_filter]
-    if status_filter != "(todos)":
-        df = df[df["Status"] == status_filter]
+        _manter_opcao(_chave_filtro("vagas", "Status"), status_opts)
+        status_filter = st.selectbox("Filtrar por Status", status_opts, index=0, key=_chave_filtro("vagas", "Status"))
+
+    periodo = filtro_periodo("vagas")
+
+    filtros = {"Cliente": cliente_filter, "Cargo": cargo_filter, "Recrutador": recrutador_filter, "Status": status_filter}
+    visao = visao_ativa("vagas", filtros)
+    df = visoes.abrir(st.session_state.usuario, "vagas", visao) if visao else _filtrar_igualdade(df_all, filtros)
+    df = indices.filtrar_periodo("vagas", df, *periodo)
 
     if st.session_state.usuario == "admin":
         with st.expander("📤 Importar Vagas (CSV/XLSX)", expanded=False):
@@ -833,70 +939,59 @@ def tela_vagas():
                 key="upload_vagas"
             )
             if arquivo is not None:
-                try:
-                    if arquivo.name.lower().endswith('.csv'):
-                        df_upload = pd.read_csv(arquivo, dtype=str)
-                    else:
-                        df_upload = pd.read_excel(arquivo, dtype=str)
-
-                    if set(df_upload.columns) != set(VAGAS_COLS) or len(df_upload.columns) != len(VAGAS_COLS):
-                        st.error(f"Colunas do arquivo devem ser **exatamente**: {VAGAS_COLS}")
-                    else:
-                        df_upload = df_upload[VAGAS_COLS].fillna("")
-                        base = st.session_state.vagas_df.copy()
-                        combined = pd.concat([base, df_upload], ignore_index=True)
-                        combined = combined.drop_duplicates(subset=["ID"], keep="first")
-                        st.session_state.vagas_df = combined
-                        save_csv(combined, VAGAS_CSV)
-                        registrar_log("Vagas", "Importar", detalhe=f"Importação de vagas via upload ({arquivo.name}).")
-                        st.success("✅ Vagas importadas com sucesso!")
-                        st.rerun()
-                except Exception as e:
-                    st.error(f"Erro ao processar o arquivo: {e}")
+                importar_em_segundo_plano("vagas", arquivo)
 
     with st.expander("➕ Cadastrar Nova Vaga", expanded=False):
         data_abertura = date.today().strftime("%d/%m/%Y")
-        with st.form("form_vaga", enter_to_submit=False):
-            clientes = st.session_state.clientes_df
-            if clientes.empty:
-                st.warning("⚠️ Cadastre um Cliente antes de cadastrar Vagas.")
-            else:
+        clientes = carregar_tabela("clientes")
+        if clientes.empty:
+            st.warning("⚠️ Cadastre um Cliente antes de cadastrar Vagas.")
+        else:
+            # Fora do form: a lista de clientes acompanha o que é digitado na busca
+            cliente_id = seletor_com_busca("Cliente *", "clientes", "vaga_cliente", "ID ou nome do cliente")
+            with st.form("form_vaga", enter_to_submit=False):
                 col1f, col2f = st.columns(2)
                 with col1f:
-                    cliente_sel = st.selectbox("Cliente *", options=clientes.apply(lambda x: f"{x['ID']} - {x['Cliente']}", axis=1))
-                    cliente_id = cliente_sel.split(" - ")[0]
-                    cliente_nome = clientes[clientes['ID'] == cliente_id]['Cliente'].iloc[0]
                     cargo = st.text_input("Cargo *")
                     salario1 = st.text_input("Salário 1 (R$)")
                     salario2 = st.text_input("Salário 2 (R$)")
                 with col2f:
-                    recrutador = st.selectbox("Recrutador *", options=RECRUTADORES_PADRAO)
-                    status = st.selectbox("Status", options=["Aberta", "Ag. Inicio", "Cancelada", "Fechada", "Reaberta", "Pausada"], index=0)
-                    atualizacao = ""  # Preenche vazio
+                    recrutador = seletor_recrutador("vaga_recrutador")
+                    status = st.selectbox("Status", options=VAGAS_STATUS_OPCOES, index=0)
 
                 submitted = st.form_submit_button("✅ Salvar Vaga", use_container_width=True)
                 if submitted:
-                    if not cargo or not recrutador:
-                        st.warning("⚠️ Preencha todos os campos obrigatórios.")
+                    if not cliente_id or not cargo or not recrutador:
+                        st.warning("⚠️ Preencha todos os campos obrigatórios e selecione um cliente.")
                     else:
-                        prox_id = str(next_id(st.session_state.vagas_df, "ID"))
-                        nova = pd.DataFrame([{
-                            "ID": prox_id,
-                            "Cliente": cliente_nome,
-                            "Status": status,
-                            "Data de Abertura": data_abertura,
-                            "Cargo": cargo,
-                            "Recrutador": recrutador,
-                            "Atualização": atualizacao,
-                            "Salário 1": salario1,
-                            "Salário 2": salario2,
-                        }])
-                        st.session_state.vagas_df = pd.concat([st.session_state.vagas_df, nova], ignore_index=True)
-                        save_csv(st.session_state.vagas_df, VAGAS_CSV)
-                        registrar_log("Vagas", "Criar", item_id=prox_id, detalhe=f"Vaga criada (ID {prox_id}).")
+                        try:
+                            prox_id = servicos.criar_registros("vagas", [{
+                                "ClienteID": cliente_id,
+                                "Status": status,
+                                "Data de Abertura": data_abertura,
+                                "Cargo": cargo,
+                                "Recrutador": recrutador,
+                                "Salário 1": salario1,
+                                "Salário 2": salario2,
+                            }], st.session_state.usuario)[0]
+                        except ErroValidacao as e:
+                            st.error(str(e))
+                            st.stop()
                         st.success(f"✅ Vaga cadastrada com sucesso! ID: {prox_id}")
+                        del st.session_state["vaga_recrutador"]
                         st.rerun()
 
+    with st.expander("💰 Faixas salariais", expanded=False):
+        mostrar_faixas_salariais()
+    with st.expander("👥 Carga por recrutador", expanded=False):
+        st.caption(f"Vagas em andamento, candidatos pendentes e ações no log nos últimos {indices.ATIVIDADE_DIAS} dias. "
+                   "Os formulários de cadastro já sugerem o recrutador de menor carga.")
+        st.dataframe(indices.carga_recrutadores(), hide_index=True, use_container_width=True)
+    with st.expander("📦 Relatórios por cliente", expanded=False):
+        mostrar_relatorios_clientes()
+    with st.expander(f"⏰ Vagas paradas ({indices.contar_vagas_paradas()})", expanded=False):
+        mostrar_vagas_paradas()
+
     st.subheader("📋 Vagas Cadastradas")
     if df.empty:
         st.info("Nenhuma vaga cadastrada.")
@@ -906,6 +1001,67 @@ def tela_vagas():
         ]
         download_button(df[VAGAS_COLS], "vagas.csv", "⬇️ Baixar Lista de Vagas")
         show_table(df[VAGAS_COLS_VISUAL], VAGAS_COLS_VISUAL, "vagas_df", VAGAS_CSV)
+        acoes_em_lote(df, "vagas_df")
+
+    mostrar_arquivados("vagas", VAGAS_COLS, lambda arq: _filtrar_igualdade(arq, filtros))
+
+def mostrar_vagas_paradas():
+    # Vagas Aberta/Reaberta pela última movimentação (Atualização ou, se vazia, Data de Abertura)
+    col1, col2 = st.columns(2)
+    with col1:
+        dias = st.number_input("Sem movimentação há pelo menos (dias)", min_value=0,
+                               value=indices.VAGAS_PARADAS_DIAS, step=1, key="paradas_dias")
+    with col2:
+        limite = st.number_input("Mostrar até", min_value=1, value=indices.VAGAS_PARADAS_LIMITE, step=10, key="paradas_limite")
+    paradas, total = indices.vagas_paradas(int(dias), int(limite))
+    if paradas.empty:
+        st.info("Nenhuma vaga em andamento parada nesse período.")
+        return
+    st.caption(f"{total} vaga(s) em andamento sem movimentação há {int(dias)} dia(s) ou mais; as mais antigas primeiro.")
+    st.dataframe(paradas, hide_index=True, use_container_width=True)
+
+def rotulo_vagas(rotulo):
+    # Selo no menu com as vagas paradas há VAGAS_PARADAS_DIAS dias ou mais
+    paradas = indices.contar_vagas_paradas()
+    return f"{rotulo} · ⏰ {paradas}" if paradas else rotulo
+
+def mostrar_relatorios_clientes():
+    # Um pacote por cliente (vagas, candidatos por status, atividade no log) num único .zip
+    clientes = carregar_tabela("clientes")
+    nomes = dict(zip(clientes["ID"], clientes["Cliente"]))
+    st.caption("Sem clientes selecionados, gera os relatórios de todos. O download aparece no painel de tarefas.")
+    ids = st.multiselect("Clientes", options=list(nomes), format_func=lambda i: f"{i} - {nomes.get(i, '')}",
+                         key="relatorio_clientes")
+    col1, col2 = st.columns(2)
+    with col1:
+        formato = st.radio("Formato", options=relatorios.RELATORIO_FORMATOS, format_func=str.upper,
+                           horizontal=True, key="relatorio_formato")
+    with col2:
+        dias = st.number_input("Atividade no log (dias)", min_value=1, value=relatorios.RELATORIO_DIAS_ATIVIDADE,
+                               step=1, key="relatorio_dias")
+    if st.button("📦 Gerar relatórios", key="relatorio_gerar"):
+        descricao = f"Relatórios por cliente ({len(ids) or 'todos'}, {formato.upper()})"
+        tarefas.submeter("relatorios_clientes", st.session_state.usuario, descricao,
+                         clientes_ids=list(ids), formato=formato, dias=int(dias))
+        st.rerun()
+
+def mostrar_faixas_salariais():
+    # Sobre a faixa numérica extraída de Salário 1/Salário 2 (ponto médio de cada vaga)
+    rotulos = {"cargo": "Cargo", "cliente": "Cliente", "cidade": "Cidade do cliente"}
+    por = st.radio("Agrupar por", options=list(rotulos), format_func=rotulos.get, horizontal=True, key="faixas_por")
+    faixas = salarios.faixas_salariais(por)
+    if faixas.empty:
+        st.info("Nenhuma vaga com salário informado.")
+        return
+    st.caption(
+        f"Limites de outlier: quartis ± {salarios.FATOR_IQR} × IQR, "
+        f"em grupos com pelo menos {salarios.MIN_VAGAS_OUTLIER} vagas."
+    )
+    st.dataframe(faixas.round(0).reset_index(), hide_index=True, use_container_width=True)
+    fora = salarios.vagas_fora_da_faixa(por)
+    if not fora.empty:
+        st.markdown(f"**⚠️ {len(fora)} vaga(s) fora da faixa do grupo**")
+        st.dataframe(fora, hide_index=True, use_container_width=True)
 
 # ============================================================
 # Tela de Candidatos
@@ -919,35 +1075,37 @@ def tela_candidatos():
     st.header("🧑‍💼 Candidatos")
     st.markdown("Gerencie os candidatos inscritos nas vagas.")
 
-    df_all = st.session_state.candidatos_df.copy()
+    df_all = carregar_tabela("candidatos")
 
+    barra_visoes("candidatos", FILTROS_CADASTRO)
     col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
     with col1:
         cliente_opts = ["(todos)"] + sorted(df_all["Cliente"].dropna().unique().tolist())
-        cliente_filter = st.selectbox("Filtrar por Cliente", cliente_opts, index=0)
+        _manter_opcao(_chave_filtro("candidatos", "Cliente"), cliente_opts)
+        cliente_filter = st.selectbox("Filtrar por Cliente", cliente_opts, index=0, key=_chave_filtro("candidatos", "Cliente"))
         if cliente_filter != "(todos)":
             cargos_do_cliente = df_all[df_all["Cliente"] == cliente_filter]["Cargo"].dropna().unique().tolist()
             cargo_opts = ["(todos)"] + sorted(cargos_do_cliente)
         else:
             cargo_opts = ["(todos)"] + sorted(df_all["Cargo"].dropna().unique().tolist())
     with col2:
-        cargo_filter = st.selectbox("Filtrar por Cargo", cargo_opts, index=0)
+        _manter_opcao(_chave_filtro("candidatos", "Cargo"), cargo_opts)
+        cargo_filter = st.selectbox("Filtrar por Cargo", cargo_opts, index=0, key=_chave_filtro("candidatos", "Cargo"))
     with col3:
         recrutador_opts = ["(todos)"] + sorted(df_all["Recrutador"].dropna().unique().tolist())
-        recrutador_filter = st.selectbox("Filtrar por Recrutador", recrutador_opts, index=0)
+        _manter_opcao(_chave_filtro("candidatos", "Recrutador"), recrutador_opts)
+        recrutador_filter = st.selectbox("Filtrar por Recrutador", recrutador_opts, index=0, key=_chave_filtro("candidatos", "Recrutador"))
     with col4:
         status_opts = ["(todos)"] + sorted(df_all["Status"].dropna().unique().tolist())
-        status_filter = st.selectbox("Filtrar por Status", status_opts, index=0)
-
-    df = df_all.copy()
-    if cliente_filter != "(todos)":
-        df = df[df["Cliente"] == cliente_filter]
-    if cargo_filter != "(todos)":
-        df = df[df["Cargo"] == cargo_filter]
-    if recrutador_filter != "(todos)":
-        df = df[df["Recrutador"] == recrutador_filter]
-    if status_filter != "(todos)":
-        df = df[df["Status"] == status_filter]
+        _manter_opcao(_chave_filtro("candidatos", "Status"), status_opts)
+        status_filter = st.selectbox("Filtrar por Status", status_opts, index=0, key=_chave_filtro("candidatos", "Status"))
+
+    periodo = filtro_periodo("candidatos")
+
+    filtros = {"Cliente": cliente_filter, "Cargo": cargo_filter, "Recrutador": recrutador_filter, "Status": status_filter}
+    visao = visao_ativa("candidatos", filtros)
+    df = visoes.abrir(st.session_state.usuario, "candidatos", visao) if visao else _filtrar_igualdade(df_all, filtros)
+    df = indices.filtrar_periodo("candidatos", df, *periodo)
 
     if st.session_state.usuario == "admin":
         with st.expander("📤 Importar Candidatos (CSV/XLSX)", expanded=False):
@@ -957,80 +1115,47 @@ def tela_candidatos():
                 key="upload_candidatos"
             )
             if arquivo is not None:
-                try:
-                    if arquivo.name.lower().endswith('.csv'):
-                        df_upload = pd.read_csv(arquivo, dtype=str)
-                    else:
-                        df_upload = pd.read_excel(arquivo, dtype=str)
-
-                    missing = [c for c in CANDIDATOS_COLS if c not in df_upload.columns]
-                    if missing:
-                        st.error(f"Colunas faltando: {missing}")
-                    else:
-                        df_upload = df_upload[CANDIDATOS_COLS].fillna("")
-                        base = st.session_state.candidatos_df.copy()
-                        combined = pd.concat([base, df_upload], ignore_index=True)
-                        combined = combined.drop_duplicates(subset=["ID"], keep="first")
-                        st.session_state.candidatos_df = combined
-                        save_csv(combined, CANDIDATOS_CSV)
-                        registrar_log("Candidatos", "Importar", detalhe=f"Importação de candidatos via upload ({arquivo.name}).")
-                        st.success("✅ Candidatos importados com sucesso!")
-                        st.rerun()
-                except Exception as e:
-                    st.error(f"Erro ao processar o arquivo: {e}")
+                importar_em_segundo_plano("candidatos", arquivo)
 
     with st.expander("➕ Cadastrar Novo Candidato", expanded=False):
         col_form, col_info = st.columns([2, 1])
         with col_form:
-            vagas_disponiveis = st.session_state.vagas_df[~st.session_state.vagas_df["Status"].isin(["Ag. Inicio", "Fechada"])].copy()
+            vagas_atuais = carregar_tabela("vagas")
+            vagas_disponiveis = vagas_atuais[~vagas_atuais["Status"].isin(VAGAS_STATUS_INDISPONIVEIS)]
             if vagas_disponiveis.empty:
                 st.info("Cadastre uma vaga disponível primeiro.")
             else:
-                vagas_disponiveis["Opcao"] = vagas_disponiveis.apply(lambda x: f"{x['ID']} - {x['Cliente']} - {x['Cargo']}", axis=1)
-                vaga_sel = st.selectbox("Vaga *", options=vagas_disponiveis["Opcao"].tolist(), key="vaga_sel")
-                try:
-                    vaga_id = vaga_sel.split(" - ")[0].strip()
-                except Exception:
-                    vaga_id = None
+                vaga_id = seletor_com_busca("Vaga *", "vagas_disponiveis", "vaga_sel", "ID, cliente ou cargo")
 
                 with st.form("form_candidato", enter_to_submit=False):
                     nome = st.text_input("Nome *")
                     telefone = st.text_input("Telefone *")
-                    recrutador = st.selectbox("Recrutador *", options=RECRUTADORES_PADRAO)
+                    recrutador = seletor_recrutador("candidato_recrutador")
                     submitted = st.form_submit_button("✅ Salvar Candidato", use_container_width=True)
 
                     if submitted:
                         if not nome or not telefone or not recrutador or not vaga_id:
                             st.warning("⚠️ Preencha todos os campos obrigatórios e selecione uma vaga.")
                         else:
-                            vaga_row = st.session_state.vagas_df[st.session_state.vagas_df["ID"] == vaga_id].iloc[0]
-                            cliente_nome = vaga_row["Cliente"]
-                            cargo_nome = vaga_row["Cargo"]
-
-                            prox_id = str(next_id(st.session_state.candidatos_df, "ID"))
-                            novo = pd.DataFrame([{
-                                "ID": prox_id,
-                                "Cliente": cliente_nome,
-                                "Cargo": cargo_nome,
-                                "Nome": nome,
-                                "Telefone": telefone,
-                                "Recrutador": recrutador,
-                                "Status": "Enviado",
-                                "Data de Início": "",
-                            }])
-
-                            st.session_state.candidatos_df = pd.concat([st.session_state.candidatos_df, novo], ignore_index=True)
-                            save_csv(st.session_state.candidatos_df, CANDIDATOS_CSV)
-                            registrar_log("Candidatos", "Criar", item_id=prox_id, detalhe=f"Candidato criado (ID {prox_id}).")
-                            atualizar_vaga_data_atualizacao(cliente_nome, cargo_nome)
+                            try:
+                                prox_id = servicos.criar_registros("candidatos", [{
+                                    "VagaID": vaga_id,
+                                    "Nome": nome,
+                                    "Telefone": telefone,
+                                    "Recrutador": recrutador,
+                                }], st.session_state.usuario)[0]
+                            except ErroValidacao as e:
+                                st.error(str(e))
+                                st.stop()
                             st.success(f"✅ Candidato cadastrado com sucesso! ID: {prox_id}")
+                            del st.session_state["candidato_recrutador"]
                             st.rerun()
 
         with col_info:
             st.subheader("Vaga Selecionada")
             if 'vaga_id' in locals() and vaga_id:
                 try:
-                    vaga_row = st.session_state.vagas_df[st.session_state.vagas_df["ID"] == vaga_id].iloc[0]
+                    vaga_row = vagas_atuais[vagas_atuais["ID"] == vaga_id].iloc[0]
                     st.markdown(
                         f"- **Status:** {vaga_row['Status']}\n"
                         f"- **Cliente:** {vaga_row['Cliente']}\n"
@@ -1050,43 +1175,20 @@ def tela_candidatos():
     # >>> CORREÇÃO AQUI <<<
     # =======================
     st.subheader("📋 Candidatos Cadastrados")
-    df_list = df.copy()  # usar o DF FILTRADO
+    df_list = df  # usar o DF FILTRADO
     if df_list.empty:
         st.info("Nenhum candidato cadastrado.")
     else:
-        download_button(df_list, "candidatos.csv", "⬇️ Baixar Lista de Candidatos")
+        download_button(df_list[CANDIDATOS_COLS], "candidatos.csv", "⬇️ Baixar Lista de Candidatos")
         show_table(df_list, CANDIDATOS_COLS, "candidatos_df", CANDIDATOS_CSV)
+        acoes_em_lote(df_list, "candidatos_df")
+
+    mostrar_arquivados("candidatos", CANDIDATOS_COLS, lambda arq: _filtrar_igualdade(arq, filtros))
 
 # ============================================================
 # Comercial (Kanban ajustado — SOMENTE esta tela foi alterada)
 # ============================================================
 
-def _mover_status_comercial(item_id, direcao="+"):
-    """
-    Atualiza o Status do registro comercial conforme a direção:
-    direcao="+" -> próximo status no funil
-    direcao="-" -> status anterior
-    """
-    df = st.session_state.comercial_df.copy()
-    idx = df[df["ID"] == str(item_id)].index
-    if idx.empty:
-        return False
-    i = idx[0]
-    atual = df.at[i, "Status"]
-    if atual not in COMERCIAL_STATUS_OPCOES:
-        return False
-
-    pos = COMERCIAL_STATUS_OPCOES.index(atual)
-    novo_pos = pos + (1 if direcao == "+" else -1)
-    if 0 <= novo_pos < len(COMERCIAL_STATUS_OPCOES):
-        novo = COMERCIAL_STATUS_OPCOES[novo_pos]
-        df.at[i, "Status"] = novo
-        st.session_state.comercial_df = df
-        save_csv(df, COMERCIAL_CSV)
-        registrar_log("Comercial", "Editar", item_id=df.at[i, "ID"], campo="Status", valor_anterior=atual, valor_novo=novo, detalhe=f"Movido no funil ({'→' if direcao=='+' else '←'})")
-        return True
-    return False
-
 def _badge_status(status):
     cores = {
         "Prospect": "#ca8a04",           # âmbar
@@ -1139,16 +1241,17 @@ def _card_comercial(reg):
         a1, a2, a3, a4 = st.columns([0.8, 0.8, 0.8, 0.8])
         with a1:
             if st.button("⮜", key=f"left_{reg['ID']}", use_container_width=True):
-                _mover_status_comercial(reg["ID"], "-")
+                servicos.mover_status_comercial([reg["ID"]], "-", st.session_state.usuario)
                 st.rerun()
         with a2:
             if st.button("⮞", key=f"right_{reg['ID']}", use_container_width=True):
-                _mover_status_comercial(reg["ID"], "+")
+                servicos.mover_status_comercial([reg["ID"]], "+", st.session_state.usuario)
                 st.rerun()
         with a3:
             if st.button("✏", key=f"edit_card_{reg['ID']}", use_container_width=True):
                 st.session_state.edit_mode = "comercial_df"
-                st.session_state.edit_record = dict(reg)
+                st.session_state.edit_record = registro_atual("comercial", reg["ID"])
+                st.session_state.edit_conflito = None
                 st.rerun()
         with a4:
             if st.button("🗑", key=f"del_card_{reg['ID']}", use_container_width=True):
@@ -1165,23 +1268,25 @@ def tela_comercial():
     st.markdown("Acompanhe o fluxo através do funil no formato **Kanban** (com contadores e cores por status) ou visualize em **Lista**. Os cards são colapsáveis para reduzir poluição visual.")
 
     # ===== Filtros globais =====
-    df_all = st.session_state.comercial_df.copy()
+    df_all = carregar_tabela("comercial")
+    barra_visoes("comercial", FILTROS_COMERCIAL)
     col1, col2, col3 = st.columns([1, 1, 1])
     with col1:
-        filtro_empresa = st.text_input("🔎 Buscar por Empresa")
+        filtro_empresa = st.text_input("🔎 Buscar por Empresa", key=_chave_filtro("comercial", "Empresa"))
     with col2:
         status_opts = ["(todos)"] + COMERCIAL_STATUS_OPCOES
-        filtro_status = st.selectbox("Filtrar por Status", status_opts, index=0)
+        _manter_opcao(_chave_filtro("comercial", "Status"), status_opts)
+        filtro_status = st.selectbox("Filtrar por Status", status_opts, index=0, key=_chave_filtro("comercial", "Status"))
     with col3:
-        filtro_cidade = st.text_input("Filtrar por Cidade")
+        filtro_cidade = st.text_input("Filtrar por Cidade", key=_chave_filtro("comercial", "Cidade"))
+    periodo = filtro_periodo("comercial")
 
-    df_filtros = df_all.copy()
-    if filtro_empresa:
-        df_filtros = df_filtros[df_filtros["Empresa"].str.contains(filtro_empresa, case=False, na=False)]
-    if filtro_status != "(todos)":
-        df_filtros = df_filtros[df_filtros["Status"] == filtro_status]
-    if filtro_cidade:
-        df_filtros = df_filtros[df_filtros["Cidade"].str.contains(filtro_cidade, case=False, na=False)]
+    visao = visao_ativa("comercial", {"Empresa": filtro_empresa, "Status": filtro_status, "Cidade": filtro_cidade})
+    if visao:
+        df_filtros = visoes.abrir(st.session_state.usuario, "comercial", visao)
+    else:
+        df_filtros = _filtrar_comercial(df_all, filtro_empresa, filtro_status, filtro_cidade)
+    df_filtros = indices.filtrar_periodo("comercial", df_filtros, *periodo)
 
     # ===== Importação (somente admin) =====
     if st.session_state.usuario in ["admin"]:
@@ -1192,31 +1297,10 @@ def tela_comercial():
                 key="upload_comercial"
             )
             if arquivo is not None:
-                try:
-                    if arquivo.name.lower().endswith('.csv'):
-                        df_upload = pd.read_csv(arquivo, dtype=str)
-                    else:
-                        df_upload = pd.read_excel(arquivo, dtype=str)
-
-                    missing = [c for c in COMERCIAL_COLS if c not in df_upload.columns]
-                    if missing:
-                        st.error(f"Colunas faltando: {missing}")
-                    else:
-                        df_upload = df_upload[COMERCIAL_COLS].fillna("")
-                        base = st.session_state.comercial_df.copy()
-                        combined = pd.concat([base, df_upload], ignore_index=True)
-                        combined = combined.drop_duplicates(subset=["ID"], keep="first")
-                        st.session_state.comercial_df = combined
-                        save_csv(combined, COMERCIAL_CSV)
-                        registrar_log("Comercial", "Importar", detalhe=f"Importação de comercial via upload ({arquivo.name}).")
-                        st.success("✅ Registros comerciais importados com sucesso!")
-                        st.rerun()
-                except Exception as e:
-                    st.error(f"Erro ao processar o arquivo: {e}")
+                importar_em_segundo_plano("comercial", arquivo)
 
     # ===== Cadastro de novo registro comercial =====
     with st.expander("➕ Cadastrar Novo (Comercial)", expanded=False):
-        data_hoje = date.today().strftime("%d/%m/%Y")
         with st.form("form_comercial", enter_to_submit=False):
             colA, colB = st.columns(2)
             with colA:
@@ -1229,30 +1313,22 @@ def tela_comercial():
                 telefone = st.text_input("Telefone *")
                 email = st.text_input("E-mail *")
                 produto = st.text_input("Produto *")  # obrigatório
-                status_inicial = "Prospect"          # travado no cadastro
 
             submitted = st.form_submit_button("✅ Salvar Registro", use_container_width=True)
             if submitted:
                 if not all([empresa, cidade, uf, nome, telefone, email, canal, produto]):
                     st.warning("⚠️ Preencha todos os campos obrigatórios.")
                 else:
-                    prox_id = str(next_id(st.session_state.comercial_df, "ID"))
-                    novo = pd.DataFrame([{
-                        "ID": prox_id,
-                        "Data": data_hoje,
+                    prox_id = servicos.criar_registros("comercial", [{
                         "Empresa": empresa,
                         "Cidade": cidade,
-                        "UF": uf.upper(),
+                        "UF": uf,
                         "Nome": nome,
                         "Telefone": telefone,
                         "E-mail": email,
                         "Produto": produto,
                         "Canal": canal,
-                        "Status": status_inicial
-                    }])
-                    st.session_state.comercial_df = pd.concat([st.session_state.comercial_df, novo], ignore_index=True)
-                    save_csv(st.session_state.comercial_df, COMERCIAL_CSV)
-                    registrar_log("Comercial", "Criar", item_id=prox_id, detalhe=f"Registro comercial criado (ID {prox_id}) com status 'Prospect'.")
+                    }], st.session_state.usuario)[0]
                     st.success(f"✅ Registro comercial cadastrado com sucesso! ID: {prox_id}")
                     st.rerun()
 
@@ -1265,7 +1341,7 @@ def tela_comercial():
         for i, status in enumerate(COMERCIAL_STATUS_OPCOES):
             with cols[i]:
                 # Registros desta coluna (após filtros globais)
-                col_df = df_filtros[df_filtros["Status"] == status].copy()
+                col_df = df_filtros[df_filtros["Status"] == status]
 
                 # Cabeçalho com contador
                 st.markdown(
@@ -1278,11 +1354,10 @@ def tela_comercial():
                     st.caption("—")
                 else:
                     # Ordenar por Data (mais recente primeiro, quando possível)
-                    try:
-                        col_df["_ord"] = pd.to_datetime(col_df["Data"], format="%d/%m/%Y", errors="coerce")
-                        col_df = col_df.sort_values("_ord", ascending=False)
-                    except Exception:
-                        pass
+                    col_df = col_df.sort_values(
+                        "Data", ascending=False,
+                        key=lambda s: pd.to_datetime(s, format="%d/%m/%Y", errors="coerce"),
+                    )
 
                     for _, reg in col_df.iterrows():
                         _card_comercial(reg)
@@ -1291,31 +1366,107 @@ def tela_comercial():
 
     with tab_lista:
         st.subheader("📋 Oportunidades Comerciais (Lista)")
-        df_list = df_filtros.copy()
+        df_list = df_filtros
         if df_list.empty:
             st.info("Nenhum registro comercial cadastrado.")
         else:
-            download_button(df_list, "comercial.csv", "⬇️ Baixar Lista Comercial")
+            download_button(df_list[COMERCIAL_COLS], "comercial.csv", "⬇️ Baixar Lista Comercial")
             show_table(df_list[COMERCIAL_COLS], COMERCIAL_COLS, "comercial_df", COMERCIAL_CSV)
+            acoes_em_lote(df_list, "comercial_df")
+
+        mostrar_arquivados(
+            "comercial", COMERCIAL_COLS,
+            lambda arq: _filtrar_comercial(arq, filtro_empresa, filtro_status, filtro_cidade),
+        )
 
 # ============================================================
 # Refresh de dados (botão topo)
 # ============================================================
 
 def refresh_data():
-    st.session_state.clientes_df = load_csv(CLIENTES_CSV, CLIENTES_COLS)
-    st.session_state.vagas_df = load_csv(VAGAS_CSV, VAGAS_COLS)
-    st.session_state.candidatos_df = load_csv(CANDIDATOS_CSV, CANDIDATOS_COLS)
-    st.session_state.comercial_df = load_csv(COMERCIAL_CSV, COMERCIAL_COLS)
+    servicos.invalidar_cache()
     registrar_log("Sistema", "Refresh", detalhe="Dados recarregados via botão Refresh.")
 
+# ============================================================
+# Heartbeat (substitui o st_autorefresh de página inteira)
+# ============================================================
+
+@st.fragment(run_every=HEARTBEAT_SEGUNDOS)
+def heartbeat():
+    """
+    Reexecuta somente este fragmento a cada HEARTBEAT_SEGUNDOS (mantém a sessão
+    e o servidor ativos). A página inteira só é reexecutada quando alguma tabela
+    mudou desde a última execução completa — e nunca no meio de uma edição.
+    """
+    usar_inquilino_da_sessao()
+    editando = st.session_state.edit_mode or st.session_state.confirm_delete["df_name"]
+    if not editando and versao_dados() != st.session_state.get("versao_dados_vista"):
+        st.rerun(scope="app")
+    st.caption(f"💓 {datetime.now().strftime('%H:%M:%S')}")
+
+# ============================================================
+# Painel de tarefas em segundo plano
+# ============================================================
+
+def _linha_tarefa(t):
+    icone = {tarefas.STATUS_CONCLUIDA: "✅", tarefas.STATUS_ERRO: "❌", tarefas.STATUS_INTERROMPIDA: "⚠️"}.get(t["Status"], "⏳")
+    st.markdown(f"{icone} **#{t['ID']} {t['Descricao']}** — {t['Status']}")
+    if t["Status"] in tarefas.TAREFAS_STATUS_ATIVOS:
+        st.progress(int(t["Progresso"] or 0) / 100, text=t["Mensagem"] or t["Status"])
+        return
+    if t["Mensagem"]:
+        st.caption(t["Mensagem"])
+    caminho = t["Resultado"]
+    if t["Status"] == tarefas.STATUS_CONCLUIDA and caminho and os.path.exists(caminho):
+        # O arquivo só é lido quando o usuário clica em baixar
+        def ler(caminho=caminho):
+            with open(caminho, "rb") as f:
+                return f.read()
+        st.download_button("⬇️ Baixar", data=ler, file_name=os.path.basename(caminho).split("_", 1)[-1],
+                           key=f"baixar_tarefa_{t['ID']}", on_click="ignore")
+
+@st.fragment(run_every=TAREFAS_POLL_SEGUNDOS)
+def acompanhar_tarefas():
+    """
+    Consulta o progresso a cada TAREFAS_POLL_SEGUNDOS reexecutando só este fragmento.
+    Quando as tarefas do usuário terminam, a página inteira é recarregada
+    (para exibir os dados importados/excluídos), exceto no meio de uma edição.
+    """
+    usar_inquilino_da_sessao()
+    ativas = tarefas.ativas(st.session_state.usuario)
+    editando = st.session_state.edit_mode or st.session_state.confirm_delete["df_name"]
+    if not ativas and not editando:
+        st.rerun(scope="app")
+    with st.expander(f"⏳ Tarefas em andamento ({len(ativas)})", expanded=True):
+        for t in ativas:
+            _linha_tarefa(t)
+        if not ativas:
+            st.caption("Tarefas concluídas — a tela será atualizada ao final da edição.")
+
+def painel_tarefas():
+    if tarefas.ativas(st.session_state.usuario):
+        acompanhar_tarefas()
+        return
+    recentes = tarefas.listar(st.session_state.usuario, limite=5)
+    if recentes:
+        with st.expander("📋 Tarefas recentes", expanded=False):
+            for t in recentes:
+                _linha_tarefa(t)
+
 # ============================================================
 # Topbar/Router (mantido)
 # ============================================================
 
 if st.session_state.logged_in:
-    st.image("https://parmaconsultoria.com.br/wp-content/uploads/2023/10/logo-parma-1.png", width=180)
-    st.caption(f"Usuário: {st.session_state.usuario}")
+    mostrar_logo(180)
+    st.caption(f"Usuário: {st.session_state.usuario}" + (f" · Unidade: {st.session_state.inquilino}" if st.session_state.inquilino else ""))
+
+    # Versão dos dados que esta execução completa está exibindo
+    st.session_state.versao_dados_vista = versao_dados()
+    if st.session_state.usuario == "admin" and st.session_state.get("ping_auto", False):
+        heartbeat()
+    painel_tarefas()
+    oferecer_desfazer()
 
     page_label_map = {
         "menu": "Menu Principal",
@@ -1332,7 +1483,7 @@ if st.session_state.logged_in:
 
     ordered_page_keys = ["menu", "clientes", "vagas", "candidatos", "comercial", "logs"]
     allowed_pages = [p for p in ordered_page_keys if p in perms]
-    labels = [page_label_map[p] for p in allowed_pages]
+    labels = [rotulo_vagas(page_label_map[p]) if p == "vagas" else page_label_map[p] for p in allowed_pages]
 
     try:
         index_initial = allowed_pages.index(st.session_state.page)
@@ -1342,7 +1493,7 @@ if st.session_state.logged_in:
     total_buttons = len(labels) + 2
     menu_cols = st.columns([1] * total_buttons)
     for i, label in enumerate(labels):
-        if menu_cols[i].button(label, use_container_width=True):
+        if menu_cols[i].button(label, key=f"menu_{allowed_pages[i]}", use_container_width=True):
             st.session_state.page = allowed_pages[i]
             st.rerun()
 
@@ -1353,6 +1504,7 @@ if st.session_state.logged_in:
     if menu_cols[-1].button("Sair", use_container_width=True):
         registrar_log("Login", "Logout", detalhe=f"Usuário {st.session_state.usuario} saiu do sistema.")
         st.session_state.logged_in = False
+        st.session_state.inquilino = None
         st.session_state.page = "login"
         st.rerun()
 
@@ -1380,7 +1532,7 @@ if st.session_state.logged_in:
             st.warning("⚠️ Você não tem permissão para acessar esta página.")
 
     elif current_page == "comercial":
-        if "comercial" in perms and st.session_state.usuario in ["admin", "andre", "ricardo"]:
+        if "comercial" in perms and st.session_state.usuario in USUARIOS_COMERCIAL:
             tela_comercial()
         else:
             st.warning("⚠️ Você não tem permissão para acessar esta página.")
@@ -1391,6 +1543,8 @@ if st.session_state.logged_in:
             def tela_logs():
                 st.header("📜 Logs do Sistema")
                 st.markdown("Visualize todas as ações realizadas no sistema.")
+                with st.expander("📈 Indicadores de status", expanded=False):
+                    mostrar_indicadores_status()
                 df_logs = carregar_logs()
                 if df_logs.empty:
                     st.info("Nenhum log registrado ainda.")
@@ -1403,7 +1557,7 @@ if st.session_state.logged_in:
                     with col3:
                         usuario_f = st.selectbox("Filtrar por Usuário", options=["(todos)"] + sorted(df_logs["Usuario"].dropna().unique().tolist()))
                     busca = st.text_input("🔎 Buscar (Campo/Detalhe/ItemID)")
-                    dfv = df_logs.copy()
+                    dfv = df_logs
                     if aba_f != "(todas)":
                         dfv = dfv[dfv["Aba"] == aba_f]
                     if acao_f != "(todas)":
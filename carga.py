@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Teste de carga do app (sessões simultâneas)
+# ============================================================
+# Simula N recrutadores usando o app.py ao mesmo tempo, cada um numa
+# sessão do streamlit.testing (AppTest). Cada sessão roda em seu próprio
+# processo (o AppTest troca o Runtime global do Streamlit a cada rerun,
+# então duas sessões na mesma thread-pool se atrapalham), todas sobre os
+# mesmos CSVs e disputando as mesmas travas de arquivo, como vários
+# workers do app. Cada sessão faz login com um usuário de USUARIOS e
+# executa uma mistura de ações (filtrar, cadastrar candidato, editar
+# vaga, mover card no Kanban, abrir os Logs).
+#
+# Os dados são sintéticos, gerados num diretório temporário (os CSVs do
+# projeto não são tocados).
+#
+#   python carga.py --sessoes 1 2 4 8 --acoes 15
+#   python carga.py --sessoes 4 --vagas 20000 --candidatos 50000 --json resultado.json
+#
+# Relatório por N: reruns, reruns/s, latência p50/p95/p99 por rerun,
+# erros e espera nas travas de escrita (servicos.estatisticas_travas).
+# ============================================================
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import multiprocessing
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import streamlit.logger
+from streamlit import config as st_config
+
+import servicos
+from servicos import (
+    TABELAS, COLUNA_VERSAO, USUARIOS, USUARIOS_COMERCIAL, RECRUTADORES_PADRAO,
+    VAGAS_STATUS_OPCOES, CANDIDATOS_STATUS_OPCOES, COMERCIAL_STATUS_OPCOES,
+)
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+CARGOS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cargos.csv.csv")
+TIMEOUT_RERUN = 120
+
+# Ação -> peso na mistura (ações sem permissão para o usuário são sorteadas de novo)
+MISTURA_ACOES = {
+    "filtrar": 5,
+    "criar_candidato": 2,
+    "editar_vaga": 2,
+    "mover_card": 2,
+    "abrir_logs": 1,
+}
+
+CIDADES = [("RIBEIRAO PRETO", "SP"), ("FRANCA", "SP"), ("ARARAQUARA", "SP"), ("BARRETOS", "SP"),
+           ("LONDRINA", "PR"), ("MARINGA", "PR"), ("UBERLANDIA", "MG"), ("CAMPINAS", "SP")]
+
+# ============================================================
+# Dados sintéticos
+# ============================================================
+
+def _cargos():
+    if os.path.exists(CARGOS_CSV):
+        return pd.read_csv(CARGOS_CSV, dtype=str)["cargo"].dropna().tolist()
+    return ["VENDEDOR", "ANALISTA DE RH", "AUXILIAR ADMINISTRATIVO", "RECEPCIONISTA"]
+
+def _datas(rng, n, dias=365):
+    hoje = date.today()
+    return [(hoje - timedelta(days=rng.randrange(dias))).strftime("%d/%m/%Y") for _ in range(n)]
+
+def gerar_dados(clientes, vagas, candidatos, comercial, semente=42):
+    """Grava CSVs sintéticos no diretório atual (IDs sequenciais, Versao 1)."""
+    rng = random.Random(semente)
+    cargos = _cargos()
+
+    cidades = [rng.choice(CIDADES) for _ in range(clientes)]
+    df_clientes = pd.DataFrame({
+        "ID": [str(i) for i in range(1, clientes + 1)],
+        "Data": _datas(rng, clientes),
+        "Cliente": [f"CLIENTE {i:05d}" for i in range(1, clientes + 1)],
+        "Nome": [f"Contato {i}" for i in range(1, clientes + 1)],
+        "Cidade": [c for c, _ in cidades],
+        "UF": [uf for _, uf in cidades],
+        "Telefone": [f"(16) 9{rng.randrange(10**7, 10**8)}" for _ in range(clientes)],
+        "E-mail": [f"contato{i}@cliente.com.br" for i in range(1, clientes + 1)],
+    })
+
+    salarios = [rng.randrange(1500, 8000, 50) for _ in range(vagas)]
+    cliente_ids = rng.choices(range(clientes), k=vagas)
+    df_vagas = pd.DataFrame({
+        "ID": [str(i) for i in range(1, vagas + 1)],
+        "Cliente": df_clientes["Cliente"].iloc[cliente_ids].values,
+        "Status": rng.choices(VAGAS_STATUS_OPCOES, weights=[6, 1, 1, 3, 1, 1], k=vagas),
+        "Data de Abertura": _datas(rng, vagas),
+        "Cargo": rng.choices(cargos, k=vagas),
+        "Recrutador": rng.choices(RECRUTADORES_PADRAO, k=vagas),
+        "Atualização": _datas(rng, vagas, 60),
+        "Salário 1": [str(s) for s in salarios],
+        "Salário 2": [str(s + rng.randrange(0, 1000, 100)) for s in salarios],
+        "ClienteID": df_clientes["ID"].iloc[cliente_ids].values,
+    })
+
+    origem = df_vagas.sample(n=candidatos, replace=True, random_state=semente)
+    df_candidatos = pd.DataFrame({
+        "ID": [str(i) for i in range(1, candidatos + 1)],
+        "Cliente": origem["Cliente"].values,
+        "Cargo": origem["Cargo"].values,
+        "Nome": [f"Candidato {i}" for i in range(1, candidatos + 1)],
+        "Telefone": [f"(16) 9{rng.randrange(10**7, 10**8)}" for _ in range(candidatos)],
+        "Recrutador": origem["Recrutador"].values,
+        "Status": rng.choices(CANDIDATOS_STATUS_OPCOES, k=candidatos),
+        "Data de Início": _datas(rng, candidatos, 90),
+        "VagaID": origem["ID"].values,
+    })
+
+    cidades = [rng.choice(CIDADES) for _ in range(comercial)]
+    df_comercial = pd.DataFrame({
+        "ID": [str(i) for i in range(1, comercial + 1)],
+        "Data": _datas(rng, comercial),
+        "Empresa": [f"EMPRESA {i:05d}" for i in range(1, comercial + 1)],
+        "Cidade": [c for c, _ in cidades],
+        "UF": [uf for _, uf in cidades],
+        "Nome": [f"Lead {i}" for i in range(1, comercial + 1)],
+        "Telefone": [f"(16) 3{rng.randrange(10**6, 10**7)}" for _ in range(comercial)],
+        "E-mail": [f"lead{i}@empresa.com.br" for i in range(1, comercial + 1)],
+        "Produto": rng.choices(["Recrutamento", "Treinamento", "Consultoria"], k=comercial),
+        "Canal": rng.choices(["Indicação", "Site", "Prospecção"], k=comercial),
+        "Status": rng.choices(COMERCIAL_STATUS_OPCOES, k=comercial),
+    })
+
+    for nome, df in [("clientes", df_clientes), ("vagas", df_vagas), ("candidatos", df_candidatos), ("comercial", df_comercial)]:
+        df[COLUNA_VERSAO] = "1"
+        servicos.save_csv(df, servicos.caminho(TABELAS[nome][0]))
+    servicos.invalidar_cache()
+
+# ============================================================
+# Sessão simulada
+# ============================================================
+
+class SessaoSimulada:
+    """Uma sessão do app: login pelo formulário e uma sequência de ações sorteadas."""
+
+    def __init__(self, usuario, rng):
+        from streamlit.testing.v1 import AppTest
+        self.usuario = usuario
+        self.rng = rng
+        self.at = AppTest.from_file(APP, default_timeout=TIMEOUT_RERUN)
+        self.medicoes = []  # (ação, segundos do rerun, erro)
+
+    # ---------- utilitários ----------
+    def _rerun(self, acao, preparar=None):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        erro = ""
+        try:
+            self.at.run()
+            if self.at.exception:
+                erro = self.at.exception[0].value.splitlines()[0]
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        self.medicoes.append((acao, time.perf_counter() - inicio, erro))
+        return not erro
+
+    def _ir_para(self, acao, pagina):
+        self.at.session_state.page = pagina
+        self.at.session_state.edit_mode = None
+        return self._rerun(acao)
+
+    def _widget(self, lista, **filtro):
+        for w in lista:
+            if all(getattr(w, k, None) == v for k, v in filtro.items()):
+                return w
+        return None
+
+    def login(self):
+        self._rerun("abrir_app")
+        self.at.text_input[0].input(self.usuario)
+        self.at.text_input[1].input(USUARIOS[self.usuario]["senha"])
+        return self._rerun("login", self.at.button[0].click)
+
+    def pode(self, acao):
+        perms = USUARIOS[self.usuario]["permissoes"]
+        if acao == "filtrar":
+            return "vagas" in perms or "candidatos" in perms
+        if acao == "criar_candidato":
+            return "candidatos" in perms
+        if acao == "editar_vaga":
+            return "vagas" in perms
+        if acao == "mover_card":
+            return "comercial" in perms and self.usuario in USUARIOS_COMERCIAL
+        return "logs" in perms
+
+    # ---------- ações ----------
+    def filtrar(self):
+        perms = USUARIOS[self.usuario]["permissoes"]
+        tabela = self.rng.choice([t for t in ("vagas", "candidatos") if t in perms])
+        if not self._ir_para("filtrar", tabela):
+            return
+        col = self.rng.choice(["Cliente", "Recrutador", "Status"])
+        seletor = self.at.selectbox(key=f"filtro_{tabela}_{col}")
+        self._rerun("filtrar", lambda: seletor.select_index(self.rng.randrange(len(seletor.options))))
+
+    def criar_candidato(self):
+        if not self._ir_para("criar_candidato", "candidatos"):
+            return
+        busca = self.at.text_input(key="vaga_sel_busca")
+        self._rerun("criar_candidato", lambda: busca.input(self.rng.choice(["vend", "analista", "aux", ""])))
+        n = self.rng.randrange(10**6)
+        nome = self._widget(self.at.text_input, label="Nome *")
+        telefone = self._widget(self.at.text_input, label="Telefone *")
+        salvar = self._widget(self.at.button, label="✅ Salvar Candidato")
+        if nome is None or salvar is None:
+            return
+        nome.input(f"Carga {n}")
+        telefone.input(f"(16) 9{n:08d}")
+        self._rerun("criar_candidato", salvar.click)
+
+    def editar_vaga(self):
+        if not self._ir_para("editar_vaga", "vagas"):
+            return
+        seletor = self.at.selectbox(key="sel_vagas_df")
+        if not seletor.options:
+            return
+        # As opções vêm formatadas ("ID - rótulo"); o valor do seletor é o ID
+        vaga_id = self.rng.choice(seletor.options).split(" - ")[0]
+        if not self._rerun("editar_vaga", lambda: seletor.set_value(vaga_id)):
+            return
+        self._rerun("editar_vaga", self.at.button(key="edit_vagas_df").click)
+        status = self._widget(self.at.selectbox, label="Status")
+        salvar = self._widget(self.at.button, label="✅ Salvar Alterações")
+        if status is None or salvar is None:
+            return
+        status.set_value(self.rng.choice(VAGAS_STATUS_OPCOES))
+        self._rerun("editar_vaga", salvar.click)
+
+    def mover_card(self):
+        if not self._ir_para("mover_card", "comercial"):
+            return
+        botoes = [b for b in self.at.button if b.key and (b.key.startswith("right_") or b.key.startswith("left_"))]
+        if botoes:
+            self._rerun("mover_card", self.rng.choice(botoes).click)
+
+    def abrir_logs(self):
+        self._ir_para("abrir_logs", "logs")
+
+    def executar(self, acoes):
+        if not self.login():
+            return self.medicoes
+        nomes = list(MISTURA_ACOES)
+        pesos = list(MISTURA_ACOES.values())
+        feitas = 0
+        while feitas < acoes:
+            acao = self.rng.choices(nomes, weights=pesos)[0]
+            if not self.pode(acao):
+                continue
+            try:
+                getattr(self, acao)()
+            except Exception as e:
+                # Tela diferente da esperada (widget ausente/desabilitado): conta como erro da ação
+                self.medicoes.append((acao, 0.0, f"{type(e).__name__}: {e}"))
+            feitas += 1
+        return self.medicoes
+
+# ============================================================
+# Rodadas e relatório
+# ============================================================
+
+def _percentil(valores, p):
+    return float(pd.Series(valores).quantile(p)) if valores else float("nan")
+
+def _silenciar_streamlit():
+    # Avisos do modo "bare" e de depreciação a cada rerun; a opção vale para as releituras da config
+    st_config.set_option("logger.level", "error")
+    streamlit.logger.set_log_level("error")
+
+def _sessao(diretorio, usuario, semente, acoes, largada):
+    # Processo de uma sessão: (medições, início, fim, estatísticas das travas)
+    os.chdir(diretorio)
+    _silenciar_streamlit()
+    sessao = SessaoSimulada(usuario, random.Random(semente))
+    largada.wait()
+    inicio = time.time()
+    medicoes = sessao.executar(acoes)
+    return medicoes, inicio, time.time(), servicos.estatisticas_travas()
+
+def _processo(fila, *args):
+    try:
+        fila.put(_sessao(*args))
+    except Exception as e:
+        fila.put(([("sessao", 0.0, f"{type(e).__name__}: {e}")], time.time(), time.time(), {}))
+
+def rodada(n_sessoes, acoes, semente):
+    """N sessões simultâneas (usuários em rodízio, um processo cada); devolve o resumo da rodada."""
+    usuarios = list(USUARIOS)
+    contexto = multiprocessing.get_context("spawn")
+    largada = contexto.Barrier(n_sessoes)
+    fila = contexto.Queue()
+    processos = [
+        contexto.Process(target=_processo, args=(fila, os.getcwd(), usuarios[i % len(usuarios)], semente + i, acoes, largada))
+        for i in range(n_sessoes)
+    ]
+    for p in processos:
+        p.start()
+    resultados = [fila.get() for _ in processos]
+    for p in processos:
+        p.join()
+
+    medicoes = [m for r in resultados for m in r[0]]
+    duracao = max(r[2] for r in resultados) - min(r[1] for r in resultados)
+    travas = {}
+    for r in resultados:
+        for path, (n, total, maior) in r[3].items():
+            soma = travas.setdefault(path, [0, 0.0, 0.0])
+            soma[0] += n
+            soma[1] += total
+            soma[2] = max(soma[2], maior)
+
+    tempos = [s for _, s, _ in medicoes]
+    erros = [e for _, _, e in medicoes if e]
+    por_acao = {}
+    for acao, s, _ in medicoes:
+        por_acao.setdefault(acao, []).append(s)
+    return {
+        "sessoes": n_sessoes,
+        "reruns": len(medicoes),
+        "duracao_s": round(duracao, 2),
+        "reruns_por_s": round(len(medicoes) / duracao, 2) if duracao else 0.0,
+        "p50_ms": round(1000 * _percentil(tempos, 0.5), 1),
+        "p95_ms": round(1000 * _percentil(tempos, 0.95), 1),
+        "p99_ms": round(1000 * _percentil(tempos, 0.99), 1),
+        "erros": len(erros),
+        "exemplos_erro": sorted(set(erros))[:3],
+        "p95_por_acao_ms": {a: round(1000 * _percentil(v, 0.95), 1) for a, v in sorted(por_acao.items())},
+        "travas": {
+            os.path.basename(path): {"aquisicoes": n, "espera_total_ms": round(1000 * total, 1), "espera_max_ms": round(1000 * maior, 1)}
+            for path, (n, total, maior) in sorted(travas.items())
+        },
+    }
+
+def imprimir(resultados):
+    print(f"{'Sessões':>8} {'Reruns':>7} {'Reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Erros':>6} {'Espera travas ms (máx)':>24}")
+    for r in resultados:
+        espera = sum(t["espera_total_ms"] for t in r["travas"].values())
+        maior = max((t["espera_max_ms"] for t in r["travas"].values()), default=0.0)
+        print(f"{r['sessoes']:>8} {r['reruns']:>7} {r['reruns_por_s']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['erros']:>6} {f'{espera:.0f} ({maior:.0f})':>24}")
+    for r in resultados:
+        print(f"\nN={r['sessoes']} — p95 por ação (ms): {r['p95_por_acao_ms']}")
+        for arquivo, t in r["travas"].items():
+            print(f"  trava {arquivo}: {t['aquisicoes']} aquisições, espera total {t['espera_total_ms']} ms, máx {t['espera_max_ms']} ms")
+        for erro in r["exemplos_erro"]:
+            print(f"  erro: {erro}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do app com sessões simultâneas (AppTest)")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 2, 4, 8], help="valores de N (uma rodada por valor)")
+    parser.add_argument("--acoes", type=int, default=10, help="ações por sessão em cada rodada")
+    parser.add_argument("--clientes", type=int, default=300)
+    parser.add_argument("--vagas", type=int, default=2000)
+    parser.add_argument("--candidatos", type=int, default=5000)
+    parser.add_argument("--comercial", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--diretorio", help="onde gerar os dados (padrão: diretório temporário, apagado no fim)")
+    parser.add_argument("--json", help="grava os resultados também neste arquivo")
+    args = parser.parse_args(argv)
+    _silenciar_streamlit()
+
+    diretorio = args.diretorio or tempfile.mkdtemp(prefix="parma_carga_")
+    os.makedirs(diretorio, exist_ok=True)
+    original = os.getcwd()
+    destino_json = os.path.abspath(args.json) if args.json else None
+    os.chdir(diretorio)
+    try:
+        print(f"Gerando dados em {diretorio}: {args.clientes} clientes, {args.vagas} vagas, "
+              f"{args.candidatos} candidatos, {args.comercial} registros comerciais")
+        gerar_dados(args.clientes, args.vagas, args.candidatos, args.comercial, args.semente)
+        resultados = []
+        for n in args.sessoes:
+            print(f"Rodada com {n} sessão(ões) simultânea(s)...", flush=True)
+            resultados.append(rodada(n, args.acoes, args.semente))
+        print()
+        imprimir(resultados)
+        if destino_json:
+            with open(destino_json, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, ensure_ascii=False, indent=2)
+    finally:
+        os.chdir(original)
+        if not args.diretorio:
+            shutil.rmtree(diretorio, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Histórico de status (a partir do log)
+# ============================================================
+# Cada mudança de Status de Vagas, Candidatos e Comercial já fica em
+# logs.csv (ValorAnterior/ValorNovo). Este módulo mantém uma tabela
+# compacta de transições (historico_status.csv) processando o log de
+# forma incremental: um ponto de controle guarda até que byte do log
+# já foi lido, e cada atualização lê só o que foi acrescentado depois.
+# As consultas (tempo em cada estágio, tempo para fechar a vaga,
+# velocidade do funil) rodam sobre essa tabela, sem reler o log.
+# ============================================================
+
+import csv
+import io
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import servicos
+from servicos import LOGS_CSV, LOGS_COLS, TABELAS, STATUS_OPCOES, ErroValidacao
+
+HISTORICO_CSV = "historico_status.csv"
+HISTORICO_PONTO_JSON = "historico_status.json"
+# Posicao = byte do log em que começava o lote processado (descarta lotes sem ponto de controle gravado)
+HISTORICO_COLS = ["Posicao", "DataHora", "Usuario", "Tabela", "ID", "De", "Para"]
+
+TABELAS_COM_STATUS = ["vagas", "candidatos", "comercial"]
+_TABELA_POR_ABA = {TABELAS[nome][2]: nome for nome in TABELAS_COM_STATUS}
+STATUS_PREENCHIDA = "Fechada"
+# Tabelas cujo STATUS_OPCOES é um funil ordenado (avançar = ir para um status posterior)
+FUNIS = ["comercial"]
+
+_trava = threading.Lock()
+# Por inquilino (ver servicos.cache_do_inquilino)
+_estado = servicos.cache_do_inquilino("historico.estado", lambda: {"posicao": 0, "inode": None, "df": None})
+_cache_estagios = servicos.cache_do_inquilino("historico.estagios")  # nome -> (posição do log, tabela atual, estágios)
+
+# ==============================
+# Processamento incremental do log
+# ==============================
+
+def _vazio():
+    df = pd.DataFrame(columns=HISTORICO_COLS)
+    df["Posicao"] = df["Posicao"].astype(int)
+    df["DataHora"] = pd.to_datetime(df["DataHora"])
+    return df
+
+def _ler_ponto():
+    try:
+        with open(servicos.caminho(HISTORICO_PONTO_JSON), encoding="utf-8") as f:
+            ponto = json.load(f)
+        return int(ponto["posicao"]), ponto.get("inode")
+    except (FileNotFoundError, ValueError, KeyError):
+        return 0, None
+
+def _gravar_ponto(posicao, inode):
+    destino = servicos.caminho(HISTORICO_PONTO_JSON)
+    tmp = f"{destino}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"posicao": posicao, "inode": inode}, f)
+    os.replace(tmp, destino)
+
+def _ler_historico(posicao):
+    # Linhas gravadas depois do último ponto de controle serão reprocessadas: ficam de fora
+    historico_csv = servicos.caminho(HISTORICO_CSV)
+    if not os.path.exists(historico_csv):
+        return _vazio()
+    # Leitura direta: load_csv trataria a coluna ID como tabela de cadastro e acrescentaria Versao
+    df = pd.read_csv(historico_csv, dtype=str, keep_default_na=False).reindex(columns=HISTORICO_COLS, fill_value="")
+    df["Posicao"] = pd.to_numeric(df["Posicao"], errors="coerce").fillna(posicao).astype(int)
+    df = df[df["Posicao"] < posicao].reset_index(drop=True)
+    df["DataHora"] = pd.to_datetime(df["DataHora"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    return df
+
+def _transicoes(trecho, posicao):
+    """Linhas de Status (e de criação, que marcam o início do primeiro estágio) do trecho novo do log."""
+    linhas = []
+    for reg in csv.reader(io.StringIO(trecho.decode("utf-8"))):
+        if len(reg) != len(LOGS_COLS) or reg == LOGS_COLS:
+            continue
+        reg = dict(zip(LOGS_COLS, reg))
+        nome = _TABELA_POR_ABA.get(reg["Aba"])
+        if nome is None or not reg["ItemID"]:
+            continue
+        if reg["Acao"] == "Criar":
+            de = para = ""
+        elif reg["Campo"] == "Status" and reg["ValorAnterior"] != reg["ValorNovo"]:
+            de, para = reg["ValorAnterior"], reg["ValorNovo"]
+        else:
+            continue
+        linhas.append([posicao, reg["DataHora"], reg["Usuario"], nome, reg["ItemID"], de, para])
+    return linhas
+
+def atualizar():
+    """
+    Processa o que foi acrescentado ao log desde o último ponto de controle e
+    devolve a tabela de transições. Sem novidades no log, custa um stat.
+    Se o log foi recriado (outro inode) ou encolheu, reconstrói do zero.
+    """
+    historico_csv, logs_csv = servicos.caminho(HISTORICO_CSV), servicos.caminho(LOGS_CSV)
+    try:
+        info = os.stat(logs_csv)
+    except FileNotFoundError:
+        return _estado["df"] if _estado["df"] is not None else _vazio()
+    with _trava:
+        if _estado["df"] is not None and (_estado["posicao"], _estado["inode"]) == (info.st_size, info.st_ino):
+            return _estado["df"]
+        with servicos.trava_arquivo(historico_csv):
+            # Outro processo pode ter avançado o ponto de controle: parte do que está no disco
+            posicao, inode = _ler_ponto()
+            if (posicao, inode) == (_estado["posicao"], _estado["inode"]) and _estado["df"] is not None:
+                df = _estado["df"]
+            else:
+                df = _ler_historico(posicao)
+            if inode != info.st_ino or posicao > info.st_size:
+                posicao, inode, df = 0, info.st_ino, _vazio()
+                servicos.save_csv(pd.DataFrame(columns=HISTORICO_COLS), historico_csv)
+
+            with servicos.trava_arquivo(logs_csv), open(logs_csv, "rb") as f:
+                f.seek(posicao)
+                trecho = f.read()
+            # Só registros completos (o último termina em \n); o resto fica para a próxima leitura
+            trecho = trecho[:trecho.rfind(b"\n") + 1]
+            linhas = _transicoes(trecho, posicao)
+            if linhas:
+                novo = not os.path.exists(historico_csv)
+                with open(historico_csv, "a", newline="", encoding="utf-8") as f:
+                    escritor = csv.writer(f, lineterminator="\n")
+                    if novo:
+                        escritor.writerow(HISTORICO_COLS)
+                    escritor.writerows(linhas)
+                novas = pd.DataFrame(linhas, columns=HISTORICO_COLS)
+                novas["DataHora"] = pd.to_datetime(novas["DataHora"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
+                df = pd.concat([df, novas], ignore_index=True) if len(df) else novas
+            posicao += len(trecho)
+            _gravar_ponto(posicao, inode)
+        _estado.update(posicao=posicao, inode=inode, df=df)
+        return df
+
+# ==============================
+# Estágios (intervalos em cada status)
+# ==============================
+
+def _estagios(nome):
+    """
+    Um intervalo por passagem em cada status: ID, Status, Entrada, Saida (NaT = ainda no estágio).
+    A entrada de um estágio é a transição (ou criação) anterior do mesmo registro; registros
+    criados antes do log existir não têm entrada conhecida no primeiro estágio.
+    """
+    if nome not in TABELAS_COM_STATUS:
+        raise ErroValidacao(f"Tabela sem histórico de status: {nome}")
+    df = atualizar()
+    atual = servicos.carregar_tabela(nome)
+    em_cache = _cache_estagios.get(nome)
+    if em_cache is not None and em_cache[0] == _estado["posicao"] and em_cache[1] is atual:
+        return em_cache[2]
+
+    t = df[df["Tabela"] == nome].sort_values("ID", kind="stable")
+    anterior = t.groupby("ID")["DataHora"].shift()
+    mudancas = t["Para"] != ""
+    fechados = pd.DataFrame({
+        "ID": t.loc[mudancas, "ID"], "Status": t.loc[mudancas, "De"],
+        "Entrada": anterior[mudancas], "Saida": t.loc[mudancas, "DataHora"],
+    })
+
+    # Estágio corrente: só dos registros que ainda estão na tabela (fora da lixeira/arquivo)
+    status_atual = dict(zip(atual["ID"], atual["Status"]))
+    ultimo = t.groupby("ID").tail(1)
+    ultimo = ultimo[ultimo["ID"].isin(status_atual)]
+    abertos = pd.DataFrame({
+        "ID": ultimo["ID"], "Status": ultimo["ID"].map(status_atual),
+        "Entrada": ultimo["DataHora"], "Saida": pd.NaT,
+    })
+    estagios = pd.concat([fechados, abertos], ignore_index=True)
+    estagios["Saida"] = pd.to_datetime(estagios["Saida"])
+    _cache_estagios[nome] = (_estado["posicao"], atual, estagios)
+    return estagios
+
+def _dias(delta):
+    return delta.dt.total_seconds() / 86400
+
+# ============================================================
+# Consultas
+# ============================================================
+
+def tempo_em_estagio(nome):
+    """Por status: passagens concluídas (média, mediana e p90 em dias) e registros parados nele agora."""
+    estagios = _estagios(nome)
+    agora = pd.Timestamp(datetime.now())
+    concluidos = estagios[estagios["Saida"].notna() & estagios["Entrada"].notna()]
+    duracao = _dias(concluidos["Saida"] - concluidos["Entrada"]).groupby(concluidos["Status"])
+    abertos = estagios[estagios["Saida"].isna()]
+    parado = _dias(agora - abertos["Entrada"]).groupby(abertos["Status"])
+    resumo = pd.DataFrame({
+        "Passagens": duracao.size(),
+        "Média (dias)": duracao.mean(),
+        "Mediana (dias)": duracao.median(),
+        "P90 (dias)": duracao.quantile(0.9),
+        "No estágio agora": parado.size(),
+        "Parados há (mediana, dias)": parado.median(),
+    })
+    ordem = [s for s in STATUS_OPCOES[nome] if s in resumo.index] + sorted(set(resumo.index) - set(STATUS_OPCOES[nome]))
+    resumo = resumo.reindex(ordem)
+    resumo[["Passagens", "No estágio agora"]] = resumo[["Passagens", "No estágio agora"]].fillna(0).astype(int)
+    return resumo.round(1).rename_axis("Status").reset_index()
+
+def tempo_para_preencher():
+    """
+    Vagas que chegaram a "Fechada": dias entre a abertura (criação no log ou,
+    se anterior ao log, a Data de Abertura) e a primeira vez em que foram fechadas.
+    """
+    df = atualizar()
+    t = df[df["Tabela"] == "vagas"]
+    fechamentos = t[t["Para"] == STATUS_PREENCHIDA].groupby("ID")["DataHora"].min()
+    criacoes = t[t["Para"] == ""].groupby("ID")["DataHora"].min()
+    # IDs repetidos (CSV editado à mão) ficam para o relatório de integridade: vale a primeira linha
+    vagas = servicos.carregar_tabela("vagas").drop_duplicates(subset=["ID"]).set_index("ID")
+    data_abertura = pd.to_datetime(vagas["Data de Abertura"], format="%d/%m/%Y", errors="coerce")
+    abertura = criacoes.reindex(fechamentos.index).fillna(data_abertura.reindex(fechamentos.index))
+    resultado = pd.DataFrame({
+        "ID": fechamentos.index,
+        "Cliente": vagas["Cliente"].reindex(fechamentos.index).fillna("").values,
+        "Cargo": vagas["Cargo"].reindex(fechamentos.index).fillna("").values,
+        "Abertura": abertura.values,
+        "Fechamento": fechamentos.values,
+    })
+    resultado["Dias"] = _dias(resultado["Fechamento"] - resultado["Abertura"]).round(1)
+    return resultado.dropna(subset=["Dias"]).sort_values("Fechamento", ascending=False, ignore_index=True)
+
+def velocidade_funil(nome, dias=30):
+    """
+    Movimento por status nos últimos `dias`: entradas, saídas e a mediana de dias
+    no estágio das passagens encerradas no período. Nos FUNIS, também quantas
+    saídas foram avanços (para um status posterior) e a conversão.
+    """
+    estagios = _estagios(nome)
+    inicio = pd.Timestamp(datetime.now() - timedelta(days=dias))
+    df = atualizar()
+    t = df[(df["Tabela"] == nome) & (df["Para"] != "") & (df["DataHora"] >= inicio)]
+    ordem = {s: i for i, s in enumerate(STATUS_OPCOES[nome])}
+    avancos = t[t["Para"].map(ordem) > t["De"].map(ordem)]
+    saidas = estagios[estagios["Saida"] >= inicio].dropna(subset=["Entrada"])
+    resumo = pd.DataFrame({
+        "Entradas": t.groupby("Para").size(),
+        "Saídas": t.groupby("De").size(),
+        "Avanços": avancos.groupby("De").size(),
+        "Mediana no estágio (dias)": _dias(saidas["Saida"] - saidas["Entrada"]).groupby(saidas["Status"]).median(),
+    })
+    resumo = resumo.reindex(STATUS_OPCOES[nome] + sorted(set(resumo.index) - set(STATUS_OPCOES[nome])))
+    contagens = ["Entradas", "Saídas", "Avanços"]
+    resumo[contagens] = resumo[contagens].fillna(0).astype(int)
+    if nome in FUNIS:
+        resumo["Conversão (%)"] = (100 * resumo["Avanços"] / resumo["Saídas"].where(resumo["Saídas"] > 0)).round(0)
+    else:
+        resumo = resumo.drop(columns="Avanços")
+    return resumo.round(1).rename_axis("Status").reset_index()
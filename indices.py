@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Índices em memória para as telas
+# ============================================================
+# Estruturas derivadas das tabelas, mantidas por processo e
+# atualizadas só quando a tabela de origem muda (nova versão no
+# cache de servicos). Nada aqui é gravado em disco.
+# ============================================================
+
+import bisect
+import csv
+import heapq
+import io
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, deque
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+import servicos
+from servicos import (
+    COLUNA_VERSAO, LOGS_COLS, LOGS_CSV, RECRUTADORES_PADRAO, VAGAS_STATUS_INDISPONIVEIS, ErroValidacao, contidos,
+)
+
+# ============================================================
+# Rótulos para busca (seletores com digitação)
+# ============================================================
+# Cada índice guarda o rótulo de exibição por ID e um índice invertido
+# token -> IDs. Quando a tabela muda, só os IDs cujo rótulo mudou (ou que
+# entraram/saíram) são reindexados. A busca casa cada termo digitado como
+# prefixo de algum token do rótulo (bisect na lista ordenada de tokens).
+
+BUSCA_MAX_RESULTADOS = 20
+
+def _rotulos_vagas(df):
+    # Só vagas que ainda recebem candidatos
+    df = df[~df["Status"].isin(VAGAS_STATUS_INDISPONIVEIS)]
+    return pd.Series((df["ID"] + " - " + df["Cliente"] + " - " + df["Cargo"]).values, index=df["ID"].values)
+
+def _rotulos_clientes(df):
+    return pd.Series((df["ID"] + " - " + df["Cliente"]).values, index=df["ID"].values)
+
+# Índice -> (tabela de origem, função que monta a Series ID -> rótulo)
+INDICES_ROTULOS = {
+    "vagas_disponiveis": ("vagas", _rotulos_vagas),
+    "clientes": ("clientes", _rotulos_clientes),
+}
+
+def _primeiras(df):
+    # IDs repetidos (CSV editado à mão) ficam para o relatório de integridade (integridade.py):
+    # os índices, que guardam estado por ID, usam a primeira linha, como servicos._tabela_resolvida
+    ids = pd.Index(df["ID"])
+    return df if ids.is_unique else df[~ids.duplicated()]
+
+_trava_rotulos = threading.Lock()
+_rotulos = servicos.cache_do_inquilino("indices.rotulos")  # índice -> _IndiceRotulos
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return texto.lower()
+
+def _tokens(texto):
+    return set(re.findall(r"[a-z0-9]+", _normalizar(texto)))
+
+class _IndiceRotulos:
+    def __init__(self):
+        self.origem = None
+        self.rotulos = pd.Series(dtype=str)   # ID -> rótulo
+        self.normalizados = {}                # ID -> rótulo normalizado
+        self.por_token = {}                   # token -> set de IDs
+        self.tokens = []                      # tokens ordenados (busca por prefixo)
+
+    def atualizar(self, origem, rotulos):
+        antigos = self.rotulos
+        mudaram = rotulos[antigos.reindex(rotulos.index) != rotulos]
+        sairam = antigos.index.difference(rotulos.index)
+        for i in list(sairam) + list(mudaram.index):
+            if i not in self.normalizados:
+                continue
+            for token in _tokens(antigos[i]):
+                ids = self.por_token.get(token)
+                if ids is not None:
+                    ids.discard(i)
+            del self.normalizados[i]
+        novos_tokens = False
+        for i, rotulo in mudaram.items():
+            self.normalizados[i] = _normalizar(rotulo)
+            for token in _tokens(rotulo):
+                if token not in self.por_token:
+                    self.por_token[token] = set()
+                    novos_tokens = True
+                self.por_token[token].add(i)
+        if novos_tokens:
+            self.tokens = sorted(self.por_token)
+        self.rotulos = rotulos
+        self.origem = origem
+
+    def _com_prefixo(self, termo):
+        inicio = bisect.bisect_left(self.tokens, termo)
+        fim = bisect.bisect_left(self.tokens, termo + "\uffff")
+        ids = set()
+        for token in self.tokens[inicio:fim]:
+            ids |= self.por_token[token]
+        return ids
+
+    def buscar(self, texto, limite):
+        termos = sorted(_tokens(texto), key=len, reverse=True)
+        if not termos:
+            # Sem busca: os últimos cadastrados
+            return list(self.rotulos.iloc[::-1][:limite].items())
+        candidatos = self._com_prefixo(termos[0])
+        for termo in termos[1:]:
+            if not candidatos:
+                break
+            candidatos &= self._com_prefixo(termo)
+        consulta = _normalizar(texto.strip())
+        # Rótulo que começa com o texto digitado primeiro; depois os mais recentes
+        ordem = heapq.nsmallest(
+            limite, candidatos,
+            key=lambda i: (not self.normalizados[i].startswith(consulta), -int(i) if str(i).isdigit() else 0),
+        )
+        return [(i, self.rotulos[i]) for i in ordem]
+
+def buscar_rotulos(indice, texto="", limite=BUSCA_MAX_RESULTADOS):
+    """
+    Até `limite` pares (ID, rótulo) do índice cujos rótulos contêm, como prefixo de
+    alguma palavra, cada termo de `texto` (sem diferenciar acentos/maiúsculas).
+    """
+    if indice not in INDICES_ROTULOS:
+        raise ErroValidacao(f"Índice desconhecido: {indice}")
+    tabela, montar = INDICES_ROTULOS[indice]
+    df = servicos.carregar_tabela(tabela)
+    with _trava_rotulos:
+        idx = _rotulos.setdefault(indice, _IndiceRotulos())
+        if idx.origem is not df:
+            idx.atualizar(df, montar(_primeiras(df)))
+        return idx.buscar(texto or "", limite)
+
+# ============================================================
+# Carga por recrutador (sugestão de atribuição)
+# ============================================================
+# Contadores por recrutador mantidos a cada gravação: quando a tabela muda
+# (nova versão no cache), só as linhas novas/alteradas (ID + Versao) e as
+# que saíram são descontadas/recontadas. A atividade recente vem do log,
+# lido a partir do último byte já processado. Abrir um formulário só
+# consulta os contadores.
+
+VAGAS_STATUS_EM_ANDAMENTO = ["Aberta", "Reaberta"]
+CANDIDATOS_STATUS_PENDENTES = ["Enviado", "Não entrevistado"]
+ATIVIDADE_DIAS = 7
+# Peso de cada item na carga: uma vaga em andamento pesa como 3 candidatos pendentes;
+# as ações no log (edições, cadastros) contam pouco, só para desempatar
+PESOS_CARGA = {"Vagas em andamento": 3.0, "Candidatos pendentes": 1.0, "Ações recentes": 0.1}
+
+# Contador -> (tabela, filtro das linhas contadas)
+CONTADORES_CARGA = {
+    "Vagas em andamento": ("vagas", lambda df: df["Status"].isin(VAGAS_STATUS_EM_ANDAMENTO)),
+    "Candidatos pendentes": ("candidatos", lambda df: df["Status"].isin(CANDIDATOS_STATUS_PENDENTES)),
+}
+# Peso do item que cada tabela acrescenta ao recrutador escolhido
+PESO_NOVO_ITEM = {"vagas": PESOS_CARGA["Vagas em andamento"], "candidatos": PESOS_CARGA["Candidatos pendentes"]}
+
+_trava_carga = threading.Lock()
+_contadores = servicos.cache_do_inquilino("indices.contadores")  # contador -> _ContagemPorRecrutador
+# por_usuario: usuário -> deque de datas (ordem do log)
+_atividade = servicos.cache_do_inquilino("indices.atividade", lambda: {"posicao": 0, "inode": None, "por_usuario": {}})
+
+class _ContagemPorRecrutador:
+    def __init__(self, filtro):
+        self.filtro = filtro
+        self.origem = None
+        self.ids = pd.Index([], dtype=str)     # IDs e chaves ID#Versao da versão já contada
+        self.chaves = pd.Index([], dtype=str)
+        self.contados = {}                      # ID -> recrutador (só as linhas que entram na contagem)
+        self.contagem = Counter()
+
+    def atualizar(self, df):
+        origem, df = df, _primeiras(df)
+        chaves = pd.Index(df["ID"] + "#" + df[COLUNA_VERSAO])
+        ids = pd.Index(df["ID"])
+        mudaram = df[~contidos(chaves, self.chaves)]
+        sairam = set(self.ids[~contidos(self.ids, ids)])
+        for i in sairam | set(mudaram["ID"]):
+            recrutador = self.contados.pop(i, None)
+            if recrutador is not None:
+                self.contagem[recrutador] -= 1
+        entram = mudaram[self.filtro(mudaram)]
+        for i, recrutador in zip(entram["ID"], entram["Recrutador"]):
+            self.contados[i] = recrutador
+            self.contagem[recrutador] += 1
+        self.ids = ids
+        self.chaves = chaves
+        self.origem = origem
+
+def _contagem(contador):
+    tabela, filtro = CONTADORES_CARGA[contador]
+    df = servicos.carregar_tabela(tabela)
+    idx = _contadores.setdefault(contador, _ContagemPorRecrutador(filtro))
+    if idx.origem is not df:
+        idx.atualizar(df)
+    return idx.contagem
+
+def _acoes_recentes():
+    # Lê só o que foi acrescentado ao log desde a última leitura (log recriado/encolhido: relê do início)
+    logs_csv = servicos.caminho(LOGS_CSV)
+    try:
+        info = os.stat(logs_csv)
+    except FileNotFoundError:
+        return {}
+    if (info.st_ino, info.st_size) != (_atividade["inode"], _atividade["posicao"]):
+        if info.st_ino != _atividade["inode"] or info.st_size < _atividade["posicao"]:
+            _atividade.update(posicao=0, inode=info.st_ino, por_usuario={})
+        with open(logs_csv, "rb") as f:
+            f.seek(_atividade["posicao"])
+            trecho = f.read()
+        trecho = trecho[:trecho.rfind(b"\n") + 1]
+        _atividade["posicao"] += len(trecho)
+        for reg in csv.reader(io.StringIO(trecho.decode("utf-8"))):
+            if len(reg) != len(LOGS_COLS) or reg == LOGS_COLS:
+                continue
+            reg = dict(zip(LOGS_COLS, reg))
+            if reg["Acao"] in ("Login", "Logout"):
+                continue
+            try:
+                quando = datetime.strptime(reg["DataHora"], "%d/%m/%Y %H:%M:%S")
+            except ValueError:
+                continue
+            _atividade["por_usuario"].setdefault(_normalizar(reg["Usuario"]), deque()).append(quando)
+    limite = datetime.now() - timedelta(days=ATIVIDADE_DIAS)
+    for datas in _atividade["por_usuario"].values():
+        while datas and datas[0] < limite:
+            datas.popleft()
+    return {usuario: len(datas) for usuario, datas in _atividade["por_usuario"].items()}
+
+def carga_recrutadores():
+    """
+    Uma linha por recrutador de RECRUTADORES_PADRAO: vagas em andamento, candidatos
+    pendentes, ações no log nos últimos ATIVIDADE_DIAS dias (pelo usuário de mesmo
+    nome) e a carga ponderada (PESOS_CARGA), da menor para a maior.
+    """
+    with _trava_carga:
+        contagens = {contador: dict(_contagem(contador)) for contador in CONTADORES_CARGA}
+        acoes = _acoes_recentes()
+    df = pd.DataFrame({"Recrutador": RECRUTADORES_PADRAO})
+    for contador, contagem in contagens.items():
+        df[contador] = df["Recrutador"].map(contagem).fillna(0).astype(int)
+    df["Ações recentes"] = df["Recrutador"].map(lambda r: acoes.get(_normalizar(r), 0)).astype(int)
+    df["Carga"] = sum(df[col] * peso for col, peso in PESOS_CARGA.items()).round(1)
+    # Empate: ordem de RECRUTADORES_PADRAO
+    return df.sort_values("Carga", kind="stable").reset_index(drop=True)
+
+def sugerir_recrutadores(tabela, quantidade=1):
+    """
+    Recrutadores para `quantidade` itens novos de `tabela` ("vagas" ou "candidatos"):
+    cada item vai para o de menor carga, que recebe o peso do item antes do próximo.
+    """
+    if tabela not in PESO_NOVO_ITEM:
+        raise ErroValidacao(f"Sem atribuição automática para {tabela}.")
+    carga = carga_recrutadores()
+    heap = [(c, i, r) for i, (r, c) in enumerate(zip(carga["Recrutador"], carga["Carga"]))]
+    heapq.heapify(heap)
+    escolhidos = []
+    for _ in range(quantidade):
+        c, i, r = heapq.heappop(heap)
+        escolhidos.append(r)
+        heapq.heappush(heap, (c + PESO_NOVO_ITEM[tabela], i, r))
+    return escolhidos
+
+# ============================================================
+# Vagas paradas (sem movimentação)
+# ============================================================
+# Vagas em andamento numa lista ordenada por (última movimentação, ID):
+# Atualização ou, se vazia, Data de Abertura, como número do dia. A cada
+# versão da tabela só as linhas alteradas (ID + Versao) e as que saíram
+# são tiradas e recolocadas na lista (bisect). As mais paradas são o
+# início da lista e quantas passam de N dias é um bisect pela data de
+# corte, sem converter nem ordenar as datas a cada tela.
+
+VAGAS_PARADAS_DIAS = 15
+VAGAS_PARADAS_LIMITE = 20
+VAGAS_PARADAS_COLS = ["ID", "Cliente", "Cargo", "Recrutador", "Status"]
+# Acima desta fração de linhas alteradas, a lista é reordenada inteira em vez de item a item
+_PARADAS_FRACAO_REORDENAR = 0.1
+
+_trava_paradas = threading.Lock()
+_paradas = servicos.cache_do_inquilino("indices.paradas")  # "vagas" -> _IndiceParadas
+
+class _IndiceParadas:
+    def __init__(self):
+        self.origem = None
+        self.ids = pd.Index([], dtype=str)
+        self.chaves = pd.Index([], dtype=str)
+        self.itens = {}      # ID -> (dia, ID numérico, ID), só vagas em andamento com data
+        self.detalhes = {}   # ID -> valores de VAGAS_PARADAS_COLS
+        self.ordem = []      # itens ordenados (mais antigos primeiro)
+
+    def atualizar(self, df):
+        origem, df = df, _primeiras(df)
+        # Cliente entra na chave: vem do cadastro do cliente (ClienteID) e muda sem mudar a Versao da vaga
+        chaves = pd.Index(df["ID"] + "#" + df[COLUNA_VERSAO] + "#" + df["Cliente"])
+        ids = pd.Index(df["ID"])
+        mudaram = df[~contidos(chaves, self.chaves)]
+        sairam = set(self.ids[~contidos(self.ids, ids)]) | set(mudaram["ID"])
+        entram = mudaram[mudaram["Status"].isin(VAGAS_STATUS_EM_ANDAMENTO)]
+        # Só as linhas alteradas têm a data convertida (vagas sem data válida ficam de fora)
+        abertura = pd.to_datetime(entram["Data de Abertura"], format="%d/%m/%Y", errors="coerce")
+        ultima = pd.to_datetime(entram["Atualização"], format="%d/%m/%Y", errors="coerce").fillna(abertura)
+        novos = [
+            ((quando.toordinal(), int(valores[0]) if valores[0].isdigit() else 0, valores[0]), valores)
+            for valores, quando in zip(entram[VAGAS_PARADAS_COLS].itertuples(index=False, name=None), ultima)
+            if not pd.isna(quando)
+        ]
+        reordenar = len(sairam) + len(novos) > _PARADAS_FRACAO_REORDENAR * max(len(self.ordem), 1)
+        for i in sairam:
+            item = self.itens.pop(i, None)
+            self.detalhes.pop(i, None)
+            if item is not None and not reordenar:
+                del self.ordem[bisect.bisect_left(self.ordem, item)]
+        for item, valores in novos:
+            self.itens[item[2]] = item
+            self.detalhes[item[2]] = valores
+            if not reordenar:
+                bisect.insort(self.ordem, item)
+        if reordenar:
+            self.ordem = sorted(self.itens.values())
+        self.ids = ids
+        self.chaves = chaves
+        self.origem = origem
+
+def _indice_paradas():
+    df = servicos.carregar_tabela("vagas")
+    idx = _paradas.setdefault("vagas", _IndiceParadas())
+    if idx.origem is not df:
+        idx.atualizar(df)
+    return idx
+
+def _corte(dias):
+    # Itens com dia <= corte estão parados há pelo menos `dias` dias
+    return (date.today() - timedelta(days=int(dias))).toordinal()
+
+def contar_vagas_paradas(dias=VAGAS_PARADAS_DIAS):
+    """Quantas vagas em andamento estão sem movimentação há pelo menos `dias` dias."""
+    with _trava_paradas:
+        idx = _indice_paradas()
+        return bisect.bisect_right(idx.ordem, (_corte(dias), float("inf"), ""))
+
+def vagas_paradas(dias=VAGAS_PARADAS_DIAS, limite=VAGAS_PARADAS_LIMITE):
+    """
+    As `limite` vagas em andamento há mais tempo sem movimentação (Atualização ou, se
+    vazia, Data de Abertura), entre as paradas há pelo menos `dias` dias, com a data e
+    os dias parados. Devolve (DataFrame, total de vagas paradas).
+    """
+    with _trava_paradas:
+        idx = _indice_paradas()
+        total = bisect.bisect_right(idx.ordem, (_corte(dias), float("inf"), ""))
+        itens = idx.ordem[:min(total, int(limite))]
+        linhas = [idx.detalhes[i] for _, _, i in itens]
+    hoje = date.today().toordinal()
+    df = pd.DataFrame(linhas, columns=VAGAS_PARADAS_COLS)
+    df["Última movimentação"] = [date.fromordinal(dia).strftime("%d/%m/%Y") for dia, _, _ in itens]
+    df["Dias parada"] = [hoje - dia for dia, _, _ in itens]
+    return df, total
+
+# ============================================================
+# Filtro por período (datas das tabelas)
+# ============================================================
+# Uma lista ordenada de (dia, ID) por tabela, com a data da coluna de
+# COLUNAS_DATA como número do dia. Como nas vagas paradas, cada nova
+# versão da tabela só converte as datas das linhas alteradas (ID +
+# Versao) e das que saíram; o filtro é um par de bisects e o recorte
+# da tabela é pelos IDs do intervalo, sem to_datetime na coluna toda.
+
+COLUNAS_DATA = {"clientes": "Data", "vagas": "Data de Abertura", "candidatos": "Data de Início", "comercial": "Data"}
+
+# Como nas vagas paradas: acima desta fração de linhas alteradas, reordena a lista inteira
+_DATAS_FRACAO_REORDENAR = 0.1
+
+_EPOCA = pd.Timestamp("1970-01-01")
+
+_trava_datas = threading.Lock()
+_datas = servicos.cache_do_inquilino("indices.datas")  # tabela -> _IndiceDatas
+
+class _IndiceDatas:
+    def __init__(self, coluna):
+        self.coluna = coluna
+        self.origem = None
+        self.ids = pd.Index([], dtype=str)
+        self.chaves = pd.Index([], dtype=str)
+        self.itens = {}   # ID -> [(dia, ID)] (mais de um se o ID se repete), só linhas com data válida
+        self.ordem = []   # itens ordenados pela data
+
+    def atualizar(self, df):
+        chaves = pd.Index(df["ID"] + "#" + df[COLUNA_VERSAO])
+        ids = pd.Index(df["ID"])
+        sairam = set(self.ids[~contidos(self.ids, ids)]) | set(df.loc[~contidos(chaves, self.chaves), "ID"])
+        # ID tocado: todas as linhas com ele são reconvertidas (cobre IDs repetidos)
+        entram = df[contidos(ids, pd.Index(list(sairam)))]
+        dias = pd.to_datetime(entram[self.coluna], format="%d/%m/%Y", errors="coerce")
+        validos = dias.notna().to_numpy()
+        ordinais = (dias[validos] - _EPOCA).dt.days + _EPOCA.toordinal()
+        novos = list(zip(ordinais.tolist(), entram.loc[validos, "ID"].tolist()))
+        reordenar = len(sairam) + len(novos) > _DATAS_FRACAO_REORDENAR * max(len(self.ordem), 1)
+        for i in sairam:
+            for item in self.itens.pop(i, []):
+                if not reordenar:
+                    del self.ordem[bisect.bisect_left(self.ordem, item)]
+        for item in novos:
+            self.itens.setdefault(item[1], []).append(item)
+            if not reordenar:
+                bisect.insort(self.ordem, item)
+        if reordenar:
+            self.ordem = sorted(item for itens in self.itens.values() for item in itens)
+        self.ids = ids
+        self.chaves = chaves
+        self.origem = df
+
+def _dia(valor, rotulo):
+    # date/datetime ou texto DD/MM/AAAA -> número do dia (None = sem limite)
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, date):
+        return valor.toordinal()
+    try:
+        return datetime.strptime(str(valor).strip(), "%d/%m/%Y").toordinal()
+    except ValueError:
+        raise ErroValidacao(f"Data inválida em {rotulo}: {valor} (use DD/MM/AAAA)")
+
+def ids_no_periodo(tabela, inicio=None, fim=None):
+    """IDs de `tabela` com a data (COLUNAS_DATA) entre `inicio` e `fim`, inclusive (date ou DD/MM/AAAA)."""
+    if tabela not in COLUNAS_DATA:
+        raise ErroValidacao(f"Tabela sem coluna de data: {tabela}")
+    de, ate = _dia(inicio, "de"), _dia(fim, "até")
+    with _trava_datas:
+        df = servicos.carregar_tabela(tabela)
+        idx = _datas.get(tabela)
+        if idx is None:
+            idx = _datas[tabela] = _IndiceDatas(COLUNAS_DATA[tabela])
+        if idx.origem is not df:
+            idx.atualizar(df)
+        comeco = 0 if de is None else bisect.bisect_left(idx.ordem, (de,))
+        final = len(idx.ordem) if ate is None else bisect.bisect_left(idx.ordem, (ate + 1,))
+        return pd.Index([i for _, i in idx.ordem[comeco:final]], dtype=str)
+
+def filtrar_periodo(tabela, df, inicio=None, fim=None):
+    """
+    Linhas de `df` (registros visíveis de `tabela`, já filtrados ou não) cuja data está no
+    período. Sem `inicio` nem `fim`, devolve `df` como está; linhas sem data válida ficam
+    de fora de qualquer período.
+    """
+    if inicio in (None, "") and fim in (None, ""):
+        return df
+    return df[contidos(pd.Index(df["ID"]), ids_no_periodo(tabela, inicio, fim))]
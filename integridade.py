@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Integridade dos dados
+# ============================================================
+# Confere as restrições que os CSVs não garantem sozinhos:
+#   - ID único em cada tabela e não repetido no arquivo morto;
+#   - vagas ligadas a um cliente existente (ClienteID) e candidatos
+#     a uma vaga existente (VagaID).
+# As junções são por tabela hash (índice de IDs). O estado fica no
+# processo: depois da primeira verificação completa, cada nova versão
+# de uma tabela só confere as linhas novas/alteradas (ID + Versao),
+# mais os dependentes dos registros que saíram da referenciada. O
+# relatório traz a correção sugerida de cada problema, aplicada em
+# lote por corrigir() (gravações em servicos.py, com log).
+# ============================================================
+
+import threading
+from collections import Counter
+
+import pandas as pd
+
+import servicos
+from servicos import COLUNA_VERSAO, REFERENCIAS, TABELAS, ErroValidacao, contidos
+
+# Tabelas com arquivo morto (IDs arquivados continuam reservados)
+TABELAS_ARQUIVADAS = ["vagas", "candidatos", "comercial"]
+# Nome da referência no relatório: tabela -> o que cada linha referencia
+ROTULOS_REFERENCIA = {"vagas": "cliente", "candidatos": "vaga"}
+
+PROBLEMA_ID_REPETIDO = "ID repetido"
+PROBLEMA_ID_ARQUIVADO = "ID já usado no arquivo morto"
+PROBLEMA_SEM_REFERENCIA = "Sem {ref}"
+PROBLEMA_REFERENCIA_INEXISTENTE = "{Ref} inexistente"
+
+CORRECAO_RENUMERAR = "Renumerar"
+CORRECAO_RELIGAR = "Ligar pelo nome"
+CORRECAO_EXCLUIR = "Enviar para a lixeira"
+CORRECOES = [CORRECAO_RENUMERAR, CORRECAO_RELIGAR, CORRECAO_EXCLUIR]
+
+RELATORIO_COLS = ["Tabela", "ID", "Problema", "Detalhe", "Correção"]
+
+_trava = threading.Lock()
+_estado = servicos.cache_do_inquilino("integridade.estado")        # tabela -> _EstadoTabela
+_relatorio = servicos.cache_do_inquilino("integridade.relatorio")  # "ultimo" -> (origens conferidas, relatório)
+
+class _EstadoTabela:
+    def __init__(self):
+        self.origem = None
+        self.linhas = pd.Index([], dtype=str)   # ID#Versao das linhas já conferidas
+        self.contagem = Counter()                # ID -> quantas linhas usam
+        self.repetidos = set()
+        self.arquivo = None                      # IDs do arquivo morto já comparados
+        self.arquivados = set()                  # IDs ativos que também estão no arquivo morto
+        self.referencias = {}                    # ID -> "sem" | "inexistente"
+        # Da última atualização: IDs das linhas novas/alteradas e IDs que deixaram de existir
+        self.alterados = set()
+        self.removidos = set()
+
+    def atualizar(self, df):
+        linhas = df["ID"] + "#" + df[COLUNA_VERSAO]
+        if not pd.Index(linhas).is_unique:
+            # Linhas idênticas em ID e Versao (ID repetido): a ocorrência entra na chave,
+            # para a diferença entre versões contar cada cópia
+            linhas = linhas + "#" + linhas.groupby(linhas).cumcount().astype(str)
+        linhas = pd.Index(linhas)
+        entraram = df.loc[~contidos(linhas, self.linhas), "ID"]
+        sairam = [chave.split("#", 1)[0] for chave in self.linhas[~contidos(self.linhas, linhas)]]
+        tocados = set(entraram) | set(sairam)
+        self.contagem.update(entraram)
+        self.contagem.subtract(sairam)
+        for i in tocados:
+            if self.contagem[i] > 1:
+                self.repetidos.add(i)
+            else:
+                self.repetidos.discard(i)
+                if self.contagem[i] <= 0:
+                    del self.contagem[i]
+        self.alterados = set(entraram)
+        self.removidos = {i for i in sairam if i not in self.contagem}
+        self.linhas = linhas
+        self.origem = df
+
+    def conferir_arquivo(self, df, arquivo):
+        # Arquivo morto novo (outro arquivamento): compara a tabela toda; senão, só as linhas novas
+        ids_arquivo = pd.Index(arquivo["ID"])
+        if arquivo is not self.arquivo:
+            ids = pd.Index(df["ID"])
+            self.arquivados = set(ids[contidos(ids, ids_arquivo)])
+            self.arquivo = arquivo
+            return
+        self.arquivados -= self.removidos
+        novos = pd.Index(list(self.alterados))
+        self.arquivados |= set(novos[contidos(novos, ids_arquivo)])
+
+def _conferir_referencias(nome, df, ref, estado, estado_ref, ref_mudou):
+    chave = REFERENCIAS[nome][0]
+    conferir = set(estado.alterados)
+    if ref_mudou:
+        # Pendentes podem ter sido resolvidos (ex.: cliente restaurado) e quem apontava
+        # para um registro que saiu da referenciada passa a ser órfão
+        conferir |= set(estado.referencias)
+        if estado_ref.removidos:
+            chaves = pd.Index(df[chave])
+            conferir |= set(df.loc[contidos(chaves, pd.Index(list(estado_ref.removidos))), "ID"])
+    for i in estado.removidos | conferir:
+        estado.referencias.pop(i, None)
+    if not conferir:
+        return
+    linhas = df[contidos(pd.Index(df["ID"]), pd.Index(list(conferir)))]
+    chaves = pd.Index(linhas[chave])
+    existe = contidos(chaves, pd.Index(ref["ID"]))
+    for i, valor, ok in zip(linhas["ID"], linhas[chave], existe):
+        if valor == "":
+            estado.referencias[i] = "sem"
+        elif not ok:
+            estado.referencias[i] = "inexistente"
+
+def _atualizar_estado():
+    # Devolve as tabelas visíveis conferidas (uma versão de cada)
+    tabelas = {nome: servicos.carregar_tabela(nome) for nome in TABELAS}
+    mudou = {}
+    for nome, df in tabelas.items():
+        estado = _estado.setdefault(nome, _EstadoTabela())
+        mudou[nome] = estado.origem is not df
+        if mudou[nome]:
+            estado.atualizar(df)
+        else:
+            estado.alterados, estado.removidos = set(), set()
+        if nome in TABELAS_ARQUIVADAS:
+            estado.conferir_arquivo(df, servicos.carregar_arquivados(nome, ["ID"]))
+    for nome, (_, ref_nome, _) in REFERENCIAS.items():
+        if mudou[nome] or mudou[ref_nome]:
+            _conferir_referencias(nome, tabelas[nome], tabelas[ref_nome], _estado[nome], _estado[ref_nome], mudou[ref_nome])
+    return tabelas
+
+def _linhas_referencia(nome, df, ref, estado):
+    # Problemas de ClienteID/VagaID, com a correção possível: religar pelo nome quando há
+    # correspondência; senão, órfão vai para a lixeira e linha sem chave fica para o usuário
+    if not estado.referencias:
+        return []
+    rotulo = ROTULOS_REFERENCIA[nome]
+    chave, _, colunas = REFERENCIAS[nome]
+    linhas = df[df["ID"].isin(list(estado.referencias))]
+    sugeridas = servicos.chaves_pelos_nomes(nome, linhas)
+    # A correspondência pelo nome pode cair num registro da lixeira: só vale se visível
+    sugeridas = sugeridas.where(contidos(pd.Index(sugeridas), pd.Index(ref["ID"])), "")
+    relatorio = []
+    for (_, linha), sugerida in zip(linhas.iterrows(), sugeridas):
+        tipo = estado.referencias[linha["ID"]]
+        nomes = " / ".join(linha[col] for col in colunas)
+        if tipo == "sem":
+            problema = PROBLEMA_SEM_REFERENCIA.format(ref=rotulo)
+            detalhe = f"{chave} vazio; {nomes or '(sem nome)'}"
+        else:
+            problema = PROBLEMA_REFERENCIA_INEXISTENTE.format(Ref=rotulo.capitalize())
+            detalhe = f"{chave} {linha[chave]} não existe; {nomes}"
+        if sugerida:
+            correcao = CORRECAO_RELIGAR
+            detalhe += f" → {rotulo} {sugerida} de mesmo nome"
+        elif tipo == "inexistente":
+            correcao = CORRECAO_EXCLUIR
+        else:
+            correcao = ""
+            detalhe += f" — nenhum(a) {rotulo} com esse nome (cadastre ou edite o registro)"
+        relatorio.append((nome, linha["ID"], problema, detalhe, correcao))
+    return relatorio
+
+def verificar():
+    """
+    Relatório de integridade (colunas RELATORIO_COLS): IDs repetidos, IDs que também
+    estão no arquivo morto, vagas sem cliente válido e candidatos sem vaga válida, com a
+    correção sugerida ("" quando precisa de decisão do usuário). Só as linhas alteradas
+    desde a última verificação são conferidas de novo.
+    """
+    with _trava:
+        tabelas = _atualizar_estado()
+        origens = list(tabelas.values()) + [_estado[nome].arquivo for nome in TABELAS_ARQUIVADAS]
+        em_cache = _relatorio.get("ultimo")
+        if em_cache is not None and all(a is b for a, b in zip(em_cache[0], origens)):
+            return em_cache[1]
+        linhas = []
+        for nome, df in tabelas.items():
+            estado = _estado[nome]
+            linhas += [
+                (nome, i, PROBLEMA_ID_REPETIDO, f"{estado.contagem[i]} linhas com o mesmo ID", CORRECAO_RENUMERAR)
+                for i in sorted(estado.repetidos, key=_ordem_id)
+            ]
+            linhas += [
+                (nome, i, PROBLEMA_ID_ARQUIVADO, "O mesmo ID está num registro arquivado", CORRECAO_RENUMERAR)
+                for i in sorted(estado.arquivados - estado.repetidos, key=_ordem_id)
+            ]
+            if nome in REFERENCIAS:
+                linhas += _linhas_referencia(nome, df, tabelas[REFERENCIAS[nome][1]], estado)
+        relatorio = pd.DataFrame(linhas, columns=RELATORIO_COLS)
+        _relatorio["ultimo"] = (origens, relatorio)
+        return relatorio
+
+def _ordem_id(i):
+    return (0, int(i), "") if str(i).isdigit() else (1, 0, str(i))
+
+def corrigir(correcao, usuario, tabela=None):
+    """
+    Aplica a `correcao` (uma de CORRECOES) a todos os problemas do relatório que a
+    sugerem (só os de `tabela`, se informada). Devolve {tabela: quantidade corrigida}.
+    """
+    if correcao not in CORRECOES:
+        raise ErroValidacao(f"Correção desconhecida: {correcao} (use {', '.join(CORRECOES)})")
+    relatorio = verificar()
+    alvo = relatorio[relatorio["Correção"] == correcao]
+    if tabela:
+        alvo = alvo[alvo["Tabela"] == tabela]
+    corrigidos = {}
+    # Referenciadas antes das dependentes (clientes, vagas, candidatos)
+    for nome in [n for n in TABELAS if n in set(alvo["Tabela"])]:
+        ids = alvo.loc[alvo["Tabela"] == nome, "ID"].tolist()
+        if correcao == CORRECAO_RENUMERAR:
+            arquivados = _estado[nome].arquivados if nome in TABELAS_ARQUIVADAS else set()
+            corrigidos[nome] = sum(len(v) for v in servicos.renumerar_registros(nome, usuario, arquivados).values())
+        elif correcao == CORRECAO_RELIGAR:
+            corrigidos[nome] = len(servicos.religar_chaves(nome, ids, usuario))
+        else:
+            corrigidos[nome] = len(servicos.excluir_registros(nome, ids, usuario)["removidos"].get(nome, []))
+    return corrigidos
+
+def contar_problemas(relatorio=None):
+    """Quantidade de problemas por tabela e tipo (para avisos após importações)."""
+    relatorio = verificar() if relatorio is None else relatorio
+    return relatorio.groupby(["Tabela", "Problema"]).size().to_dict()
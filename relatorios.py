@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Relatórios por cliente
+# ============================================================
+# Um pacote por cliente para reuniões: vagas, candidatos (por status)
+# e a atividade recente do log sobre o cliente, suas vagas e seus
+# candidatos, em XLSX (uma planilha com abas) ou CSV (uma pasta).
+# As tabelas são lidas e separadas por ClienteID uma vez; os pacotes
+# são montados em lotes num pool de processos e gravados num único
+# .zip à medida que ficam prontos (o destino pode ser um arquivo ou
+# uma conexão, sem montar o zip inteiro em memória).
+# ============================================================
+
+import io
+import math
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import servicos
+from servicos import CANDIDATOS_COLS, CANDIDATOS_STATUS_OPCOES, TABELAS, VAGAS_COLS, VAGAS_STATUS_OPCOES, ErroValidacao
+
+RELATORIO_FORMATOS = ["xlsx", "csv"]
+RELATORIO_DIAS_ATIVIDADE = 30
+# Abaixo disso os pacotes são montados no próprio processo (subir o pool custa mais)
+RELATORIO_MIN_PARALELO = 8
+# Lotes por processo: vários lotes pequenos equilibram clientes grandes e pequenos
+RELATORIO_LOTES_POR_PROCESSO = 4
+MAX_PROCESSOS_RELATORIO = os.cpu_count() or 1
+
+ATIVIDADE_COLS = ["DataHora", "Usuario", "Aba", "Acao", "ItemID", "Campo", "ValorAnterior", "ValorNovo", "Detalhe"]
+
+_trava_pool = threading.Lock()
+_pool = {"executor": None}
+
+# ==============================
+# Separação por cliente
+# ==============================
+
+def conferir_formato(formato):
+    if formato not in RELATORIO_FORMATOS:
+        raise ErroValidacao(f"Formato inválido: {formato} (use {', '.join(RELATORIO_FORMATOS)})")
+    return formato
+
+def _nome_arquivo(cliente_id, cliente):
+    texto = unicodedata.normalize("NFKD", cliente).encode("ascii", "ignore").decode("ascii")
+    return f"{cliente_id}_{re.sub(r'[^A-Za-z0-9]+', '_', texto).strip('_')[:60] or 'cliente'}"
+
+def _cliente_por_nome(clientes):
+    # Linhas sem chave (não resolvidas na migração): o cliente de menor ID com o mesmo nome
+    ordem = clientes.assign(_n=pd.to_numeric(clientes["ID"], errors="coerce")).sort_values("_n")
+    return ordem.drop_duplicates("Cliente").set_index("Cliente")["ID"]
+
+def _atividade(logs, dias, cliente_das_vagas, cliente_dos_candidatos):
+    # Log dos últimos `dias` dias, com o cliente de cada linha (pela aba + ItemID)
+    quando = pd.to_datetime(logs["DataHora"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    logs = logs[quando >= datetime.now() - timedelta(days=dias)]
+    abas = {nome: TABELAS[nome][2] for nome in ("clientes", "vagas", "candidatos")}
+    cliente = pd.Series("", index=logs.index)
+    cliente = cliente.mask(logs["Aba"] == abas["clientes"], logs["ItemID"])
+    cliente = cliente.mask(logs["Aba"] == abas["vagas"], logs["ItemID"].map(cliente_das_vagas))
+    cliente = cliente.mask(logs["Aba"] == abas["candidatos"], logs["ItemID"].map(cliente_dos_candidatos))
+    return logs[ATIVIDADE_COLS].assign(_cliente=cliente.fillna(""))
+
+def preparar_relatorios(usuario, clientes_ids=None, dias=RELATORIO_DIAS_ATIVIDADE):
+    """
+    Confere a permissão e separa os dados por cliente (todos, se `clientes_ids` vazio).
+    Devolve uma lista de pacotes (dicts com ID, Cliente, Arquivo e os DataFrames
+    Vagas, Candidatos e Atividade), pronta para gravar_relatorios.
+    """
+    # Mesmo acesso das telas de Vagas e Candidatos (que já mostram o nome do cliente)
+    for nome in ("vagas", "candidatos"):
+        servicos.verificar_permissao(usuario, nome, "consultar")
+    try:
+        dias = int(dias)
+    except (TypeError, ValueError):
+        raise ErroValidacao(f"Dias inválido: {dias}")
+    if dias < 1:
+        raise ErroValidacao("Informe pelo menos 1 dia de atividade.")
+    clientes = servicos.carregar_tabela("clientes")
+    if clientes_ids:
+        clientes_ids = [str(i) for i in clientes_ids]
+        faltando = sorted(set(clientes_ids) - set(clientes["ID"]), key=lambda i: (len(i), i))
+        if faltando:
+            raise ErroValidacao(f"Clientes não encontrados: {', '.join(faltando)}")
+        clientes = clientes[clientes["ID"].isin(clientes_ids)]
+    if clientes.empty:
+        raise ErroValidacao("Nenhum cliente cadastrado.")
+
+    todos_clientes = servicos.carregar_tabela("clientes")
+    por_nome = _cliente_por_nome(todos_clientes)
+    vagas = servicos.carregar_tabela("vagas")
+    vagas = vagas.assign(_cliente=vagas["ClienteID"].where(vagas["ClienteID"] != "", vagas["Cliente"].map(por_nome)).fillna(""))
+    cliente_das_vagas = vagas.set_index("ID")["_cliente"]
+    candidatos = servicos.carregar_tabela("candidatos")
+    candidatos = candidatos.assign(
+        _cliente=candidatos["VagaID"].map(cliente_das_vagas).fillna(candidatos["Cliente"].map(por_nome)).fillna("")
+    )
+    atividade = _atividade(servicos.carregar_logs(), dias, cliente_das_vagas, candidatos.set_index("ID")["_cliente"])
+
+    # Candidatos na ordem dos status (Enviado, Não entrevistado...) e, dentro dele, por cargo
+    ordem_status = {s: i for i, s in enumerate(CANDIDATOS_STATUS_OPCOES)}
+    candidatos = candidatos.assign(_ordem=candidatos["Status"].map(ordem_status)).sort_values(["_ordem", "Cargo"], kind="stable")
+    grupos = {
+        "Vagas": dict(iter(vagas.groupby("_cliente")[VAGAS_COLS])),
+        "Candidatos": dict(iter(candidatos.groupby("_cliente")[CANDIDATOS_COLS + ["VagaID"]])),
+        "Atividade": dict(iter(atividade.groupby("_cliente")[ATIVIDADE_COLS])),
+    }
+    vazios = {"Vagas": vagas[VAGAS_COLS].iloc[:0], "Candidatos": candidatos[CANDIDATOS_COLS + ["VagaID"]].iloc[:0],
+              "Atividade": atividade[ATIVIDADE_COLS].iloc[:0]}
+    pacotes = []
+    for cid, nome in zip(clientes["ID"], clientes["Cliente"]):
+        pacote = {"ID": cid, "Cliente": nome, "Arquivo": _nome_arquivo(cid, nome)}
+        for parte, por_cliente in grupos.items():
+            pacote[parte] = por_cliente.get(cid, vazios[parte]).reset_index(drop=True)
+        pacotes.append(pacote)
+    return pacotes
+
+# ==============================
+# Montagem dos pacotes (roda nos processos do pool)
+# ==============================
+
+def _por_status(df, coluna, opcoes):
+    # Contagem por status, nas colunas na ordem das opções (status fora da lista no fim)
+    if df.empty:
+        return pd.DataFrame(columns=[coluna] + opcoes + ["Total"])
+    # groupby + unstack: bem mais leve que pd.crosstab para tabelas pequenas
+    tabela = df.groupby([coluna, "Status"]).size().unstack(fill_value=0)
+    tabela = tabela.reindex(columns=opcoes + sorted(set(tabela.columns) - set(opcoes)), fill_value=0)
+    tabela["Total"] = tabela.sum(axis=1)
+    return tabela.reset_index()
+
+def _partes(pacote):
+    # Nome da aba/arquivo -> DataFrame
+    vagas, candidatos = pacote["Vagas"], pacote["Candidatos"]
+    status_vagas = vagas["Status"].value_counts()
+    status_candidatos = candidatos["Status"].value_counts()
+    resumo = pd.DataFrame([
+        ("Cliente", pacote["Cliente"]),
+        ("ID", pacote["ID"]),
+        ("Gerado em", datetime.now().strftime("%d/%m/%Y %H:%M")),
+        ("Vagas", len(vagas)),
+    ] + [(f"Vagas {s}", int(status_vagas.get(s, 0))) for s in VAGAS_STATUS_OPCOES] + [
+        ("Candidatos", len(candidatos)),
+    ] + [(f"Candidatos {s}", int(status_candidatos.get(s, 0))) for s in CANDIDATOS_STATUS_OPCOES] + [
+        ("Ações no log", len(pacote["Atividade"])),
+    ], columns=["Item", "Valor"])
+    return {
+        "Resumo": resumo,
+        "Vagas": vagas,
+        "Candidatos por status": _por_status(candidatos, "Cargo", CANDIDATOS_STATUS_OPCOES),
+        "Candidatos": candidatos,
+        "Atividade": pacote["Atividade"],
+    }
+
+def _xlsx(partes):
+    # openpyxl em modo write_only: bem mais rápido que DataFrame.to_excel para muitas planilhas pequenas
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for aba, df in partes.items():
+        ws = wb.create_sheet(aba[:31])
+        ws.append(list(df.columns))
+        for linha in df.itertuples(index=False):
+            ws.append(list(linha))
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue()
+
+def _arquivo_csv(aba):
+    texto = unicodedata.normalize("NFKD", aba).encode("ascii", "ignore").decode("ascii")
+    return texto.lower().replace(" ", "_") + ".csv"
+
+def _gerar_lote(pacotes, formato):
+    # Devolve [(caminho no zip, bytes)]
+    arquivos = []
+    for pacote in pacotes:
+        partes = _partes(pacote)
+        if formato == "xlsx":
+            arquivos.append((f"{pacote['Arquivo']}.xlsx", _xlsx(partes)))
+        else:
+            for aba, df in partes.items():
+                arquivos.append((f"{pacote['Arquivo']}/{_arquivo_csv(aba)}", df.to_csv(index=False).encode("utf-8")))
+    return arquivos
+
+# ==============================
+# Pool de processos e zip
+# ==============================
+
+def _executor():
+    # Um pool por processo, criado no primeiro uso e reaproveitado. "spawn": o app e a
+    # API têm threads (tarefas, servidor), e fork copiaria travas presas por elas
+    with _trava_pool:
+        if _pool["executor"] is None:
+            _pool["executor"] = ProcessPoolExecutor(
+                max_workers=MAX_PROCESSOS_RELATORIO, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool["executor"]
+
+def _descartar_executor():
+    with _trava_pool:
+        executor, _pool["executor"] = _pool["executor"], None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _lotes(pacotes):
+    tamanho = math.ceil(len(pacotes) / (MAX_PROCESSOS_RELATORIO * RELATORIO_LOTES_POR_PROCESSO))
+    return [pacotes[i:i + tamanho] for i in range(0, len(pacotes), tamanho)]
+
+def _resultados(pacotes, formato):
+    # Gera (quantidade de pacotes do lote, arquivos) na ordem em que ficam prontos
+    if len(pacotes) < RELATORIO_MIN_PARALELO or MAX_PROCESSOS_RELATORIO < 2:
+        for pacote in pacotes:
+            yield 1, _gerar_lote([pacote], formato)
+        return
+    try:
+        futuros = {_executor().submit(_gerar_lote, lote, formato): len(lote) for lote in _lotes(pacotes)}
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+    except BrokenProcessPool:
+        # Processo do pool morto (ex.: falta de memória): o próximo relatório sobe outro
+        _descartar_executor()
+        raise
+
+def gravar_relatorios(destino, pacotes, formato="xlsx", progresso=None):
+    """
+    Grava os pacotes de preparar_relatorios num único .zip em `destino` (caminho ou
+    arquivo binário aberto, inclusive não posicionável, como uma conexão HTTP),
+    com um resumo.csv de todos os clientes na raiz.
+    `progresso(percentual, mensagem)` é chamado a cada lote concluído.
+    """
+    conferir_formato(formato)
+    indice = pd.DataFrame([
+        {"ID": p["ID"], "Cliente": p["Cliente"], "Arquivo": p["Arquivo"] + (".xlsx" if formato == "xlsx" else "/"),
+         "Vagas": len(p["Vagas"]), "Candidatos": len(p["Candidatos"]), "Ações no log": len(p["Atividade"])}
+        for p in pacotes
+    ])
+    # XLSX já é compactado: vai para o zip sem recompressão
+    compressao = zipfile.ZIP_STORED if formato == "xlsx" else zipfile.ZIP_DEFLATED
+    prontos = 0
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("resumo.csv", indice.to_csv(index=False))
+        for quantidade, arquivos in _resultados(pacotes, formato):
+            for nome, dados in arquivos:
+                zf.writestr(nome, dados, compress_type=compressao)
+            prontos += quantidade
+            if progresso:
+                progresso(100 * prontos / len(pacotes), f"{prontos} de {len(pacotes)} cliente(s)...")
+    return len(pacotes)
+
+def gerar_relatorios(destino, usuario, clientes_ids=None, formato="xlsx", dias=RELATORIO_DIAS_ATIVIDADE, progresso=None):
+    """Prepara e grava num .zip os relatórios dos clientes (todos, se `clientes_ids` vazio)."""
+    conferir_formato(formato)
+    return gravar_relatorios(destino, preparar_relatorios(usuario, clientes_ids, dias), formato, progresso)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Faixas salariais das vagas
+# ============================================================
+# Usa a faixa numérica que servicos.normalizar_salarios grava em cada
+# vaga (SalarioMin/SalarioMax) para montar faixas por Cargo (nome
+# canônico), Cliente e Cidade do cliente: quartis, limites de outlier
+# (1,5 × IQR) e vagas fora da faixa do grupo. Tudo vetorizado e em
+# cache; quando as vagas mudam, só os grupos afetados são recalculados.
+# ============================================================
+
+import pandas as pd
+
+import servicos
+from servicos import ErroValidacao
+
+# Agrupamento -> coluna da base
+AGRUPAMENTOS = {"cargo": "Cargo", "cliente": "Cliente", "cidade": "Cidade"}
+# Grupos menores que isso não têm limites de outlier (poucos dados para uma faixa)
+MIN_VAGAS_OUTLIER = 4
+FATOR_IQR = 1.5
+
+_cargos = servicos.cache_do_inquilino("salarios.cargos", lambda: {"canonicos": {}})  # "canonicos" -> {texto original: nome canônico}
+_cache_base = servicos.cache_do_inquilino("salarios.base")      # "base" -> (vagas, clientes, base por vaga)
+_cache_faixas = servicos.cache_do_inquilino("salarios.faixas")  # coluna -> (base, resumo por grupo)
+
+# ==============================
+# Base por vaga
+# ==============================
+
+def cargo_canonico(serie):
+    """
+    Nome canônico do cargo: sem acentos, maiúsculo, sem complementos entre parênteses
+    (local, gênero) e com espaços normalizados — "Vendedor(a)" e "VENDEDOR (BARRETOS)"
+    viram "VENDEDOR". Cada texto distinto é tratado uma vez por processo e inquilino.
+    """
+    serie = serie.fillna("").astype(str)
+    canonicos = _cargos["canonicos"]
+    novos = pd.Series([t for t in pd.unique(serie) if t not in canonicos], dtype=str)
+    if len(novos):
+        canon = (
+            novos.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+            .str.upper()
+            .str.replace(r"\([^)]*\)", " ", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip(" -/")
+        )
+        canonicos.update(zip(novos, canon))
+    return serie.map(canonicos)
+
+def _base():
+    # Uma linha por vaga com salário: Cargo canônico, Cliente, Cidade, Min, Max e Medio (ponto médio da faixa)
+    vagas = servicos.carregar_tabela("vagas")
+    clientes = servicos.carregar_tabela("clientes")
+    em_cache = _cache_base.get("base")
+    if em_cache is not None and em_cache[0] is vagas and em_cache[1] is clientes:
+        return em_cache[2]
+    # IDs repetidos em clientes (ver integridade.py): vale a primeira linha, como em servicos
+    cidades = clientes.drop_duplicates(subset=["ID"]).set_index("ID")["Cidade"]
+    minimo = pd.to_numeric(vagas["SalarioMin"], errors="coerce")
+    maximo = pd.to_numeric(vagas["SalarioMax"], errors="coerce")
+    base = pd.DataFrame({
+        "ID": vagas["ID"],
+        "Cargo": cargo_canonico(vagas["Cargo"]),
+        "Cliente": vagas["Cliente"],
+        "Cidade": vagas["ClienteID"].map(cidades).fillna(""),
+        "Status": vagas["Status"],
+        "Min": minimo,
+        "Max": maximo,
+        "Medio": (minimo + maximo) / 2,
+    }).dropna(subset=["Medio"]).reset_index(drop=True)
+    _cache_base["base"] = (vagas, clientes, base)
+    return base
+
+# ==============================
+# Faixas por grupo
+# ==============================
+
+def _resumir(base, col):
+    grupos = base.groupby(col)
+    quartis = grupos["Medio"].quantile([0.25, 0.5, 0.75]).unstack()
+    resumo = pd.DataFrame({
+        "Vagas": grupos.size(),
+        "Mínimo": grupos["Min"].min(),
+        "P25": quartis[0.25],
+        "Mediana": quartis[0.5],
+        "P75": quartis[0.75],
+        "Máximo": grupos["Max"].max(),
+    })
+    iqr = resumo["P75"] - resumo["P25"]
+    com_limites = resumo["Vagas"] >= MIN_VAGAS_OUTLIER
+    resumo["Limite inferior"] = (resumo["P25"] - FATOR_IQR * iqr).where(com_limites)
+    resumo["Limite superior"] = (resumo["P75"] + FATOR_IQR * iqr).where(com_limites)
+    resumo["Fora da faixa"] = _fora_da_faixa(base, col, resumo).groupby(base[col]).sum().astype(int)
+    return resumo
+
+def _fora_da_faixa(base, col, resumo):
+    inferior = base[col].map(resumo["Limite inferior"])
+    superior = base[col].map(resumo["Limite superior"])
+    return (base["Medio"] < inferior) | (base["Medio"] > superior)
+
+def _coluna(por):
+    if por not in AGRUPAMENTOS:
+        raise ErroValidacao(f"Agrupamento inválido: {por} (use {', '.join(AGRUPAMENTOS)})")
+    return AGRUPAMENTOS[por]
+
+def faixas_salariais(por="cargo"):
+    """
+    Faixa salarial (sobre o ponto médio de cada vaga) por Cargo canônico, Cliente ou
+    Cidade: vagas, mínimo, quartis, máximo, limites de outlier e quantas vagas estão fora.
+    """
+    col = _coluna(por)
+    base = _base()
+    em_cache = _cache_faixas.get(col)
+    if em_cache is not None and em_cache[0] is base:
+        return em_cache[1]
+    if em_cache is None:
+        resumo = _resumir(base, col)
+    else:
+        # Só os grupos com vagas novas, removidas ou com salário/grupo alterado são recalculados
+        anterior, resumo = em_cache
+        chaves = [col, "ID", "Min", "Max"]
+        mudancas = pd.concat([anterior[chaves], base[chaves]]).drop_duplicates(keep=False)
+        afetados = set(mudancas[col])
+        if afetados:
+            recalculados = _resumir(base[base[col].isin(afetados)], col)
+            resumo = pd.concat([resumo.drop(index=list(afetados), errors="ignore"), recalculados]).sort_index()
+    _cache_faixas[col] = (base, resumo)
+    return resumo
+
+def vagas_fora_da_faixa(por="cargo"):
+    """Vagas cujo ponto médio está fora dos limites de outlier do seu grupo."""
+    col = _coluna(por)
+    resumo = faixas_salariais(por)
+    base = _base()
+    fora = base[_fora_da_faixa(base, col, resumo)]
+    return fora.assign(**{"Mediana do grupo": fora[col].map(resumo["Mediana"])}).drop(columns="Medio")
@@ -0,0 +1,1989 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Camada de Serviços (sem Streamlit)
+# ============================================================
+# Regras de dados compartilhadas pelo app Streamlit (app.py) e pela
+# API HTTP local / linha de comando (api.py):
+#   • Persistência em CSV (trava de escrita + gravação atômica)
+#   • Cache de tabelas por processo (relê só quando o arquivo muda)
+#   • Criar / editar / excluir / importar em lote: validação, regras
+#     de ID, uma gravação por tabela e um append no log por operação
+#   • Controle de concorrência otimista (coluna de versão)
+#   • Arquivo morto
+#   • Backup incremental (base compactada + alterações por linha)
+#   • Feed de alterações (CDC) com número de sequência
+#   • Inquilinos: um diretório de dados por empresa/unidade, escolhido
+#     no login, com o cache de todos num orçamento de memória (LRU)
+# ============================================================
+
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import ExitStack, contextmanager
+import contextvars
+import csv
+import glob
+import gzip
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl  # trava entre processos (Linux/macOS)
+except ImportError:
+    fcntl = None
+
+try:
+    # Notificação de mudanças nos CSVs (opcional; sem ele o cache confere os.stat a cada leitura)
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# pandas 3 já usa copy-on-write; no pandas 2 é preciso ligar (ver _copia_rasa)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# ==============================
+# Arquivos CSV
+# ==============================
+CLIENTES_CSV = "clientes.csv"
+VAGAS_CSV = "vagas.csv"
+CANDIDATOS_CSV = "candidatos.csv"
+LOGS_CSV = "logs.csv"
+COMERCIAL_CSV = "comercial.csv"  # Comercial
+
+# Arquivo morto (registros fechados antigos, compactados por ano)
+ARQUIVO_DIR = "arquivo"
+ARQUIVO_IDS_JSON = os.path.join(ARQUIVO_DIR, "ids.json")
+ARQUIVO_IDADE_DIAS = 180
+
+# Lixeira (exclusão lógica): cada exclusão acrescenta uma linha em lixeira.csv
+# e os registros somem das telas, mas continuam nos CSVs até a compactação
+LIXEIRA_CSV = "lixeira.csv"
+LIXEIRA_COLS = ["Lote", "DataHora", "Usuario", "Acao", "Tabela", "IDs", "Detalhe"]
+LIXEIRA_RETENCAO_DIAS = 30
+LIXEIRA_IDS_JSON = "lixeira_ids.json"  # maior ID já expurgado por tabela (continua reservado)
+
+# Backup incremental: por tabela, bases compactadas periódicas (backup/<tabela>/<carimbo>.base.csv.gz)
+# e, entre uma base e a seguinte, as linhas alteradas/removidas em cada gravação (<carimbo>.delta.jsonl.gz)
+BACKUP_DIR = "backup"
+BACKUP_RETENCAO_DIAS = 90
+DESFAZER_SEGUNDOS = 120
+
+# Feed de alterações: uma linha JSON por inclusão/alteração/exclusão, com sequência crescente
+ALTERACOES_JSONL = "alteracoes.jsonl"
+
+# Inquilinos (empresas/unidades atendidas pelo mesmo servidor): cada um tem todos os arquivos
+# acima em inquilinos/<nome>/. Sem subdiretórios ali, a instalação é de um só, no diretório atual.
+INQUILINOS_DIR = "inquilinos"
+INQUILINO_PADRAO = ""
+# Em inquilinos/<nome>/: {"usuarios": [...]} com quem pode entrar no inquilino (sem o arquivo, ninguém)
+INQUILINO_USUARIOS_JSON = "usuarios.json"
+# Tabelas carregadas de todos os inquilinos dividem este orçamento; passando dele, ou depois de
+# INQUILINO_OCIOSO_MINUTOS sem uso, o cache do inquilino usado há mais tempo é descartado
+CACHE_ORCAMENTO_MB = int(os.environ.get("PARMA_CACHE_MB", "1024"))
+INQUILINO_OCIOSO_MINUTOS = 30
+
+# ==============================
+# Colunas esperadas
+# ==============================
+CLIENTES_COLS = ["ID", "Data", "Cliente", "Nome", "Cidade", "UF", "Telefone", "E-mail"]
+VAGAS_COLS = [
+    "ID",
+    "Cliente",
+    "Status",
+    "Data de Abertura",
+    "Cargo",
+    "Recrutador",
+    "Atualização",
+    "Salário 1",
+    "Salário 2"
+]
+CANDIDATOS_COLS = ["ID", "Cliente", "Cargo", "Nome", "Telefone", "Recrutador", "Status", "Data de Início"]
+
+# Comercial (com 'Produto' e 'Telefone' na ordem definida)
+COMERCIAL_COLS = [
+    "ID",
+    "Data",
+    "Empresa",
+    "Cidade",
+    "UF",
+    "Nome",
+    "Telefone",
+    "E-mail",
+    "Produto",
+    "Canal",
+    "Status"
+]
+
+# Versão por linha (controle de concorrência otimista nas edições).
+# Coluna interna: gravada no CSV, mas fora dos formulários e das listagens.
+COLUNA_VERSAO = "Versao"
+
+# Colunas derivadas, gravadas no CSV mas fora dos formulários/importação:
+# faixa salarial numérica extraída de "Salário 1"/"Salário 2" (texto livre) a cada gravação
+COLUNAS_SALARIO = ["SalarioMin", "SalarioMax"]
+COLUNAS_DERIVADAS = {"vagas": COLUNAS_SALARIO}
+
+# Chaves estrangeiras (IDs), gravadas no CSV mas fora dos formulários:
+# tabela -> (coluna da chave, tabela referenciada, {coluna local: coluna da referenciada}).
+# As colunas de nome (Cliente, Cargo) são preenchidas pela chave na leitura: renomear um
+# cliente altera só a linha dele. Linhas sem chave (não resolvidas) mantêm o texto gravado.
+REFERENCIAS = {
+    "vagas": ("ClienteID", "clientes", {"Cliente": "Cliente"}),
+    "candidatos": ("VagaID", "vagas", {"Cliente": "Cliente", "Cargo": "Cargo"}),
+}
+COLUNAS_CHAVE = {nome: [chave] for nome, (chave, _, _) in REFERENCIAS.items()}
+
+def colunas_arquivo(nome):
+    """Colunas gravadas no CSV da tabela (sem a versão): as do cadastro, chaves e derivadas."""
+    return TABELAS[nome][1] + COLUNAS_CHAVE.get(nome, []) + COLUNAS_DERIVADAS.get(nome, [])
+
+LOGS_COLS = ["DataHora", "Usuario", "Aba", "Acao", "ItemID", "Campo", "ValorAnterior", "ValorNovo", "Detalhe"]
+
+# ==============================
+# Opções de status
+# ==============================
+VAGAS_STATUS_OPCOES = ["Aberta", "Ag. Inicio", "Cancelada", "Fechada", "Reaberta", "Pausada"]
+CANDIDATOS_STATUS_OPCOES = ["Enviado", "Não entrevistado", "Validado", "Não validado", "Desistência"]
+
+# Opções de status da aba Comercial (ordem do funil)
+COMERCIAL_STATUS_OPCOES = [
+    "Prospect",
+    "Lead Qualificado",
+    "Reunião",
+    "Proposta Enviada",
+    "Negócio Fechado",
+    "Declinado"
+]
+
+# Status considerados encerrados (elegíveis para arquivamento)
+VAGAS_STATUS_FECHADAS = ["Fechada", "Cancelada"]
+COMERCIAL_STATUS_FECHADOS = ["Negócio Fechado", "Declinado"]
+
+# Vagas que não recebem novos candidatos
+VAGAS_STATUS_INDISPONIVEIS = ["Ag. Inicio", "Fechada"]
+
+# ==============================
+# Usuários e permissões
+# ==============================
+USUARIOS = {
+    "admin":   {"senha": "Parma!123@", "permissoes": ["menu", "clientes", "vagas", "candidatos", "logs", "comercial"]},
+    "andre":   {"senha": "And!123@",   "permissoes": ["clientes", "vagas", "candidatos", "comercial"]},
+    "lorrayne":{"senha": "Lrn!123@",   "permissoes": ["vagas", "candidatos"]},
+    "nikole":  {"senha": "Nkl!123@",   "permissoes": ["vagas", "candidatos"]},
+    "julia":   {"senha": "Jla!123@",   "permissoes": ["vagas", "candidatos"]},
+    "ricardo": {"senha": "Rcd!123@",   "permissoes": ["clientes", "vagas", "candidatos", "comercial"]},
+}
+
+# Além da permissão "comercial", a aba Comercial é restrita a estes usuários
+USUARIOS_COMERCIAL = ["admin", "andre", "ricardo"]
+USUARIO_SISTEMA = "sistema"  # autor das tarefas automáticas (ex.: compactação da lixeira)
+
+# ==============================
+# Recrutadores padrão
+# ==============================
+RECRUTADORES_PADRAO = ["Lorrayne", "Kaline", "Nikole", "Leila", "Julia"]
+
+# ==============================
+# Campos editáveis somente pelo admin
+# ==============================
+CAMPOS_VAGAS_ADMIN = ["Cliente", "Data de Abertura", "Cargo", "Recrutador", "Salário 1", "Salário 2"]
+CAMPOS_CANDIDATOS_ADMIN = ["Cliente", "Cargo", "Nome", "Telefone", "Recrutador"]
+CAMPOS_COMERCIAL_ADMIN = ["Empresa", "Cidade", "UF", "Canal", "Produto"]  # inclui Produto
+
+# ==============================
+# Tabelas: nome -> (arquivo, colunas, aba do log)
+# ==============================
+TABELAS = {
+    "clientes": (CLIENTES_CSV, CLIENTES_COLS, "Clientes"),
+    "vagas": (VAGAS_CSV, VAGAS_COLS, "Vagas"),
+    "candidatos": (CANDIDATOS_CSV, CANDIDATOS_COLS, "Candidatos"),
+    "comercial": (COMERCIAL_CSV, COMERCIAL_COLS, "Comercial"),
+}
+
+STATUS_OPCOES = {
+    "vagas": VAGAS_STATUS_OPCOES,
+    "candidatos": CANDIDATOS_STATUS_OPCOES,
+    "comercial": COMERCIAL_STATUS_OPCOES,
+}
+
+CAMPOS_OBRIGATORIOS = {
+    "clientes": ["Cliente", "Nome", "Cidade", "UF", "Telefone", "E-mail"],
+    "vagas": ["Cliente", "Cargo", "Recrutador"],
+    "candidatos": ["Cliente", "Cargo", "Nome", "Telefone", "Recrutador"],
+    "comercial": ["Empresa", "Cidade", "UF", "Nome", "Telefone", "E-mail", "Canal", "Produto"],
+}
+
+DETALHE_CRIAR = {
+    "clientes": "Cliente criado (ID {id}).",
+    "vagas": "Vaga criada (ID {id}).",
+    "candidatos": "Candidato criado (ID {id}).",
+    "comercial": "Registro comercial criado (ID {id}) com status 'Prospect'.",
+}
+
+# ============================================================
+# Erros
+# ============================================================
+
+class ErroValidacao(ValueError):
+    """Regra de negócio violada (mensagem pronta para exibir ao usuário)."""
+
+class ErroPermissao(PermissionError):
+    """Usuário sem permissão para a operação."""
+
+# ============================================================
+# Inquilinos (diretório de dados e cache por empresa/unidade)
+# ============================================================
+# O inquilino vale para a thread/contexto atual (sessão do Streamlit,
+# requisição da API, tarefa): caminho() põe os arquivos no diretório
+# dele e os caches do processo são separados por inquilino. Os caches
+# descartáveis ficam num LRU com orçamento de memória (medido pelas
+# tabelas carregadas); descartar um inquilino só custa reler os CSVs.
+
+NOME_INQUILINO = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+_inquilino = contextvars.ContextVar("inquilino", default=INQUILINO_PADRAO)
+_guarda_inquilinos = threading.RLock()
+_inquilinos = OrderedDict()  # inquilino -> {"caches", "tamanhos", "uso"}; o usado há mais tempo primeiro
+_estados = {}                # inquilino -> {nome: dict}: estado que não pode ser descartado (ex.: tarefas)
+
+def listar_inquilinos():
+    """Inquilinos disponíveis (subdiretórios de INQUILINOS_DIR); [INQUILINO_PADRAO] numa instalação de um só."""
+    try:
+        nomes = sorted(
+            nome for nome in os.listdir(INQUILINOS_DIR)
+            if NOME_INQUILINO.match(nome) and os.path.isdir(os.path.join(INQUILINOS_DIR, nome))
+        )
+    except FileNotFoundError:
+        nomes = []
+    return nomes or [INQUILINO_PADRAO]
+
+def conferir_inquilino(inquilino):
+    inquilino = (inquilino or "").strip()
+    disponiveis = listar_inquilinos()
+    if inquilino not in disponiveis:
+        if not inquilino:
+            raise ErroValidacao(f"Informe o inquilino ({', '.join(disponiveis)}).")
+        raise ErroValidacao(f"Inquilino desconhecido: {inquilino}")
+    return inquilino
+
+def usuarios_do_inquilino(inquilino):
+    """Usuários liberados no inquilino (INQUILINO_USUARIOS_JSON do diretório dele); None = todos (instalação de um só)."""
+    if inquilino == INQUILINO_PADRAO:
+        return None
+    return set(_ler_json(os.path.join(INQUILINOS_DIR, inquilino, INQUILINO_USUARIOS_JSON)).get("usuarios", []))
+
+def inquilino_atual():
+    return _inquilino.get()
+
+def caminho(arquivo):
+    """Caminho de um arquivo de dados (ex.: VAGAS_CSV) no diretório do inquilino atual."""
+    inquilino = _inquilino.get()
+    return os.path.join(INQUILINOS_DIR, inquilino, arquivo) if inquilino else arquivo
+
+def _csv(nome):
+    return caminho(TABELAS[nome][0])
+
+def usar_inquilino(inquilino):
+    """Passa a usar o inquilino na execução atual (script do Streamlit, comando da CLI)."""
+    inquilino = conferir_inquilino(inquilino)
+    _inquilino.set(inquilino)
+    _tocar(inquilino)
+    return inquilino
+
+@contextmanager
+def no_inquilino(inquilino, tocar=True):
+    # Trecho com outro inquilino (requisição da API, tarefa, agendador); volta ao anterior no fim
+    token = _inquilino.set(inquilino)
+    try:
+        if tocar:
+            _tocar(inquilino)
+        yield inquilino
+    finally:
+        _inquilino.reset(token)
+
+def _registro_inquilino(inquilino):
+    reg = _inquilinos.get(inquilino)
+    if reg is None:
+        with _guarda_inquilinos:
+            reg = _inquilinos.get(inquilino)
+            if reg is None:
+                reg = _inquilinos[inquilino] = {"caches": {}, "tamanhos": {}, "uso": time.monotonic()}
+                _observar_inquilino(inquilino)
+    return reg
+
+def _tocar(inquilino):
+    with _guarda_inquilinos:
+        _registro_inquilino(inquilino)["uso"] = time.monotonic()
+        _inquilinos.move_to_end(inquilino)
+    _aplicar_orcamento()
+
+def _contabilizar(chave, df):
+    # Memória de uma tabela guardada no cache do inquilino atual (None = saiu do cache)
+    tamanhos = _registro_inquilino(_inquilino.get())["tamanhos"]
+    if df is None:
+        tamanhos.pop(chave, None)
+    else:
+        tamanhos[chave] = int(df.memory_usage(deep=True).sum())
+        _aplicar_orcamento()
+
+def _aplicar_orcamento():
+    # Descarta os inquilinos ociosos e, acima do orçamento, os usados há mais tempo (nunca o atual)
+    atual = _inquilino.get()
+    limite_uso = time.monotonic() - INQUILINO_OCIOSO_MINUTOS * 60
+    with _guarda_inquilinos:
+        total = sum(sum(reg["tamanhos"].values()) for reg in _inquilinos.values())
+        for inquilino, reg in list(_inquilinos.items()):
+            if inquilino == atual:
+                continue
+            if reg["uso"] < limite_uso or total > CACHE_ORCAMENTO_MB * 1024 * 1024:
+                total -= sum(reg["tamanhos"].values())
+                del _inquilinos[inquilino]
+
+def estatisticas_cache():
+    """{inquilino: (MB em tabelas no cache, segundos desde o último uso)}, do usado há mais tempo ao atual."""
+    agora = time.monotonic()
+    with _guarda_inquilinos:
+        return {
+            inquilino: (round(sum(reg["tamanhos"].values()) / 1024 / 1024, 1), round(agora - reg["uso"]))
+            for inquilino, reg in _inquilinos.items()
+        }
+
+class _PorInquilino(MutableMapping):
+    """Dicionário do inquilino atual: cada inquilino vê o seu, criado por `inicial()` no primeiro uso."""
+    def __init__(self, nome, inicial, descartavel):
+        self._nome = nome
+        self._inicial = inicial
+        self._descartavel = descartavel
+
+    def _atual(self):
+        inquilino = _inquilino.get()
+        if self._descartavel:
+            dono = _registro_inquilino(inquilino)["caches"]
+        else:
+            dono = _estados.get(inquilino) or _estados.setdefault(inquilino, {})
+        d = dono.get(self._nome)
+        if d is None:
+            with _guarda_inquilinos:
+                d = dono.get(self._nome)
+                if d is None:
+                    d = dono[self._nome] = self._inicial()
+        return d
+
+    def __getitem__(self, chave):
+        return self._atual()[chave]
+
+    def __setitem__(self, chave, valor):
+        self._atual()[chave] = valor
+
+    def __delitem__(self, chave):
+        del self._atual()[chave]
+
+    def __iter__(self):
+        return iter(self._atual())
+
+    def __len__(self):
+        return len(self._atual())
+
+    def __contains__(self, chave):
+        return chave in self._atual()
+
+    def get(self, chave, padrao=None):
+        return self._atual().get(chave, padrao)
+
+    def clear(self):
+        self._atual().clear()
+
+def cache_do_inquilino(nome, inicial=dict):
+    """Cache do processo separado por inquilino; pode ser descartado a qualquer momento (orçamento/ociosidade)."""
+    return _PorInquilino(nome, inicial, descartavel=True)
+
+def estado_do_inquilino(nome, inicial=dict):
+    """Estado em memória separado por inquilino e nunca descartado (ex.: progresso das tarefas)."""
+    return _PorInquilino(nome, inicial, descartavel=False)
+
+# ============================================================
+# Utilidades de CSV / Persistência
+# ============================================================
+
+def _ler_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _gravar_json(path, dados):
+    # Troca atômica, como save_csv: uma queda no meio não deixa o arquivo truncado
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f)
+    os.replace(tmp, path)
+
+def load_csv(path, expected_cols):
+    # Tabelas com ID carregam também a coluna interna de versão
+    cols = expected_cols + [COLUNA_VERSAO] if "ID" in expected_cols else expected_cols
+    if os.path.exists(path):
+        try:
+            df = pd.read_csv(path, dtype=str)
+            df = df.fillna("")
+            for col in cols:
+                if col not in df.columns:
+                    df[col] = ""
+            df = df[cols]
+            if "ID" in df.columns:
+                df["ID"] = df["ID"].astype(str)
+                df = garantir_versao(df)
+            return df
+        except Exception:
+            return pd.DataFrame(columns=cols)
+    else:
+        return pd.DataFrame(columns=cols)
+
+def save_csv(df, path):
+    # Grava em arquivo temporário e troca de forma atômica: leitores nunca veem CSV pela metade
+    tmp = f"{path}.tmp"
+    df.to_csv(tmp, index=False, encoding="utf-8")
+    os.replace(tmp, path)
+
+def contidos(valores, em):
+    """Máscara de quais `valores` (pd.Index) estão em `em` (pd.Index)."""
+    # get_indexer (tabela hash) é bem mais rápido que isin em colunas de texto,
+    # mas exige valores únicos em `em` (IDs repetidos num CSV editado à mão)
+    if em.is_unique:
+        return em.get_indexer(valores) >= 0
+    return valores.isin(em)
+
+def garantir_versao(df):
+    # Linhas sem versão (criadas/importadas/legadas) começam na versão 1
+    df[COLUNA_VERSAO] = df[COLUNA_VERSAO].fillna("").replace("", "1")
+    return df
+
+def proxima_versao(versao):
+    try:
+        return str(int(versao) + 1)
+    except (TypeError, ValueError):
+        return "1"
+
+def _versoes_seguintes(serie):
+    return (pd.to_numeric(serie, errors="coerce").fillna(0).astype(int) + 1).astype(str)
+
+def _piso_id(tabela):
+    # IDs já arquivados, na lixeira ou expurgados dela continuam reservados (não podem ser reutilizados)
+    return max(_max_id_arquivado(tabela), _max_id_oculto(tabela), _max_id_expurgado(tabela))
+
+def next_id(df, id_col="ID", tabela=None):
+    piso = _piso_id(tabela) if tabela else 0
+    if df is None or df.empty:
+        return piso + 1
+    try:
+        vals = pd.to_numeric(df[id_col], errors="coerce").fillna(0).astype(int)
+        return max(int(vals.max()), piso) + 1
+    except Exception:
+        return piso + 1
+
+# ============================================================
+# Travas de escrita
+# ============================================================
+
+_travas_locais = {}
+_guarda_travas = threading.Lock()
+_travas_da_thread = threading.local()
+# Diagnóstico de contenção, por inquilino: caminho -> [aquisições, espera total (s), maior espera (s)]
+_espera_travas = cache_do_inquilino("travas.espera")
+
+def _registrar_espera(path, segundos):
+    with _guarda_travas:
+        estat = _espera_travas.setdefault(path, [0, 0.0, 0.0])
+        estat[0] += 1
+        estat[1] += segundos
+        estat[2] = max(estat[2], segundos)
+
+def estatisticas_travas(zerar=False):
+    """{caminho: (aquisições, espera total em s, maior espera em s)} do inquilino atual desde a subida (ou o último `zerar`)."""
+    with _guarda_travas:
+        estat = {path: tuple(v) for path, v in _espera_travas.items()}
+        if zerar:
+            _espera_travas.clear()
+    return estat
+
+def _travado(path):
+    # A thread atual segura a trava de escrita do arquivo (leitura para ler-alterar-gravar)
+    return path in getattr(_travas_da_thread, "caminhos", ())
+
+@contextmanager
+def trava_arquivo(path):
+    """
+    Trava exclusiva de escrita do arquivo, válida entre sessões/threads e entre
+    processos (fcntl). Reentrante na mesma thread.
+    """
+    em_uso = getattr(_travas_da_thread, "caminhos", None)
+    if em_uso is None:
+        em_uso = _travas_da_thread.caminhos = set()
+    if path in em_uso:
+        yield
+        return
+    em_uso.add(path)
+    inicio = time.perf_counter()
+    try:
+        if fcntl is not None:
+            with open(f"{path}.lock", "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                _registrar_espera(path, time.perf_counter() - inicio)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        else:
+            with _guarda_travas:
+                trava = _travas_locais.setdefault(path, threading.Lock())
+            with trava:
+                _registrar_espera(path, time.perf_counter() - inicio)
+                yield
+    finally:
+        em_uso.discard(path)
+
+@contextmanager
+def transacao(*nomes):
+    # Trava as tabelas sempre na mesma ordem (a de TABELAS) para evitar deadlock
+    with ExitStack() as travas:
+        for nome in TABELAS:
+            if nome in nomes:
+                travas.enter_context(trava_arquivo(_csv(nome)))
+        yield
+
+# ============================================================
+# Cache de tabelas (por processo, compartilhado entre sessões)
+# ============================================================
+
+# Um de cada por inquilino (ver cache_do_inquilino)
+_cache_tabelas = cache_do_inquilino("tabelas")  # nome -> (carimbo, tabela completa como está no disco)
+_cache_resolvidas = cache_do_inquilino("resolvidas")  # nome -> (tabela completa, tabela referenciada, tabela com os nomes preenchidos pela chave)
+_cache_visiveis = cache_do_inquilino("visiveis")  # nome -> (tabela com nomes de origem, carimbo da lixeira, tabela sem os registros na lixeira)
+_cache_lixeira = cache_do_inquilino("lixeira")
+
+def _carimbo(path):
+    # Toda gravação é troca atômica (os.replace) e gera um inode novo: o carimbo muda
+    # mesmo quando mtime tem resolução grosseira (ex.: volumes de rede) e o tamanho não muda
+    try:
+        info = os.stat(path)
+        return (info.st_mtime_ns, info.st_size, info.st_ino)
+    except FileNotFoundError:
+        return None
+
+def _tabela_completa(nome):
+    # Inclui os registros que estão na lixeira; relê do disco só se o arquivo foi regravado
+    csv_path = _csv(nome)
+    em_cache = _cache_tabelas.get(nome)
+    if em_cache is not None and _observador is not None and not _travado(csv_path):
+        # Com o observador ativo, o cache só sai daqui quando chega um evento do arquivo.
+        # Sob a trava (ler-alterar-gravar) o evento de quem gravou antes pode não ter
+        # chegado ainda: aí o carimbo é sempre conferido
+        return em_cache[1]
+    carimbo = _carimbo(csv_path)
+    if em_cache is not None and em_cache[0] == carimbo:
+        return em_cache[1]
+    df = load_csv(csv_path, colunas_arquivo(nome))
+    if nome == "vagas":
+        # Linhas gravadas antes das colunas derivadas existirem
+        df = normalizar_salarios(df)
+    _cache_tabelas[nome] = (carimbo, df)
+    if _carimbo(csv_path) != carimbo:
+        # Regravado durante a leitura: o evento pode ter chegado antes de o cache existir
+        _cache_tabelas.pop(nome, None)
+        return df
+    _contabilizar(nome, df)
+    return df
+
+def _tabela_resolvida(nome):
+    # Tabela completa com as colunas de nome preenchidas pela chave (join por índice de IDs).
+    # Refeita só quando a tabela ou a referenciada muda; sem diferenças, devolve a própria completa
+    completa = _tabela_completa(nome)
+    if nome not in REFERENCIAS:
+        return completa
+    chave, ref_nome, colunas = REFERENCIAS[nome]
+    ref = _tabela_resolvida(ref_nome)
+    em_cache = _cache_resolvidas.get(nome)
+    if em_cache is not None and em_cache[0] is completa and em_cache[1] is ref:
+        return em_cache[2]
+    ids_ref = pd.Index(ref["ID"])
+    if ids_ref.is_unique:
+        pos = ids_ref.get_indexer(completa[chave])
+    else:
+        # IDs repetidos na referenciada (ver integridade.py): vale a primeira linha
+        primeiras = np.flatnonzero(~ids_ref.duplicated())
+        pos = ids_ref[primeiras].get_indexer(completa[chave])
+        pos = np.where(pos >= 0, primeiras[pos], -1)
+    achou = pos >= 0
+    df = completa
+    for col, col_ref in colunas.items():
+        valores = ref[col_ref].to_numpy()[pos[achou]]
+        atuais = df[col].to_numpy()
+        if (atuais[achou] == valores).all():
+            continue
+        novos = atuais.copy()
+        novos[achou] = valores
+        if df is completa:
+            df = _copia_rasa(completa)
+        df[col] = novos
+    _cache_resolvidas[nome] = (completa, ref, df)
+    return df
+
+def carregar_tabela(nome):
+    """
+    Devolve a tabela do cache do processo, relendo do disco somente se o arquivo
+    foi regravado (por outra sessão ou processo) desde a última leitura.
+    Registros na lixeira ficam de fora.
+    O DataFrame devolvido é compartilhado: quem for alterar deve copiar antes.
+    """
+    completa = _tabela_resolvida(nome)
+    lixeira = _lixeira()
+    ocultos = lixeira[3].get(nome, set())
+    if not ocultos:
+        return completa
+    em_cache = _cache_visiveis.get(nome)
+    if em_cache is not None and em_cache[0] is completa and em_cache[1] == lixeira[0]:
+        return em_cache[2]
+    df = completa[~completa["ID"].isin(ocultos)]
+    _cache_visiveis[nome] = (completa, lixeira[0], df)
+    return df
+
+def _gravar_completa(nome, df):
+    # Chamada sob a trava da tabela
+    csv_path = _csv(nome)
+    anterior = _tabela_completa(nome)
+    save_csv(df, csv_path)
+    _cache_tabelas[nome] = (_carimbo(csv_path), df)
+    _contabilizar(nome, df)
+    alteradas, removidos = _diferenca(anterior, df)
+    _anexar_delta(nome, anterior, alteradas, removidos)
+    _registrar_gravacao(nome, anterior, alteradas, removidos)
+    return df
+
+def salvar_tabela(nome, df):
+    # Recebe a tabela visível (como devolvida por carregar_tabela); os registros
+    # na lixeira são regravados junto, intactos
+    if nome == "vagas":
+        df = normalizar_salarios(df)
+    ocultos = _ocultos(nome)
+    if not ocultos:
+        _gravar_completa(nome, df)
+        return df
+    atual = _tabela_completa(nome)
+    completa = _gravar_completa(nome, pd.concat([df, atual[atual["ID"].isin(ocultos)]], ignore_index=True))
+    _cache_visiveis[nome] = (completa, _lixeira()[0], df)
+    return df
+
+def _copia_rasa(df):
+    # As tabelas do cache são compartilhadas entre sessões e nunca alteradas no lugar.
+    # Com copy-on-write (pandas 3) a cópia rasa não duplica dados: só as colunas
+    # efetivamente escritas com .loc/.at são copiadas.
+    return df.copy(deep=False)
+
+def invalidar_cache():
+    # Só o do inquilino atual
+    _cache_tabelas.clear()
+    _cache_resolvidas.clear()
+    _cache_visiveis.clear()
+    _cache_lixeira.clear()
+    _registro_inquilino(_inquilino.get())["tamanhos"].clear()
+
+# ============================================================
+# Observador de mudanças (vários processos servindo o mesmo diretório)
+# ============================================================
+# Cada processo (worker do Streamlit, api.py) tem o seu cache. Com o watchdog
+# instalado, um observador do diretório de dados descarta do cache só a tabela
+# cujo CSV foi regravado por qualquer processo, e as leituras deixam de chamar
+# os.stat (menos as feitas sob a trava da tabela). Sem watchdog, cada leitura confere o carimbo do arquivo. Cada
+# inquilino passa a ser observado no primeiro uso do seu cache.
+
+_observador = None
+_guarda_observador = threading.Lock()
+_observados = set()  # inquilinos com o diretório já observado
+
+def _invalidar_caminho(path):
+    nome_arquivo = os.path.basename(path)
+    if nome_arquivo == LIXEIRA_CSV:
+        em_cache = _cache_lixeira.get("lixeira")
+        if em_cache is None or em_cache[0] != _carimbo(caminho(LIXEIRA_CSV)):
+            _cache_lixeira.clear()
+        return
+    for nome, (csv_path, _, _) in TABELAS.items():
+        if nome_arquivo == csv_path:
+            em_cache = _cache_tabelas.get(nome)
+            # Eventos da própria gravação (cache já atualizado) não derrubam o cache
+            if em_cache is None or em_cache[0] != _carimbo(caminho(csv_path)):
+                _cache_tabelas.pop(nome, None)
+                _contabilizar(nome, None)
+            return
+
+class _EventosDados(FileSystemEventHandler):
+    def __init__(self, inquilino):
+        self.inquilino = inquilino
+
+    def on_any_event(self, evento):
+        if evento.is_directory or self.inquilino not in _inquilinos:
+            return  # inquilino sem nada no cache
+        with no_inquilino(self.inquilino, tocar=False):
+            for path in (evento.src_path, getattr(evento, "dest_path", "")):
+                if path:
+                    _invalidar_caminho(path)
+
+def _observar_inquilino(inquilino):
+    # Chamada ao criar o cache do inquilino
+    with _guarda_observador:
+        if _observador is None or inquilino in _observados:
+            return
+        diretorio = os.path.join(INQUILINOS_DIR, inquilino) if inquilino else "."
+        _observador.schedule(_EventosDados(inquilino), os.path.abspath(diretorio), recursive=False)
+        _observados.add(inquilino)
+
+def iniciar_observador():
+    """Liga o observador (uma vez por processo). Devolve False quando o watchdog não está instalado."""
+    global _observador
+    if Observer is None:
+        return False
+    with _guarda_observador:
+        if _observador is None:
+            observador = Observer()
+            observador.daemon = True
+            observador.start()
+            _observador = observador
+            iniciar = True
+        else:
+            iniciar = False
+    if iniciar:
+        # O cache atual pode ter sido lido antes do observador existir: recomeça (e passa a
+        # observar) cada inquilino no próximo uso
+        with _guarda_inquilinos:
+            _inquilinos.clear()
+    return True
+
+def versao_dados():
+    # Assinatura barata (mtime/tamanho via os.stat) de todas as tabelas e da lixeira:
+    # muda só quando algum CSV é regravado ou algo é excluído/restaurado
+    arquivos = [csv_path for csv_path, _, _ in TABELAS.values()] + [LIXEIRA_CSV]
+    return tuple(_carimbo(caminho(arquivo)) for arquivo in arquivos)
+
+def registro_atual(nome, row_id):
+    # Linha completa (inclui colunas fora da listagem e a versão) direto da tabela atual
+    df = carregar_tabela(nome)
+    linha = df[df["ID"] == str(row_id)]
+    return linha.iloc[0].to_dict() if not linha.empty else {}
+
+# ============================================================
+# Salários (texto livre -> faixa numérica)
+# ============================================================
+
+# Número com separadores BR/US e multiplicador opcional: "2200", "R$ 2.200,00", "2,5 mil", "3k"
+_PADRAO_SALARIO = r"(?i)(?P<num>\d[\d.,]*)\s*(?P<mil>mil|k)?\b"
+SALARIO_MINIMO_VALIDO = 100  # números menores ("44h", "6x1") não são valores de salário
+# texto -> menor / maior valor: cada texto distinto é interpretado uma vez por processo e inquilino
+_salarios_lidos = cache_do_inquilino("salarios.textos", lambda: {"min": {}, "max": {}})
+
+def _ler_salarios(textos):
+    """Menor e maior valor citados em cada texto (NaN quando não há nenhum), de forma vetorizada."""
+    serie = pd.Series(textos, dtype=str)
+    partes = serie.str.extractall(_PADRAO_SALARIO)
+    num = partes["num"].str.rstrip(".,")
+    virgula_decimal = num.str.contains(r",\d{1,2}$")
+    ponto_decimal = num.str.contains(r"\.\d{1,2}$") & ~num.str.contains(",")
+    # O separador decimal vira "."; os demais são de milhar e saem
+    num = num.where(~virgula_decimal, num.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    num = num.where(virgula_decimal | ponto_decimal, num.str.replace(r"[.,]", "", regex=True))
+    valor = pd.to_numeric(num, errors="coerce") * np.where(partes["mil"].notna(), 1000, 1)
+    valor = valor[valor >= SALARIO_MINIMO_VALIDO].groupby(level=0)
+    return valor.min().reindex(serie.index), valor.max().reindex(serie.index)
+
+def _formatar_valores(valores):
+    texto = valores.round(2).astype(str).str.replace(r"\.0$", "", regex=True)
+    return texto.where(valores.notna(), "")
+
+def normalizar_salarios(df):
+    """
+    Preenche SalarioMin/SalarioMax a partir de "Salário 1"/"Salário 2": menor e maior
+    valor citados nos dois campos. Só os textos ainda não vistos pelo processo são interpretados.
+    """
+    s1, s2 = df["Salário 1"].fillna(""), df["Salário 2"].fillna("")
+    salario_min, salario_max = _salarios_lidos["min"], _salarios_lidos["max"]
+    novos = [t for t in pd.unique(pd.concat([s1, s2])) if t not in salario_min]
+    if novos:
+        minimos, maximos = _ler_salarios(novos)
+        salario_min.update(zip(novos, minimos))
+        salario_max.update(zip(novos, maximos))
+    minimo = np.fmin(s1.map(salario_min), s2.map(salario_min))
+    maximo = np.fmax(s1.map(salario_max), s2.map(salario_max))
+    df = _copia_rasa(df)
+    df["SalarioMin"] = _formatar_valores(minimo)
+    df["SalarioMax"] = _formatar_valores(maximo)
+    return df
+
+# ============================================================
+# Logs (append: uma escrita por operação, sem regravar o arquivo)
+# ============================================================
+
+def ensure_logs_file():
+    if not os.path.exists(caminho(LOGS_CSV)):
+        save_csv(pd.DataFrame(columns=LOGS_COLS), caminho(LOGS_CSV))
+
+def _texto(valor):
+    return "" if valor is None else str(valor)
+
+def log_item(aba, acao, item_id="", campo="", valor_anterior="", valor_novo="", detalhe=""):
+    return {
+        "Aba": aba,
+        "Acao": acao,
+        "ItemID": _texto(item_id),
+        "Campo": campo,
+        "ValorAnterior": _texto(valor_anterior),
+        "ValorNovo": _texto(valor_novo),
+        "Detalhe": detalhe,
+    }
+
+def registrar_logs(itens, usuario="admin"):
+    """Acrescenta várias linhas ao log numa única escrita."""
+    if not itens:
+        return
+    datahora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    linhas = [[datahora, usuario] + [item[c] for c in LOGS_COLS[2:]] for item in itens]
+    with trava_arquivo(caminho(LOGS_CSV)):
+        ensure_logs_file()
+        with open(caminho(LOGS_CSV), "a", newline="", encoding="utf-8") as f:
+            csv.writer(f, lineterminator="\n").writerows(linhas)
+
+def registrar_log(aba, acao, item_id="", campo="", valor_anterior="", valor_novo="", detalhe="", usuario="admin"):
+    registrar_logs([log_item(aba, acao, item_id, campo, valor_anterior, valor_novo, detalhe)], usuario)
+
+def carregar_logs():
+    ensure_logs_file()
+    try:
+        df = pd.read_csv(caminho(LOGS_CSV), dtype=str)
+        return df.fillna("")
+    except Exception:
+        return pd.DataFrame(columns=LOGS_COLS)
+
+# ============================================================
+# Usuários / permissões
+# ============================================================
+
+def autenticar(usuario, senha, inquilino=INQUILINO_PADRAO):
+    # Com vários inquilinos, o usuário também precisa estar liberado no escolhido
+    if not (usuario in USUARIOS and senha == USUARIOS[usuario]["senha"]):
+        return False
+    if inquilino not in listar_inquilinos():
+        return False
+    liberados = usuarios_do_inquilino(inquilino)
+    return liberados is None or usuario in liberados
+
+def permissoes(usuario):
+    return USUARIOS.get(usuario, {}).get("permissoes", [])
+
+def verificar_permissao(usuario, nome, acao="editar"):
+    if nome not in permissoes(usuario):
+        raise ErroPermissao(f"Usuário {usuario} não tem acesso a {nome}.")
+    if nome == "comercial" and usuario not in USUARIOS_COMERCIAL:
+        raise ErroPermissao(f"Usuário {usuario} não tem acesso ao Comercial.")
+    if acao == "importar" and usuario != "admin":
+        raise ErroPermissao("Somente o admin pode importar registros.")
+    if acao == "excluir" and nome != "comercial" and usuario != "admin":
+        raise ErroPermissao(f"Somente o admin pode excluir {nome}.")
+
+def campos_editaveis(nome, cols, usuario):
+    bloqueados = {"ID", "Atualização"}
+    if nome == "comercial":
+        bloqueados.add("Data")
+    if usuario != "admin":
+        bloqueados.update({
+            "vagas": CAMPOS_VAGAS_ADMIN,
+            "candidatos": CAMPOS_CANDIDATOS_ADMIN,
+            "comercial": CAMPOS_COMERCIAL_ADMIN,
+        }.get(nome, []))
+    return [c for c in cols if c not in bloqueados]
+
+def _validar_status(nome, valores):
+    opcoes = STATUS_OPCOES.get(nome)
+    if opcoes is None:
+        return
+    invalidos = sorted(set(valores) - set(opcoes))
+    if invalidos:
+        raise ErroValidacao(f"Status inválido para {nome}: {invalidos}. Opções: {opcoes}")
+
+# ============================================================
+# Operações em lote
+# ============================================================
+
+def _juntar_nomes(df, colunas):
+    return df[list(colunas)].astype(str).agg("\x1f".join, axis=1) if len(colunas) > 1 else df[list(colunas)[0]]
+
+def chaves_pelos_nomes(nome, df):
+    """
+    Chave (ID da referenciada) de cada linha de `df` a partir das colunas de nome:
+    vaga -> cliente de mesmo nome (o de menor ID); candidato -> vaga mais recente
+    (maior ID) com o mesmo Cliente + Cargo. Sem correspondência, "".
+    """
+    _, ref_nome, colunas = REFERENCIAS[nome]
+    ref = _tabela_resolvida(ref_nome)
+    ref = ref.iloc[np.argsort(pd.to_numeric(ref["ID"], errors="coerce").fillna(0).to_numpy(), kind="stable")]
+    nomes_ref = _juntar_nomes(ref, colunas.values())
+    manter = "first" if nome == "vagas" else "last"
+    mapa = pd.Series(ref["ID"].to_numpy(), index=nomes_ref.to_numpy())
+    mapa = mapa[~nomes_ref.duplicated(keep=manter).to_numpy()]
+    return _juntar_nomes(df, colunas.keys()).map(mapa).fillna("")
+
+def _preencher_chaves(nome, df, linhas=None, exigir=True):
+    # Recalcula a chave das `linhas` (padrão: as que estão sem chave) pelas colunas de nome.
+    # Vaga precisa de cliente cadastrado (exceto na importação, que aceita o texto como veio)
+    chave = REFERENCIAS[nome][0]
+    if linhas is None:
+        linhas = df[chave] == ""
+    if not linhas.any():
+        return df
+    df = _copia_rasa(df)
+    df.loc[linhas, chave] = chaves_pelos_nomes(nome, df[linhas])
+    if nome == "vagas" and exigir:
+        inexistentes = sorted(set(df.loc[linhas & (df[chave] == ""), "Cliente"]))
+        if inexistentes:
+            raise ErroValidacao(f"Clientes não cadastrados: {inexistentes}")
+    return df
+
+def migrar_chaves(usuario=USUARIO_SISTEMA):
+    """
+    Migração única (idempotente): preenche ClienteID das vagas e VagaID dos candidatos
+    gravados antes das chaves existirem, pelos nomes. Linhas sem correspondência
+    ficam sem chave e mantêm o texto. Devolve {tabela: linhas preenchidas}.
+    """
+    resumo = {}
+    with transacao("clientes", "vagas", "candidatos"):
+        for nome, (chave, _, _) in REFERENCIAS.items():  # vagas antes de candidatos
+            completa = _tabela_completa(nome)
+            vazias = completa[chave] == ""
+            if not vazias.any():
+                continue
+            df = _copia_rasa(completa)
+            df.loc[vazias, chave] = chaves_pelos_nomes(nome, completa[vazias])
+            preenchidas = vazias & (df[chave] != "")
+            if preenchidas.any():
+                df.loc[preenchidas, COLUNA_VERSAO] = _versoes_seguintes(df.loc[preenchidas, COLUNA_VERSAO])
+                _gravar_completa(nome, df)
+                resumo[nome] = int(preenchidas.sum())
+    if resumo:
+        registrar_log("Sistema", "Migrar", detalhe=f"Chaves ClienteID/VagaID preenchidas pelos nomes: {resumo}", usuario=usuario)
+    return resumo
+
+def _tocar_vagas(vaga_ids):
+    """
+    Marca "Atualização" = hoje nas vagas (por ID) dos candidatos alterados.
+    Deve rodar dentro de uma transação que trave "vagas". Devolve os itens de log.
+    """
+    vaga_ids = set(vaga_ids) - {""}
+    if not vaga_ids:
+        return []
+    vagas = carregar_tabela("vagas")
+    hoje = datetime.now().strftime("%d/%m/%Y")
+    alvo = vagas["ID"].isin(vaga_ids) & (vagas["Atualização"] != hoje)
+    if not alvo.any():
+        return []
+    itens = [
+        log_item("Vagas", "Atualização", item_id=i, campo="Atualização", valor_anterior=antigo, valor_novo=hoje,
+                 detalhe="Atualização de status de candidato atrelado à vaga.")
+        for i, antigo in zip(vagas.loc[alvo, "ID"], vagas.loc[alvo, "Atualização"])
+    ]
+    vagas = _copia_rasa(vagas)
+    vagas.loc[alvo, "Atualização"] = hoje
+    vagas.loc[alvo, COLUNA_VERSAO] = _versoes_seguintes(vagas.loc[alvo, COLUNA_VERSAO])
+    salvar_tabela("vagas", vagas)
+    return itens
+
+# Atualiza campo "Atualização" da vaga quando mexe num candidato dela
+def atualizar_vaga_data_atualizacao(vaga_id, usuario="admin"):
+    with transacao("vagas"):
+        itens = _tocar_vagas([str(vaga_id)])
+    registrar_logs(itens, usuario)
+
+def _completar_registro(nome, registro, hoje):
+    reg = {c: _texto(v).strip() for c, v in registro.items()}
+    if nome == "clientes":
+        reg["Data"] = hoje
+        reg["UF"] = reg.get("UF", "").upper()
+    elif nome == "vagas":
+        cliente_id = reg.get("ClienteID", "")
+        if cliente_id:
+            cliente = registro_atual("clientes", cliente_id)
+            if not cliente:
+                raise ErroValidacao(f"Cliente {cliente_id} não encontrado.")
+            reg["Cliente"] = cliente["Cliente"]
+        reg.setdefault("Data de Abertura", hoje)
+        reg.setdefault("Status", "Aberta")
+        reg["Atualização"] = ""
+    elif nome == "candidatos":
+        vaga_id = reg.get("VagaID", "")
+        if vaga_id:
+            vaga = registro_atual("vagas", vaga_id)
+            if not vaga:
+                raise ErroValidacao(f"Vaga {vaga_id} não encontrada.")
+            if vaga["Status"] in VAGAS_STATUS_INDISPONIVEIS:
+                raise ErroValidacao(f"Vaga {vaga_id} não está disponível ({vaga['Status']}).")
+            reg["Cliente"], reg["Cargo"] = vaga["Cliente"], vaga["Cargo"]
+        reg.setdefault("Status", "Enviado")
+        reg.setdefault("Data de Início", "")
+    elif nome == "comercial":
+        reg["Data"] = hoje
+        reg["UF"] = reg.get("UF", "").upper()
+        reg["Status"] = "Prospect"  # travado no cadastro
+    return reg
+
+def criar_registros(nome, registros, usuario):
+    """Cria vários registros numa única gravação. Devolve a lista de IDs criados."""
+    verificar_permissao(usuario, nome, "criar")
+    _, cols, aba = TABELAS[nome]
+    if not registros:
+        return []
+    hoje = date.today().strftime("%d/%m/%Y")
+    novos = pd.DataFrame([_completar_registro(nome, r, hoje) for r in registros])
+    aceitas = cols + COLUNAS_CHAVE.get(nome, [])
+    desconhecidas = sorted(set(novos.columns) - set(aceitas))
+    if desconhecidas:
+        raise ErroValidacao(f"Colunas desconhecidas para {nome}: {desconhecidas}")
+    novos = novos.reindex(columns=aceitas).fillna("")
+
+    obrigatorios = CAMPOS_OBRIGATORIOS[nome]
+    faltando = novos[obrigatorios].eq("").any(axis=1)
+    if faltando.any():
+        raise ErroValidacao(f"Preencha todos os campos obrigatórios {obrigatorios} (registros {list(novos.index[faltando])}).")
+    if "Status" in novos.columns:
+        _validar_status(nome, novos["Status"])
+    if nome in REFERENCIAS:
+        # Sem chave informada: pelo nome do cliente / pelo par Cliente + Cargo
+        novos = _preencher_chaves(nome, novos)
+
+    travar = ("vagas", "candidatos") if nome == "candidatos" else (nome,)
+    with transacao(*travar):
+        base = carregar_tabela(nome)
+        inicio = next_id(base, "ID", tabela=nome)
+        ids = [str(i) for i in range(inicio, inicio + len(novos))]
+        novos["ID"] = ids
+        novos[COLUNA_VERSAO] = "1"
+        salvar_tabela(nome, pd.concat([base, novos], ignore_index=True))
+        itens = [log_item(aba, "Criar", item_id=i, detalhe=DETALHE_CRIAR[nome].format(id=i)) for i in ids]
+        if nome == "candidatos":
+            itens += _tocar_vagas(novos["VagaID"])
+    registrar_logs(itens, usuario)
+    return ids
+
+def atualizar_registros(nome, ids, campos, usuario):
+    """
+    Aplica os mesmos valores (`campos`) a todos os `ids` numa atualização
+    vetorizada, com uma gravação e um append de log. Respeita os campos
+    restritos ao admin. Devolve os IDs efetivamente alterados.
+    """
+    verificar_permissao(usuario, nome, "editar")
+    _, cols, aba = TABELAS[nome]
+    desconhecidos = sorted(set(campos) - set(cols))
+    if desconhecidos:
+        raise ErroValidacao(f"Campos desconhecidos para {nome}: {desconhecidos}")
+    proibidos = sorted(set(campos) - set(campos_editaveis(nome, cols, usuario)))
+    if proibidos:
+        raise ErroPermissao(f"Campos não editáveis por {usuario}: {proibidos}")
+    campos = {c: _texto(v) for c, v in campos.items()}
+    if "Status" in campos:
+        _validar_status(nome, [campos["Status"]])
+
+    ids = [str(i) for i in ids]
+    travar = ("vagas", "candidatos") if nome == "candidatos" else (nome,)
+    with transacao(*travar):
+        df = carregar_tabela(nome)
+        mask = df["ID"].isin(ids)
+        alterados = pd.Series(False, index=df.index)
+        itens = []
+        novo_df = _copia_rasa(df)
+        for c, valor in campos.items():
+            muda = mask & (df[c] != valor)
+            if not muda.any():
+                continue
+            itens += [
+                log_item(aba, "Editar", item_id=i, campo=c, valor_anterior=antigo, valor_novo=valor, detalhe=f"Registro {i} alterado")
+                for i, antigo in zip(df.loc[muda, "ID"], df.loc[muda, c])
+            ]
+            novo_df.loc[muda, c] = valor
+            alterados |= muda
+        if alterados.any():
+            if nome in REFERENCIAS and set(campos) & set(REFERENCIAS[nome][2]):
+                novo_df = _preencher_chaves(nome, novo_df, alterados)
+            novo_df.loc[alterados, COLUNA_VERSAO] = _versoes_seguintes(novo_df.loc[alterados, COLUNA_VERSAO])
+            salvar_tabela(nome, novo_df)
+            if nome == "candidatos":
+                itens += _tocar_vagas(novo_df.loc[alterados, "VagaID"])
+    registrar_logs(itens, usuario)
+    return df.loc[alterados, "ID"].tolist()
+
+def salvar_edicao(nome, record, new_data, usuario):
+    """
+    Grava a edição de um registro como compare-and-swap sobre a coluna de versão.
+    Só os campos que o usuário alterou (em relação ao que ele abriu) são aplicados,
+    então edições concorrentes em campos diferentes são mescladas.
+    Retorna (status, detalhes): "ok", "nao_encontrado" ou "conflito" (lista campo a campo + linha atual).
+    """
+    verificar_permissao(usuario, nome, "editar")
+    _, cols, aba = TABELAS[nome]
+    alteracoes = {
+        c: _texto(new_data.get(c, ""))
+        for c in campos_editaveis(nome, cols, usuario)
+        if str(record.get(c, "")) != str(new_data.get(c, ""))
+    }
+    if "Status" in alteracoes:
+        _validar_status(nome, [alteracoes["Status"]])
+
+    travar = ("vagas", "candidatos") if nome == "candidatos" else (nome,)
+    with transacao(*travar):
+        df = carregar_tabela(nome)
+        idx = df[df["ID"] == str(record.get("ID", ""))].index
+        if idx.empty:
+            return "nao_encontrado", None
+        idx0 = idx[0]
+        atual = df.loc[idx0].to_dict()
+
+        if str(atual[COLUNA_VERSAO]) != str(record.get(COLUNA_VERSAO, "")):
+            conflitos = [
+                {"Campo": c, "Valor ao abrir": record.get(c, ""), "Valor atual (outro usuário)": atual[c], "Seu valor": novo}
+                for c, novo in alteracoes.items()
+                if str(atual[c]) != str(record.get(c, "")) and str(atual[c]) != str(novo)
+            ]
+            if conflitos:
+                return "conflito", {"conflitos": conflitos, "atual": atual}
+
+        mudou = {c: novo for c, novo in alteracoes.items() if str(atual[c]) != str(novo)}
+        itens = [
+            log_item(aba, "Editar", item_id=record["ID"], campo=c, valor_anterior=atual[c], valor_novo=novo,
+                     detalhe=f"Registro {record['ID']} alterado")
+            for c, novo in mudou.items()
+        ]
+        if mudou:
+            df = _copia_rasa(df)
+            for c, novo in mudou.items():
+                df.at[idx0, c] = novo
+            if nome in REFERENCIAS and set(mudou) & set(REFERENCIAS[nome][2]):
+                df = _preencher_chaves(nome, df, df.index == idx0)
+            df.at[idx0, COLUNA_VERSAO] = proxima_versao(atual[COLUNA_VERSAO])
+            salvar_tabela(nome, df)
+            if nome == "candidatos":
+                # Só quando o candidato mudou de fato (salvar sem alterações não mexe na vaga)
+                itens += _tocar_vagas(df.loc[[idx0], "VagaID"])
+    registrar_logs(itens, usuario)
+    return "ok", df.loc[idx0].to_dict()
+
+def mover_status_comercial(ids, direcao, usuario):
+    """
+    Move os registros comerciais um passo no funil:
+    direcao="+" -> próximo status, direcao="-" -> status anterior.
+    Devolve os IDs movidos (os que já estão na ponta do funil ficam onde estão).
+    """
+    verificar_permissao(usuario, "comercial", "editar")
+    passo = 1 if direcao == "+" else -1
+    ids = [str(i) for i in ids]
+    with transacao("comercial"):
+        df = carregar_tabela("comercial")
+        pos = df["Status"].map({s: i for i, s in enumerate(COMERCIAL_STATUS_OPCOES)})
+        novo_pos = pos + passo
+        mover = df["ID"].isin(ids) & novo_pos.between(0, len(COMERCIAL_STATUS_OPCOES) - 1)
+        if not mover.any():
+            return []
+        novos = novo_pos[mover].astype(int).map(dict(enumerate(COMERCIAL_STATUS_OPCOES)))
+        itens = [
+            log_item("Comercial", "Editar", item_id=i, campo="Status", valor_anterior=antigo, valor_novo=novo,
+                     detalhe=f"Movido no funil ({'→' if direcao == '+' else '←'})")
+            for i, antigo, novo in zip(df.loc[mover, "ID"], df.loc[mover, "Status"], novos)
+        ]
+        df = _copia_rasa(df)
+        df.loc[mover, "Status"] = novos
+        df.loc[mover, COLUNA_VERSAO] = _versoes_seguintes(df.loc[mover, COLUNA_VERSAO])
+        salvar_tabela("comercial", df)
+    registrar_logs(itens, usuario)
+    return df.loc[mover, "ID"].tolist()
+
+def excluir_registros(nome, ids, usuario):
+    """
+    Exclusão lógica: os registros (com cascata: cliente -> vagas -> candidatos,
+    vaga -> candidatos) vão para a lixeira numa única linha acrescentada a
+    lixeira.csv, sem regravar nenhuma tabela. Podem ser restaurados (desfazer /
+    lixeira do admin) até a compactação.
+    Devolve {"lote": ..., "removidos": {tabela: [IDs]}}.
+    """
+    verificar_permissao(usuario, nome, "excluir")
+    ids = [str(i) for i in ids]
+    removidos = {}
+    itens = []
+    cascata = {"clientes": ("clientes", "vagas", "candidatos"), "vagas": ("vagas", "candidatos")}.get(nome, (nome,))
+    with transacao(*cascata), trava_arquivo(caminho(LIXEIRA_CSV)):
+        base = carregar_tabela(nome)
+        alvo = base["ID"].isin(ids)
+        if not alvo.any():
+            return {"lote": None, "removidos": removidos}
+        removidos[nome] = base.loc[alvo, "ID"].tolist()
+
+        if nome == "clientes":
+            vagas = carregar_tabela("vagas")
+            candidatos = carregar_tabela("candidatos")
+            alvo_vagas = vagas["ClienteID"].isin(removidos["clientes"])
+            removidos["vagas"] = vagas.loc[alvo_vagas, "ID"].tolist()
+            removidos["candidatos"] = candidatos.loc[candidatos["VagaID"].isin(removidos["vagas"]), "ID"].tolist()
+            vagas_por_cliente = vagas.loc[alvo_vagas].groupby("ClienteID")["ID"].agg(list)
+            for cid in removidos["clientes"]:
+                vagas_rel = vagas_por_cliente.get(cid, [])
+                itens += [
+                    log_item("Clientes", "Excluir", item_id=cid, detalhe=f"Cliente {cid} excluído. Vagas removidas: {vagas_rel}"),
+                    log_item("Vagas", "Excluir em Cascata", detalhe=f"Cliente {cid} excluído. Vagas removidas: {vagas_rel}"),
+                    log_item("Candidatos", "Excluir em Cascata", detalhe=f"Cliente {cid} excluído. Candidatos removidos."),
+                ]
+
+        elif nome == "vagas":
+            candidatos = carregar_tabela("candidatos")
+            alvo_cand = candidatos["VagaID"].isin(removidos["vagas"])
+            removidos["candidatos"] = candidatos.loc[alvo_cand, "ID"].tolist()
+            candidatos_por_vaga = candidatos.loc[alvo_cand].groupby("VagaID")["ID"].agg(list)
+            for vid in removidos["vagas"]:
+                candidatos_rel = candidatos_por_vaga.get(vid, [])
+                itens += [
+                    log_item("Vagas", "Excluir", item_id=vid, detalhe=f"Vaga {vid} excluída. Candidatos removidos: {candidatos_rel}"),
+                    log_item("Candidatos", "Excluir em Cascata", detalhe=f"Vaga {vid} excluída. Candidatos removidos: {candidatos_rel}"),
+                ]
+
+        elif nome == "candidatos":
+            itens += [log_item("Candidatos", "Excluir", item_id=i, detalhe=f"Candidato {i} excluído.") for i in removidos[nome]]
+        else:
+            itens += [log_item("Comercial", "Excluir", item_id=i, detalhe=f"Registro comercial {i} excluído.") for i in removidos[nome]]
+
+        removidos = {t: lista for t, lista in removidos.items() if lista}
+        total = sum(len(lista) for lista in removidos.values())
+        lote = _anexar_lixeira(usuario, "Excluir", nome, removidos,
+                               f"{TABELAS[nome][2]} {', '.join(removidos[nome])} ({total} registro(s) com dependentes)")
+        for tabela, lista in removidos.items():
+            _registrar_alteracoes(tabela, [("excluir", i, None) for i in lista])
+    registrar_logs(itens, usuario)
+    return {"lote": lote, "removidos": removidos}
+
+# ============================================================
+# Reparos de integridade (usados por integridade.py)
+# ============================================================
+
+def _somente_admin_reparo(usuario):
+    if usuario != "admin":
+        raise ErroPermissao("Somente o admin pode corrigir a integridade dos dados.")
+
+def religar_chaves(nome, ids, usuario):
+    """
+    Refaz pelas colunas de nome (Cliente / Cliente + Cargo) a chave dos registros `ids`
+    de vagas ou candidatos: sem chave ou ligados a um registro que não existe mais.
+    Só grava as que encontram correspondência. Devolve os IDs religados.
+    """
+    _somente_admin_reparo(usuario)
+    chave, ref_nome, _ = REFERENCIAS[nome]
+    ids = [str(i) for i in ids]
+    with transacao(ref_nome, nome):
+        completa = _tabela_completa(nome)
+        alvo = completa["ID"].isin(ids)
+        novas = pd.Series("", index=completa.index)
+        novas[alvo] = chaves_pelos_nomes(nome, completa[alvo])
+        mudar = alvo & (novas != "") & (novas != completa[chave])
+        if not mudar.any():
+            return []
+        itens = [
+            log_item(TABELAS[nome][2], "Editar", item_id=i, campo=chave, valor_anterior=antiga, valor_novo=nova,
+                     detalhe=f"{chave} refeito pelo nome (integridade).")
+            for i, antiga, nova in zip(completa.loc[mudar, "ID"], completa.loc[mudar, chave], novas[mudar])
+        ]
+        df = _copia_rasa(completa)
+        df.loc[mudar, chave] = novas[mudar]
+        df.loc[mudar, COLUNA_VERSAO] = _versoes_seguintes(df.loc[mudar, COLUNA_VERSAO])
+        _gravar_completa(nome, df)
+    registrar_logs(itens, usuario)
+    return completa.loc[mudar, "ID"].tolist()
+
+def renumerar_registros(nome, usuario, ids_arquivados=()):
+    """
+    Dá IDs novos às linhas de `nome` com ID repetido (a primeira do arquivo fica com o
+    ID) e às que usam um ID também presente no arquivo morto (`ids_arquivados`).
+    Nestas o ID ativo é único, e as chaves dos dependentes (ClienteID/VagaID) seguem
+    o novo ID. Devolve {ID antigo: [IDs novos]}.
+    """
+    _somente_admin_reparo(usuario)
+    filhos = [(filho, chave) for filho, (chave, ref, _) in REFERENCIAS.items() if ref == nome]
+    ids_arquivados = set(map(str, ids_arquivados))
+    with transacao(nome, *[filho for filho, _ in filhos]):
+        completa = _tabela_completa(nome)
+        repetidas = completa["ID"].duplicated(keep="first")
+        no_arquivo = completa["ID"].isin(ids_arquivados) & ~completa["ID"].duplicated(keep=False)
+        alvo = repetidas | no_arquivo
+        if not alvo.any():
+            return {}
+        inicio = next_id(completa, "ID", tabela=nome)
+        antigos = completa.loc[alvo, "ID"].tolist()
+        novos = [str(i) for i in range(inicio, inicio + len(antigos))]
+        df = _copia_rasa(completa)
+        df.loc[alvo, "ID"] = novos
+        df.loc[alvo, COLUNA_VERSAO] = _versoes_seguintes(df.loc[alvo, COLUNA_VERSAO])
+        aba = TABELAS[nome][2]
+        itens = [
+            log_item(aba, "Renumerar", item_id=novo, campo="ID", valor_anterior=antigo, valor_novo=novo,
+                     detalhe=f"ID {antigo} {'repetido' if rep else 'já usado no arquivo morto'}; registro renumerado (integridade).")
+            for antigo, novo, rep in zip(antigos, novos, repetidas[alvo])
+        ]
+        _gravar_completa(nome, df)
+        # Dependentes acompanham só os IDs que não eram ambíguos (colisão com o arquivo morto)
+        mapa = dict(zip(completa.loc[no_arquivo, "ID"], df.loc[no_arquivo, "ID"]))
+        for filho, chave in filhos:
+            dep = _tabela_completa(filho)
+            mover = dep[chave].isin(mapa)
+            if mover.any():
+                dep = _copia_rasa(dep)
+                dep.loc[mover, chave] = dep.loc[mover, chave].map(mapa)
+                dep.loc[mover, COLUNA_VERSAO] = _versoes_seguintes(dep.loc[mover, COLUNA_VERSAO])
+                _gravar_completa(filho, dep)
+                itens.append(log_item(TABELAS[filho][2], "Editar", campo=chave,
+                                      detalhe=f"{int(mover.sum())} registro(s) acompanharam a renumeração de {aba}: {mapa}"))
+    registrar_logs(itens, usuario)
+    resultado = {}
+    for antigo, novo in zip(antigos, novos):
+        resultado.setdefault(antigo, []).append(novo)
+    return resultado
+
+# ============================================================
+# Lixeira (exclusão lógica, desfazer e compactação)
+# ============================================================
+
+def _lixeira():
+    """
+    (carimbo, df, lotes ativos {lote: registro}, ocultos {tabela: set de IDs}),
+    relida só quando lixeira.csv muda. Lote ativo = excluído e ainda não restaurado.
+    """
+    em_cache = _cache_lixeira.get("lixeira")
+    if em_cache is not None and _observador is not None and not _travado(caminho(LIXEIRA_CSV)):
+        return em_cache
+    carimbo = _carimbo(caminho(LIXEIRA_CSV))
+    if em_cache is not None and em_cache[0] == carimbo:
+        return em_cache
+    df = load_csv(caminho(LIXEIRA_CSV), LIXEIRA_COLS)
+    restaurados = set(df.loc[df["Acao"] == "Restaurar", "Lote"])
+    ativos = {}
+    ocultos = {nome: set() for nome in TABELAS}
+    for reg in df[df["Acao"] == "Excluir"].to_dict(orient="records"):
+        if reg["Lote"] in restaurados:
+            continue
+        reg["IDs"] = json.loads(reg["IDs"] or "{}")
+        ativos[reg["Lote"]] = reg
+        for tabela, lista in reg["IDs"].items():
+            ocultos.setdefault(tabela, set()).update(lista)
+    lixeira = _cache_lixeira["lixeira"] = (carimbo, df, ativos, ocultos)
+    if _carimbo(caminho(LIXEIRA_CSV)) != carimbo:
+        _cache_lixeira.pop("lixeira", None)  # regravada durante a leitura (ver _tabela_completa)
+    return lixeira
+
+def _ocultos(nome):
+    return _lixeira()[3].get(nome, set())
+
+def _max_id_oculto(tabela):
+    return max((int(i) for i in _ocultos(tabela) if str(i).isdigit()), default=0)
+
+def _max_id_expurgado(tabela):
+    return int(_ler_json(caminho(LIXEIRA_IDS_JSON)).get(tabela, 0))
+
+def _anexar_lixeira(usuario, acao, tabela, ids, detalhe, lote=None):
+    # Append de uma linha (chamar com a trava da lixeira e das tabelas envolvidas)
+    agora = datetime.now()
+    lote = lote or agora.strftime("%Y%m%d%H%M%S%f")
+    novo = not os.path.exists(caminho(LIXEIRA_CSV))
+    with open(caminho(LIXEIRA_CSV), "a", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f, lineterminator="\n")
+        if novo:
+            escritor.writerow(LIXEIRA_COLS)
+        escritor.writerow([lote, agora.strftime("%d/%m/%Y %H:%M:%S"), usuario, acao, tabela,
+                           json.dumps(ids, ensure_ascii=False), detalhe])
+    return lote
+
+def listar_lixeira():
+    # Lotes ainda restauráveis, mais recentes primeiro
+    ativos = _lixeira()[2]
+    return [ativos[lote] for lote in sorted(ativos, reverse=True)]
+
+def restaurar_lote(lote, usuario):
+    """
+    Tira um lote da lixeira (os registros voltam às telas). O admin restaura
+    qualquer lote; os demais usuários só desfazem a própria exclusão dentro
+    de DESFAZER_SEGUNDOS. Devolve {tabela: [IDs restaurados]}.
+    """
+    lote = str(lote)
+    reg = _lixeira()[2].get(lote)
+    if not reg:
+        raise ErroValidacao(f"Lote {lote} não está mais na lixeira.")
+    with transacao(*reg["IDs"]), trava_arquivo(caminho(LIXEIRA_CSV)):
+        reg = _lixeira()[2].get(lote)
+        if not reg:
+            raise ErroValidacao(f"Lote {lote} não está mais na lixeira.")
+        if usuario != "admin":
+            excluido_em = datetime.strptime(reg["DataHora"], "%d/%m/%Y %H:%M:%S")
+            if reg["Usuario"] != usuario or (datetime.now() - excluido_em).total_seconds() > DESFAZER_SEGUNDOS:
+                raise ErroPermissao("Somente o admin pode restaurar este item da lixeira.")
+        _anexar_lixeira(usuario, "Restaurar", reg["Tabela"], reg["IDs"], f"Restauração do lote {lote}", lote=lote)
+        for tabela, lista in reg["IDs"].items():
+            completa = _tabela_completa(tabela)
+            _registrar_linhas(tabela, "inserir", completa[completa["ID"].isin(lista)])
+    itens = [
+        log_item(TABELAS[tabela][2], "Restaurar", item_id=i, detalhe=f"Registro {i} restaurado da lixeira (lote {lote}).")
+        for tabela, lista in reg["IDs"].items() for i in lista
+    ]
+    registrar_logs(itens, usuario)
+    return reg["IDs"]
+
+def compactar_lixeira(idade_dias=LIXEIRA_RETENCAO_DIAS, usuario="admin"):
+    """
+    Remove fisicamente dos CSVs os lotes excluídos há mais de `idade_dias`
+    (uma regravação por tabela afetada) e reescreve lixeira.csv só com os lotes
+    que continuam restauráveis. Devolve {tabela: quantidade removida}.
+    """
+    if usuario not in ("admin", USUARIO_SISTEMA):
+        raise ErroPermissao("Somente o admin pode compactar a lixeira.")
+    limite = datetime.now() - timedelta(days=idade_dias)
+    with transacao(*TABELAS), trava_arquivo(caminho(LIXEIRA_CSV)):
+        _, df, ativos, _ = _lixeira()
+        expurgar = {
+            lote: reg for lote, reg in ativos.items()
+            if datetime.strptime(reg["DataHora"], "%d/%m/%Y %H:%M:%S") <= limite
+        }
+        por_tabela = {}
+        for reg in expurgar.values():
+            for tabela, lista in reg["IDs"].items():
+                por_tabela.setdefault(tabela, set()).update(lista)
+        if por_tabela:
+            # Os IDs saem da tabela e da lixeira: a reserva é gravada antes de expurgar
+            marcas = _ler_json(caminho(LIXEIRA_IDS_JSON))
+            for tabela, ids in por_tabela.items():
+                maior = max((int(i) for i in ids if str(i).isdigit()), default=0)
+                marcas[tabela] = max(int(marcas.get(tabela, 0)), maior)
+            _gravar_json(caminho(LIXEIRA_IDS_JSON), marcas)
+        for tabela, ids in por_tabela.items():
+            completa = _tabela_completa(tabela)
+            _gravar_completa(tabela, completa[~completa["ID"].isin(ids)])
+        # Lotes restaurados e expurgados saem do arquivo; ficam só os restauráveis
+        manter = df[(df["Acao"] == "Excluir") & df["Lote"].isin(set(ativos) - set(expurgar))]
+        if len(manter) != len(df):
+            save_csv(manter, caminho(LIXEIRA_CSV))
+    resumo = {tabela: len(ids) for tabela, ids in por_tabela.items()}
+    if resumo:
+        registrar_log("Lixeira", "Compactar", detalhe=f"Lotes com mais de {idade_dias} dia(s) removidos: {resumo}", usuario=usuario)
+    return resumo
+
+def aquecer_dependencias():
+    # Importa o leitor de Excel (openpyxl, ~0,2 s) no startup, e não no meio do primeiro upload
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        pass
+
+def ler_planilha(arquivo, nome_arquivo):
+    # `arquivo` pode ser caminho ou objeto de arquivo (upload do Streamlit)
+    if nome_arquivo.lower().endswith(".csv"):
+        return pd.read_csv(arquivo, dtype=str)
+    try:
+        return pd.read_excel(arquivo, dtype=str)
+    except ImportError:
+        raise ErroValidacao("Leitura de Excel requer o pacote openpyxl (pip install openpyxl). Envie um CSV ou instale o pacote.")
+
+def importar_registros(nome, df_upload, usuario, origem=""):
+    """
+    Acrescenta as linhas importadas à tabela (IDs já existentes ou reservados são ignorados).
+    Devolve a quantidade de registros novos.
+    """
+    verificar_permissao(usuario, nome, "importar")
+    _, cols, aba = TABELAS[nome]
+    if nome == "vagas":
+        if set(df_upload.columns) != set(cols) or len(df_upload.columns) != len(cols):
+            raise ErroValidacao(f"Colunas do arquivo devem ser **exatamente**: {cols}")
+    else:
+        missing = [c for c in cols if c not in df_upload.columns]
+        if missing:
+            raise ErroValidacao(f"Colunas faltando: {missing}")
+    df_upload = df_upload[cols].fillna("")
+    df_upload["ID"] = df_upload["ID"].astype(str)
+    # IDs reservados (arquivados, na lixeira ou expurgados; ver next_id) não voltam pela importação
+    numericos = pd.to_numeric(df_upload["ID"], errors="coerce")
+    df_upload = df_upload[~(df_upload["ID"].isin(_ocultos(nome)) | (numericos <= _piso_id(nome)))]
+    if nome in REFERENCIAS:
+        # Linhas importadas trazem só os nomes: a chave sai do cliente / da vaga correspondente
+        df_upload = _preencher_chaves(nome, df_upload.assign(**{REFERENCIAS[nome][0]: ""}), exigir=False)
+
+    # Só o upload é deduplicado: IDs já repetidos na base ficam para o relatório de integridade
+    df_upload = df_upload.drop_duplicates(subset=["ID"], keep="first")
+
+    with transacao(nome):
+        base = carregar_tabela(nome)
+        novos = garantir_versao(df_upload[~df_upload["ID"].isin(base["ID"])].assign(**{COLUNA_VERSAO: ""}))
+        combined = pd.concat([base, novos], ignore_index=True)
+        salvar_tabela(nome, combined)
+    registrar_log(aba, "Importar", detalhe=f"Importação de {nome} via upload ({origem}).", usuario=usuario)
+    return len(combined) - len(base)
+
+# ============================================================
+# Arquivo morto (vagas/candidatos/comercial encerrados)
+# ============================================================
+
+def _ler_ids_arquivados():
+    return _ler_json(caminho(ARQUIVO_IDS_JSON))
+
+def _max_id_arquivado(tabela):
+    return int(_ler_ids_arquivados().get(tabela, 0))
+
+def _datas_br(serie):
+    return pd.to_datetime(serie, format="%d/%m/%Y", errors="coerce")
+
+def _anexar_ao_arquivo(df, tabela, anos):
+    # Um arquivo compactado por tabela/ano: arquivo/<tabela>_<ano>.csv.gz
+    for ano, parte in df.groupby(anos):
+        arquivo_ano = os.path.join(caminho(ARQUIVO_DIR), f"{tabela}_{int(ano)}.csv.gz")
+        if os.path.exists(arquivo_ano):
+            atual = pd.read_csv(arquivo_ano, dtype=str).fillna("")
+            parte = pd.concat([atual, parte], ignore_index=True).drop_duplicates(subset=["ID"], keep="last")
+        # As linhas já saíram (ou vão sair) das tabelas ativas: o arquivo do ano é trocado de forma atômica
+        tmp = f"{arquivo_ano}.tmp"
+        parte.to_csv(tmp, index=False, encoding="utf-8", compression="gzip")
+        os.replace(tmp, arquivo_ano)
+
+def arquivar_registros(idade_dias=ARQUIVO_IDADE_DIAS, usuario="admin"):
+    """
+    Move para o arquivo morto os registros encerrados há mais de `idade_dias`:
+      - Vagas Fechadas/Canceladas (pela Atualização ou, se vazia, Data de Abertura)
+      - Candidatos dessas vagas (pela VagaID)
+      - Registros comerciais em "Negócio Fechado"/"Declinado" (pela Data)
+    """
+    if usuario != "admin":
+        raise ErroPermissao("Somente o admin pode arquivar registros.")
+    os.makedirs(caminho(ARQUIVO_DIR), exist_ok=True)
+    with transacao("vagas", "candidatos", "comercial"):
+        resumo = _arquivar_registros(idade_dias)
+    if any(resumo.values()):
+        registrar_log("Sistema", "Arquivar", detalhe=f"Registros encerrados há mais de {idade_dias} dias arquivados: {resumo}", usuario=usuario)
+    return resumo
+
+def _arquivar_registros(idade_dias):
+    limite = pd.Timestamp(date.today() - timedelta(days=int(idade_dias)))
+    ano_atual = date.today().year
+
+    vagas = carregar_tabela("vagas")
+    candidatos = carregar_tabela("candidatos")
+    comercial = carregar_tabela("comercial")
+
+    abertura = _datas_br(vagas["Data de Abertura"])
+    ultima = _datas_br(vagas["Atualização"]).fillna(abertura)
+    mask_vagas = vagas["Status"].isin(VAGAS_STATUS_FECHADAS) & (ultima <= limite)
+    anos_vagas = abertura.dt.year.fillna(ultima.dt.year).fillna(ano_atual)
+
+    ano_por_vaga = pd.Series(anos_vagas[mask_vagas].to_numpy(), index=vagas.loc[mask_vagas, "ID"].to_numpy())
+    mask_cand = candidatos["VagaID"].isin(ano_por_vaga.index)
+    anos_cand = candidatos["VagaID"].map(ano_por_vaga).fillna(ano_atual)
+
+    data_com = _datas_br(comercial["Data"])
+    mask_com = comercial["Status"].isin(COMERCIAL_STATUS_FECHADOS) & (data_com <= limite)
+    anos_com = data_com.dt.year.fillna(ano_atual)
+
+    resumo = {"vagas": int(mask_vagas.sum()), "candidatos": int(mask_cand.sum()), "comercial": int(mask_com.sum())}
+    if not any(resumo.values()):
+        return resumo
+
+    partes = [
+        (tabela, df, mask, anos) for tabela, df, mask, anos in [
+            ("vagas", vagas, mask_vagas, anos_vagas),
+            ("candidatos", candidatos, mask_cand, anos_cand),
+            ("comercial", comercial, mask_com, anos_com),
+        ] if mask.any()
+    ]
+    # Reserva os IDs arquivados (uma gravação atômica) antes de enxugar qualquer tabela ativa
+    ids = _ler_ids_arquivados()
+    for tabela, df, _, _ in partes:
+        ids[tabela] = max(int(ids.get(tabela, 0)), next_id(df) - 1)
+    _gravar_json(caminho(ARQUIVO_IDS_JSON), ids)
+    for tabela, df, mask, anos in partes:
+        _anexar_ao_arquivo(df[mask], tabela, anos[mask])
+        salvar_tabela(tabela, df[~mask].reset_index(drop=True))
+    return resumo
+
+_cache_arquivados = cache_do_inquilino("arquivados")
+
+def carregar_arquivados(tabela, cols):
+    # Cache invalidado automaticamente quando algum arquivo do ano muda (mtime)
+    caminhos = sorted(glob.glob(os.path.join(caminho(ARQUIVO_DIR), f"{tabela}_*.csv.gz")))
+    assinatura = tuple((p, os.path.getmtime(p)) for p in caminhos)
+    em_cache = _cache_arquivados.get(tabela)
+    if em_cache is not None and em_cache[0] == assinatura:
+        return em_cache[1]
+    partes = [pd.read_csv(p, dtype=str).fillna("") for p in caminhos]
+    df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=cols)
+    for col in cols:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[cols]
+    _cache_arquivados[tabela] = (assinatura, df)
+    _contabilizar(f"arquivo/{tabela}", df)
+    return df
+
+# ============================================================
+# Backup incremental (base compactada + alterações por linha)
+# ============================================================
+# Cada gravação de tabela acrescenta ao delta da base atual só as linhas
+# novas/alteradas (ID + Versao diferentes) e os IDs removidos: um membro
+# gzip a mais no fim do arquivo, sem reler nem regravar o que já existe.
+# A base é uma cópia compactada do CSV, gerada pela tarefa periódica
+# "backup_base" (e na primeira gravação de uma tabela sem backup).
+
+BACKUP_FORMATO_CARIMBO = "%Y%m%d_%H%M%S_%f"
+BACKUP_OPERACOES = ("gravar", "remover")
+
+def _backup_caminho(nome, carimbo, tipo):
+    return os.path.join(caminho(BACKUP_DIR), nome, f"{carimbo}.{tipo}")
+
+def _bases_backup(nome):
+    # Carimbos das bases da tabela, em ordem cronológica
+    return sorted(
+        os.path.basename(p)[:-len(".base.csv.gz")]
+        for p in glob.glob(os.path.join(caminho(BACKUP_DIR), nome, "*.base.csv.gz"))
+    )
+
+def _momento_carimbo(carimbo):
+    return datetime.strptime(carimbo, BACKUP_FORMATO_CARIMBO)
+
+def _gravar_base(nome, df=None):
+    # Chamada sob a trava da tabela. Sem `df`, copia o CSV do disco como está (sem reinterpretar)
+    carimbo = datetime.now().strftime(BACKUP_FORMATO_CARIMBO)
+    destino = _backup_caminho(nome, carimbo, "base.csv.gz")
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.tmp"
+    if df is not None:
+        df.to_csv(tmp, index=False, encoding="utf-8", compression="gzip")
+    else:
+        with open(_csv(nome), "rb") as origem, gzip.open(tmp, "wb") as f:
+            f.write(origem.read())
+    os.replace(tmp, destino)
+    return carimbo
+
+def _diferenca(anterior, df):
+    # Entre duas versões da tabela: linhas novas/alteradas (ID + Versao diferentes) e IDs que saíram
+    chaves_anteriores = pd.Index(anterior["ID"] + "#" + anterior[COLUNA_VERSAO])
+    alteradas = df[~contidos(pd.Index(df["ID"] + "#" + df[COLUNA_VERSAO]), chaves_anteriores)]
+    removidos = anterior.loc[~contidos(pd.Index(anterior["ID"]), pd.Index(df["ID"])), "ID"]
+    return alteradas, removidos
+
+def _anexar_delta(nome, anterior, alteradas, removidos):
+    bases = _bases_backup(nome)
+    carimbo = bases[-1] if bases else _gravar_base(nome, anterior)
+    if alteradas.empty and removidos.empty:
+        return
+    agora = datetime.now().isoformat(timespec="microseconds")
+    linhas = [
+        json.dumps({"em": agora, "op": "gravar", "linha": reg}, ensure_ascii=False)
+        for reg in alteradas.to_dict(orient="records")
+    ] + [
+        json.dumps({"em": agora, "op": "remover", "linha": {"ID": i}}, ensure_ascii=False)
+        for i in removidos
+    ]
+    # "ab" + gzip: cada gravação vira um membro novo no fim do arquivo (gzip lê a sequência inteira)
+    with gzip.open(_backup_caminho(nome, carimbo, "delta.jsonl.gz"), "at", encoding="utf-8") as f:
+        f.write("\n".join(linhas) + "\n")
+
+def gerar_base_backup(usuario="admin"):
+    """
+    Grava uma base nova de cada tabela (cópia compactada do CSV) e remove as cadeias
+    base + delta que só servem para momentos anteriores a BACKUP_RETENCAO_DIAS.
+    Devolve {tabela: carimbo da base}.
+    """
+    if usuario not in ("admin", USUARIO_SISTEMA):
+        raise ErroPermissao("Somente o admin pode gerar backups.")
+    limite = datetime.now() - timedelta(days=BACKUP_RETENCAO_DIAS)
+    resumo = {}
+    for nome in TABELAS:
+        csv_path = _csv(nome)
+        if not os.path.exists(csv_path):
+            continue
+        with trava_arquivo(csv_path):
+            resumo[nome] = _gravar_base(nome)
+        bases = _bases_backup(nome)
+        for carimbo, seguinte in zip(bases, bases[1:]):
+            if _momento_carimbo(seguinte) < limite:
+                for tipo in ("base.csv.gz", "delta.jsonl.gz"):
+                    arquivo = _backup_caminho(nome, carimbo, tipo)
+                    if os.path.exists(arquivo):
+                        os.remove(arquivo)
+    return resumo
+
+def _ler_momento(momento):
+    if isinstance(momento, datetime):
+        return momento
+    valor = pd.to_datetime(str(momento).strip(), dayfirst=True, errors="coerce")
+    if pd.isna(valor):
+        raise ErroValidacao(f"Data/hora inválida: {momento}")
+    return valor.to_pydatetime()
+
+def tabela_em(nome, momento):
+    """
+    Reconstrói a tabela (CSV completo, inclusive registros na lixeira) como estava em
+    `momento` (datetime ou texto "DD/MM/AAAA HH:MM[:SS]"): a última base anterior ao
+    momento mais as alterações registradas até ele.
+    """
+    if nome not in TABELAS:
+        raise ErroValidacao(f"Tabela desconhecida: {nome}")
+    momento = _ler_momento(momento)
+    bases = [c for c in _bases_backup(nome) if _momento_carimbo(c) <= momento]
+    if not bases:
+        raise ErroValidacao(f"Não há backup de {TABELAS[nome][2]} anterior a {momento:%d/%m/%Y %H:%M:%S}.")
+    carimbo = bases[-1]
+    base = pd.read_csv(_backup_caminho(nome, carimbo, "base.csv.gz"), dtype=str).fillna("")
+    ultimas = {}  # ID -> linha mais recente até o momento (None = removido)
+    delta = _backup_caminho(nome, carimbo, "delta.jsonl.gz")
+    if os.path.exists(delta):
+        limite = momento.isoformat(timespec="microseconds")
+        with gzip.open(delta, "rt", encoding="utf-8") as f:
+            for texto in f:
+                reg = json.loads(texto)
+                if reg["em"] > limite:
+                    break
+                ultimas[reg["linha"]["ID"]] = reg["linha"] if reg["op"] == "gravar" else None
+    gravadas = pd.DataFrame([l for l in ultimas.values() if l is not None], dtype=str)
+    df = pd.concat([base[~base["ID"].isin(ultimas)], gravadas], ignore_index=True).fillna("")
+    # Linhas alteradas voltam à posição que tinham na base; as novas vão para o fim
+    ordem = pd.Index(pd.unique(pd.concat([base["ID"], gravadas.get("ID", pd.Series(dtype=str))])))
+    df = df.iloc[np.argsort(ordem.get_indexer(df["ID"]), kind="stable")]
+    df = df.reindex(columns=colunas_arquivo(nome) + [COLUNA_VERSAO], fill_value="").reset_index(drop=True)
+    return normalizar_salarios(df) if nome == "vagas" else df
+
+def listar_backups(nome):
+    """Bases disponíveis da tabela, da mais antiga à mais recente, com o tamanho do delta de cada uma."""
+    if nome not in TABELAS:
+        raise ErroValidacao(f"Tabela desconhecida: {nome}")
+    itens = []
+    for carimbo in _bases_backup(nome):
+        delta = _backup_caminho(nome, carimbo, "delta.jsonl.gz")
+        itens.append({
+            "Base": _momento_carimbo(carimbo).strftime("%d/%m/%Y %H:%M:%S"),
+            "Delta (KB)": round(os.path.getsize(delta) / 1024, 1) if os.path.exists(delta) else 0.0,
+        })
+    return itens
+
+# ============================================================
+# Feed de alterações (CDC para sincronização incremental)
+# ============================================================
+# Cada inclusão, alteração e exclusão em clientes, vagas, candidatos e
+# comercial vira uma linha de alteracoes.jsonl com número de sequência
+# crescente: {"seq", "em", "tabela", "op", "id", "registro"}. As gravações
+# de tabela entram pela mesma diferença do backup (ID + Versao); exclusão
+# e restauração pela lixeira entram como "excluir"/"inserir" no momento em
+# que acontecem (a compactação não repete a exclusão). Registros que vão
+# para o arquivo morto saem do feed como "excluir".
+# O registro é a linha como gravada no CSV (com ClienteID/VagaID e Versao).
+
+ALTERACOES_OPERACOES = ("inserir", "atualizar", "excluir")
+ALTERACOES_FORMATOS = ["jsonl", "csv"]
+ALTERACOES_CSV_COLS = ["Seq", "Em", "Tabela", "Operacao", "ID"]
+
+_cache_seq = cache_do_inquilino("seq")  # "ultima" -> (carimbo de alteracoes.jsonl, última sequência gravada)
+
+def _ler_alteracao(texto):
+    # Linha cortada (queda no meio de uma gravação) é ignorada
+    try:
+        reg = json.loads(texto)
+    except ValueError:
+        return None
+    return reg if isinstance(reg, dict) and "seq" in reg else None
+
+def ultima_sequencia():
+    """Sequência da alteração mais recente (0 sem alterações); lida do fim do arquivo."""
+    carimbo = _carimbo(caminho(ALTERACOES_JSONL))
+    if carimbo is None:
+        return 0
+    em_cache = _cache_seq.get("ultima")
+    if em_cache is not None and em_cache[0] == carimbo:
+        return em_cache[1]
+    seq, tamanho, bloco = 0, carimbo[1], 64 * 1024
+    with open(caminho(ALTERACOES_JSONL), "rb") as f:
+        while True:
+            inicio = max(0, tamanho - bloco)
+            f.seek(inicio)
+            linhas = f.read(tamanho - inicio).split(b"\n")
+            if inicio:
+                linhas = linhas[1:]  # a primeira pode estar pela metade
+            reg = next(filter(None, map(_ler_alteracao, reversed(linhas))), None)
+            if reg is not None or not inicio:
+                seq = reg["seq"] if reg is not None else 0
+                break
+            bloco *= 2
+    _cache_seq["ultima"] = (carimbo, seq)
+    return seq
+
+def _registrar_alteracoes(nome, eventos):
+    # eventos: [(op, ID, registro já em JSON ou None)]. A trava do feed é sempre a última adquirida
+    if not eventos:
+        return
+    agora = datetime.now().isoformat(timespec="microseconds")
+    prefixo = f'"em": "{agora}", "tabela": {json.dumps(nome)}'
+    with trava_arquivo(caminho(ALTERACOES_JSONL)):
+        seq = ultima_sequencia()
+        linhas = []
+        for op, i, registro in eventos:
+            seq += 1
+            linhas.append(f'{{"seq": {seq}, {prefixo}, "op": "{op}", "id": {json.dumps(i, ensure_ascii=False)}, '
+                          f'"registro": {registro or "null"}}}')
+        dados = ("\n".join(linhas) + "\n").encode("utf-8")
+        with open(caminho(ALTERACOES_JSONL), "ab+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    dados = b"\n" + dados
+            f.write(dados)
+        _cache_seq["ultima"] = (_carimbo(caminho(ALTERACOES_JSONL)), seq)
+
+def _registros_json(df):
+    # Uma linha JSON por registro, serializada de uma vez pelo pandas (bem mais rápido que to_dict + dumps)
+    if df.empty:
+        return []
+    return df.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n").split("\n")
+
+def _registrar_linhas(nome, op, df):
+    _registrar_alteracoes(nome, [(op, i, reg) for i, reg in zip(df["ID"], _registros_json(df))])
+
+def _registrar_gravacao(nome, anterior, alteradas, removidos):
+    # Registros na lixeira já saíram do feed na exclusão: nem a compactação nem regravações os repetem
+    ocultos = _ocultos(nome)
+    if ocultos:
+        alteradas = alteradas[~alteradas["ID"].isin(ocultos)]
+        removidos = removidos[~removidos.isin(ocultos)]
+    if alteradas.empty and removidos.empty:
+        return
+    existiam = contidos(pd.Index(alteradas["ID"]), pd.Index(anterior["ID"]))
+    eventos = [
+        ("atualizar" if existia else "inserir", i, reg)
+        for i, existia, reg in zip(alteradas["ID"], existiam, _registros_json(alteradas))
+    ]
+    eventos += [("excluir", i, None) for i in pd.unique(removidos)]
+    _registrar_alteracoes(nome, eventos)
+
+def _posicao_seq(f, tamanho, desde):
+    # Busca binária por posição no arquivo: início da primeira linha com seq > desde
+    def inicio_linha(pos):
+        if pos == 0:
+            return 0
+        f.seek(pos - 1)
+        f.readline()
+        return f.tell()
+
+    def seq_a_partir(pos):
+        f.seek(inicio_linha(pos))
+        while f.tell() < tamanho:
+            texto = f.readline()
+            if f.tell() > tamanho or not texto.endswith(b"\n"):
+                break
+            reg = _ler_alteracao(texto)
+            if reg is not None:
+                return reg["seq"]
+        return None
+
+    baixo, alto = 0, tamanho
+    while baixo < alto:
+        meio = (baixo + alto) // 2
+        seq = seq_a_partir(meio)
+        if seq is None or seq > desde:
+            alto = meio
+        else:
+            baixo = meio + 1
+    return inicio_linha(baixo)
+
+def _ler_alteracoes(desde, tabelas, limite, tamanho):
+    with open(caminho(ALTERACOES_JSONL), "rb") as f:
+        f.seek(_posicao_seq(f, tamanho, desde))
+        enviadas = 0
+        while f.tell() < tamanho:
+            texto = f.readline()
+            if not texto.endswith(b"\n"):
+                break  # gravação em andamento
+            reg = _ler_alteracao(texto)
+            if reg is None or reg["seq"] <= desde or (tabelas and reg["tabela"] not in tabelas):
+                continue
+            yield reg
+            enviadas += 1
+            if limite and enviadas >= limite:
+                break
+
+def _inteiro(valor, campo, minimo=0):
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ErroValidacao(f"{campo.capitalize()} inválido: {valor}")
+    if numero < minimo:
+        raise ErroValidacao(f"{campo.capitalize()} deve ser no mínimo {minimo}.")
+    return numero
+
+def tabelas_alteracoes(usuario, tabelas=None):
+    """Tabelas do feed para o usuário: as pedidas (conferindo o acesso) ou todas as que ele consulta."""
+    if not tabelas:
+        tabelas = [nome for nome in TABELAS if nome in permissoes(usuario)
+                   and (nome != "comercial" or usuario in USUARIOS_COMERCIAL)]
+        if not tabelas:
+            raise ErroPermissao(f"Usuário {usuario} não tem acesso a nenhuma tabela.")
+        return tabelas
+    for nome in tabelas:
+        if nome not in TABELAS:
+            raise ErroValidacao(f"Tabela desconhecida: {nome}")
+        verificar_permissao(usuario, nome, "consultar")
+    return list(tabelas)
+
+def alteracoes_desde(usuario, desde=0, tabelas=None, limite=None):
+    """
+    Alterações com sequência maior que `desde`, em ordem (gerador de dicts com seq, em,
+    tabela, op, id e registro; registro é None em "excluir"). Só das `tabelas`
+    informadas (padrão: as que o usuário consulta) e no máximo `limite` delas.
+    Acha o ponto de partida por busca binária no arquivo, sem ler o que já foi sincronizado.
+    """
+    desde = _inteiro(desde, "desde")
+    limite = _inteiro(limite, "limite", 1) if limite not in (None, "") else None
+    tabelas = set(tabelas_alteracoes(usuario, tabelas))
+    carimbo = _carimbo(caminho(ALTERACOES_JSONL))
+    if carimbo is None:
+        return iter(())
+    return _ler_alteracoes(desde, tabelas if tabelas != set(TABELAS) else None, limite, carimbo[1])
+
+def conferir_formato_alteracoes(formato):
+    formato = str(formato).lower()
+    if formato not in ALTERACOES_FORMATOS:
+        raise ErroValidacao(f"Formato inválido: {formato} (use {', '.join(ALTERACOES_FORMATOS)})")
+    return formato
+
+def exportar_alteracoes(destino, registros, formato="jsonl", tabela=None):
+    """
+    Grava em `destino` (arquivo de texto) as alterações de `registros` (de
+    alteracoes_desde) em JSONL (uma por linha) ou CSV: ALTERACOES_CSV_COLS mais as
+    colunas do registro quando o feed é de uma `tabela` só, senão o registro em JSON
+    na coluna Registro. Devolve (quantidade, última sequência exportada ou None).
+    """
+    formato = conferir_formato_alteracoes(formato)
+    quantidade, ultima = 0, None
+    if formato == "jsonl":
+        for reg in registros:
+            destino.write(json.dumps(reg, ensure_ascii=False) + "\n")
+            quantidade, ultima = quantidade + 1, reg["seq"]
+        return quantidade, ultima
+    colunas = [col for col in colunas_arquivo(tabela) + [COLUNA_VERSAO] if col != "ID"] if tabela else None
+    escritor = csv.writer(destino, lineterminator="\n")
+    escritor.writerow(ALTERACOES_CSV_COLS + (colunas or ["Registro"]))
+    for reg in registros:
+        registro = reg["registro"]
+        if colunas:
+            valores = [(registro or {}).get(col, "") for col in colunas]
+        else:
+            valores = [json.dumps(registro, ensure_ascii=False) if registro is not None else ""]
+        escritor.writerow([reg["seq"], reg["em"], reg["tabela"], reg["op"], reg["id"]] + valores)
+        quantidade, ultima = quantidade + 1, reg["seq"]
+    return quantidade, ultima
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Tarefas em segundo plano
+# ============================================================
+# Importações, exportações e operações pesadas (arquivo morto,
+# compactação da lixeira) rodam num pool de threads do processo, fora da
+# execução do script do usuário. tarefas.csv é o estado compartilhado
+# entre os processos (workers do Streamlit, api.py): cada mudança relê o
+# arquivo sob a trava e só mexe na própria tarefa. O progresso fica em
+# memória no processo que executa. Os arquivos gerados ficam em tarefas/
+# — tudo por inquilino: a tarefa roda no inquilino de quem a submeteu.
+# ============================================================
+
+import csv
+import os
+import threading
+import time
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl  # trava entre processos (Linux/macOS)
+except ImportError:
+    fcntl = None
+
+import integridade
+import relatorios
+import servicos
+from servicos import TABELAS, LOGS_CSV, ErroValidacao, ErroPermissao
+
+TAREFAS_CSV = "tarefas.csv"
+TAREFAS_DIR = "tarefas"
+TAREFAS_COLS = [
+    "ID", "Tipo", "Descricao", "Usuario", "Status", "Progresso", "Mensagem", "Resultado", "Criada", "Concluida",
+    "Processo",
+]
+# Fora dos diretórios de inquilino: valem para a instalação toda
+PROCESSOS_DIR = "processos"        # uma trava por processo vivo (dono das tarefas que executa)
+AGENDADOR_LOCK = "agendador.lock"  # quem segura roda o agendador
+
+STATUS_FILA = "Na fila"
+STATUS_EXECUTANDO = "Executando"
+STATUS_CONCLUIDA = "Concluída"
+STATUS_ERRO = "Erro"
+STATUS_INTERROMPIDA = "Interrompida"
+TAREFAS_STATUS_ATIVOS = [STATUS_FILA, STATUS_EXECUTANDO]
+
+MAX_TAREFAS_SIMULTANEAS = 2
+TAREFAS_RETENCAO_DIAS = 7
+
+# Tarefas automáticas: tipo -> (intervalo em horas, descrição). O agendador confere
+# a cada AGENDADOR_INTERVALO_SEGUNDOS quando cada uma rodou pela última vez
+TAREFAS_PERIODICAS = {
+    "compactar_lixeira": (24, "Compactar lixeira (automático)"),
+    "backup_base": (24, "Backup base das tabelas (automático)"),
+}
+AGENDADOR_INTERVALO_SEGUNDOS = 600
+
+_pool = ThreadPoolExecutor(max_workers=MAX_TAREFAS_SIMULTANEAS, thread_name_prefix="parma-tarefa")
+_trava = threading.Lock()
+_tipos = {}     # Tipo -> função executora
+_PROCESSO = f"{os.getpid()}-{time.time_ns()}"  # dono das tarefas submetidas aqui (pid pode ser reaproveitado)
+_vida = {}      # "trava" -> arquivo travado de PROCESSOS_DIR; "agendador" -> thread; "agendador_trava" -> AGENDADOR_LOCK
+_preparados = set()  # inquilinos já conferidos neste processo (retenção e tarefas interrompidas)
+_progresso = servicos.estado_do_inquilino("tarefas.progresso")  # ID -> {Progresso, Mensagem} das que rodam aqui
+
+# ==============================
+# Persistência
+# ==============================
+
+def _agora():
+    return datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+def _diretorio():
+    diretorio = servicos.caminho(TAREFAS_DIR)
+    os.makedirs(diretorio, exist_ok=True)
+    return diretorio
+
+def _ler():
+    # ID -> registro; sem trava (o arquivo é sempre trocado inteiro, ver _gravar)
+    try:
+        with open(servicos.caminho(TAREFAS_CSV), newline="", encoding="utf-8") as f:
+            return {reg["ID"]: {c: reg.get(c) or "" for c in TAREFAS_COLS} for reg in csv.DictReader(f)}
+    except FileNotFoundError:
+        return {}
+
+def _gravar(registros):
+    tarefas_csv = servicos.caminho(TAREFAS_CSV)
+    tmp = f"{tarefas_csv}.tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=TAREFAS_COLS, lineterminator="\n")
+        escritor.writeheader()
+        escritor.writerows(registros)
+    os.replace(tmp, tarefas_csv)
+
+@contextmanager
+def _alterando():
+    # Ler-alterar-gravar sob a trava do arquivo: as tarefas que outros processos
+    # gravaram no meio-tempo são preservadas e o ID novo não se repete entre eles
+    with servicos.trava_arquivo(servicos.caminho(TAREFAS_CSV)):
+        registros = _ler()
+        yield registros
+        _gravar(registros.values())
+
+def _marcar_vivo():
+    # Trava mantida enquanto o processo vive: quem consegue pegá-la sabe que o dono morreu
+    with _trava:
+        if "trava" in _vida or fcntl is None:
+            return
+        os.makedirs(PROCESSOS_DIR, exist_ok=True)
+        f = open(os.path.join(PROCESSOS_DIR, f"{_PROCESSO}.lock"), "a")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        _vida["trava"] = f
+
+def _processo_vivo(processo):
+    if processo == _PROCESSO:
+        return True
+    if not processo or fcntl is None:
+        return False  # linha antiga ou sem fcntl (um processo só, ver servicos.trava_arquivo)
+    arquivo = os.path.join(PROCESSOS_DIR, f"{processo}.lock")
+    if not os.path.exists(arquivo):
+        return False
+    with open(arquivo, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+    try:
+        os.remove(arquivo)
+    except FileNotFoundError:
+        pass
+    return False
+
+def _conferir():
+    # Remove do histórico (e do disco) o que passou da retenção; tarefas na fila/executando
+    # cujo processo terminou (reinício, queda) não vão mais concluir
+    limite = datetime.now() - timedelta(days=TAREFAS_RETENCAO_DIAS)
+    _diretorio()
+    with _alterando() as registros:
+        for tarefa_id, reg in list(registros.items()):
+            try:
+                criada = datetime.strptime(reg["Criada"], "%d/%m/%Y %H:%M:%S")
+            except ValueError:
+                criada = None
+            if criada is not None and criada < limite:
+                if reg["Resultado"] and os.path.exists(reg["Resultado"]):
+                    os.remove(reg["Resultado"])
+                del registros[tarefa_id]
+            elif reg["Status"] in TAREFAS_STATUS_ATIVOS and not _processo_vivo(reg["Processo"]):
+                reg["Status"] = STATUS_INTERROMPIDA
+                reg["Mensagem"] = "Servidor reiniciado antes da conclusão."
+
+def _conferir_uma_vez():
+    inquilino = servicos.inquilino_atual()
+    with _trava:
+        if inquilino in _preparados:
+            return
+        _preparados.add(inquilino)
+    _conferir()
+
+# ==============================
+# Execução
+# ==============================
+
+def tarefa(tipo):
+    """Registra a função executora de um tipo de tarefa.
+    A função recebe (tarefa_id, usuario, progresso, **params) e devolve (mensagem, caminho_resultado)."""
+    def registrar(func):
+        _tipos[tipo] = func
+        return func
+    return registrar
+
+def _atualizar(tarefa_id, persistir=False, **campos):
+    # O histórico só é gravado nas mudanças de status; o progresso fica em memória
+    with _trava:
+        if campos.get("Status", STATUS_EXECUTANDO) in TAREFAS_STATUS_ATIVOS:
+            _progresso.setdefault(tarefa_id, {}).update(
+                {c: v for c, v in campos.items() if c in ("Progresso", "Mensagem")}
+            )
+        else:
+            _progresso.pop(tarefa_id, None)
+    if persistir:
+        with _alterando() as registros:
+            if tarefa_id in registros:
+                registros[tarefa_id].update(campos)
+
+def _executar(inquilino, tarefa_id, func, usuario, params):
+    with servicos.no_inquilino(inquilino):
+        _executar_no_inquilino(tarefa_id, func, usuario, params)
+
+def _executar_no_inquilino(tarefa_id, func, usuario, params):
+    _atualizar(tarefa_id, persistir=True, Status=STATUS_EXECUTANDO)
+
+    def progresso(percentual, mensagem=""):
+        _atualizar(tarefa_id, Progresso=str(int(percentual)), Mensagem=mensagem)
+
+    try:
+        mensagem, resultado = func(tarefa_id, usuario, progresso, **params)
+        _atualizar(tarefa_id, persistir=True, Status=STATUS_CONCLUIDA, Progresso="100",
+                   Mensagem=mensagem, Resultado=resultado or "", Concluida=_agora())
+    except (ErroValidacao, ErroPermissao) as e:
+        _atualizar(tarefa_id, persistir=True, Status=STATUS_ERRO, Mensagem=str(e), Concluida=_agora())
+    except Exception as e:
+        traceback.print_exc()
+        _atualizar(tarefa_id, persistir=True, Status=STATUS_ERRO, Mensagem=f"Erro inesperado: {e}", Concluida=_agora())
+
+def submeter(tipo, usuario, descricao, **params):
+    """Enfileira uma tarefa e devolve o ID. `params` fica só em memória (pode conter DataFrames)."""
+    func = _tipos[tipo]
+    _marcar_vivo()
+    _conferir_uma_vez()
+    with _alterando() as registros:
+        tarefa_id = str(max((int(i) for i in registros if i.isdigit()), default=0) + 1)
+        registros[tarefa_id] = {
+            "ID": tarefa_id, "Tipo": tipo, "Descricao": descricao, "Usuario": usuario,
+            "Status": STATUS_FILA, "Progresso": "0", "Mensagem": "", "Resultado": "",
+            "Criada": _agora(), "Concluida": "", "Processo": _PROCESSO,
+        }
+    _pool.submit(_executar, servicos.inquilino_atual(), tarefa_id, func, usuario, params)
+    return tarefa_id
+
+def _com_progresso(reg):
+    if reg["Status"] in TAREFAS_STATUS_ATIVOS:
+        with _trava:
+            reg.update(_progresso.get(reg["ID"], {}))
+    return reg
+
+def listar(usuario=None, limite=10):
+    # Mais recentes primeiro; admin (usuario=None) vê todas; limite=None devolve todas
+    _conferir_uma_vez()
+    regs = [_com_progresso(r) for r in _ler().values() if usuario is None or r["Usuario"] == usuario]
+    regs.sort(key=lambda r: int(r["ID"]) if r["ID"].isdigit() else 0, reverse=True)
+    return regs[:limite]
+
+def ativas(usuario=None):
+    return [r for r in listar(usuario, limite=None) if r["Status"] in TAREFAS_STATUS_ATIVOS]
+
+def obter(tarefa_id):
+    reg = _ler().get(str(tarefa_id))
+    return _com_progresso(reg) if reg else None
+
+def caminho_temporario(nome_arquivo):
+    # Arquivo de trabalho (upload recebido / resultado gerado) dentro de tarefas/ do inquilino
+    base = os.path.basename(nome_arquivo)
+    return os.path.join(_diretorio(), f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{base}")
+
+# ============================================================
+# Tipos de tarefa
+# ============================================================
+
+@tarefa("importar")
+def _importar(tarefa_id, usuario, progresso, tabela, caminho, nome_arquivo):
+    try:
+        servicos.verificar_permissao(usuario, tabela, "importar")
+        progresso(10, "Lendo planilha...")
+        df_upload = servicos.ler_planilha(caminho, nome_arquivo)
+        progresso(50, f"Gravando {len(df_upload)} linha(s)...")
+        novos = servicos.importar_registros(tabela, df_upload, usuario, origem=nome_arquivo)
+    finally:
+        if os.path.exists(caminho):
+            os.remove(caminho)
+    progresso(90, "Conferindo a integridade...")
+    problemas = len(integridade.verificar())
+    aviso = f" Atenção: {problemas} problema(s) de integridade (Menu → Integridade dos dados)." if problemas else ""
+    return f"{novos} registro(s) novo(s) importado(s) de {nome_arquivo}.{aviso}", None
+
+@tarefa("exportar_csv")
+def _exportar_csv(tarefa_id, usuario, progresso, df, nome_arquivo):
+    progresso(10, f"Gerando {nome_arquivo} ({len(df)} linhas)...")
+    destino = os.path.join(_diretorio(), f"{tarefa_id}_{os.path.basename(nome_arquivo)}")
+    df.to_csv(destino, index=False, encoding="utf-8")
+    return f"{nome_arquivo} pronto ({len(df)} linhas).", destino
+
+@tarefa("exportar_base")
+def _exportar_base(tarefa_id, usuario, progresso):
+    destino = os.path.join(_diretorio(), f"{tarefa_id}_base_parma_{datetime.now().strftime('%Y%m%d_%H%M')}.zip")
+    arquivos = [servicos.caminho(a) for a in [csv_path for csv_path, _, _ in TABELAS.values()] + [LOGS_CSV, servicos.LIXEIRA_CSV, servicos.LIXEIRA_IDS_JSON]]
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i, csv_path in enumerate(arquivos):
+            progresso(100 * i / len(arquivos), f"Compactando {os.path.basename(csv_path)}...")
+            if os.path.exists(csv_path):
+                # Sob a trava de escrita: o arquivo não muda no meio da cópia
+                with servicos.trava_arquivo(csv_path):
+                    zf.write(csv_path, arcname=os.path.basename(csv_path))
+    return f"Base completa exportada ({len(arquivos)} arquivos).", destino
+
+@tarefa("relatorios_clientes")
+def _relatorios_clientes(tarefa_id, usuario, progresso, clientes_ids, formato, dias):
+    progresso(5, "Separando os dados por cliente...")
+    pacotes = relatorios.preparar_relatorios(usuario, clientes_ids, dias)
+    destino = os.path.join(_diretorio(), f"{tarefa_id}_relatorios_clientes_{datetime.now().strftime('%Y%m%d_%H%M')}.zip")
+    relatorios.gravar_relatorios(destino, pacotes, formato, lambda p, m: progresso(5 + 0.95 * p, m))
+    return f"Relatórios de {len(pacotes)} cliente(s) gerados ({formato.upper()}).", destino
+
+@tarefa("compactar_lixeira")
+def _compactar_lixeira(tarefa_id, usuario, progresso, idade_dias=servicos.LIXEIRA_RETENCAO_DIAS):
+    progresso(10, "Removendo definitivamente os itens antigos da lixeira...")
+    resumo = servicos.compactar_lixeira(idade_dias, usuario)
+    detalhe = ", ".join(f"{nome}: {qtd}" for nome, qtd in resumo.items()) or "nada a remover"
+    return f"Lixeira compactada ({detalhe}).", None
+
+@tarefa("backup_base")
+def _backup_base(tarefa_id, usuario, progresso):
+    progresso(10, "Compactando as tabelas...")
+    resumo = servicos.gerar_base_backup(usuario)
+    return f"Backup base gerado ({', '.join(resumo) or 'nenhuma tabela'}).", None
+
+@tarefa("arquivar")
+def _arquivar(tarefa_id, usuario, progresso, idade_dias):
+    progresso(10, "Separando registros encerrados...")
+    resumo = servicos.arquivar_registros(idade_dias, usuario)
+    return (f"Arquivados — Vagas: {resumo['vagas']}, Candidatos: {resumo['candidatos']}, "
+            f"Comercial: {resumo['comercial']}"), None
+
+# ==============================
+# Agendador das tarefas periódicas
+# ==============================
+
+def _ultima_execucao(registros, tipo):
+    datas = [r["Criada"] for r in registros.values() if r["Tipo"] == tipo]
+    datas = [datetime.strptime(d, "%d/%m/%Y %H:%M:%S") for d in datas if d]
+    return max(datas, default=None)
+
+def _limpar_processos():
+    # Travas de processos que já terminaram (_processo_vivo remove o arquivo)
+    if os.path.isdir(PROCESSOS_DIR):
+        for nome in os.listdir(PROCESSOS_DIR):
+            if nome.endswith(".lock"):
+                _processo_vivo(nome[:-len(".lock")])
+
+def _agendar(inquilino):
+    # Sem "tocar": conferir o horário não conta como uso do inquilino (ver servicos._aplicar_orcamento)
+    with servicos.no_inquilino(inquilino, tocar=False):
+        _conferir()
+        registros = _ler()
+        for tipo, (horas, descricao) in TAREFAS_PERIODICAS.items():
+            ultima = _ultima_execucao(registros, tipo)
+            if ultima is None or datetime.now() - ultima >= timedelta(hours=horas):
+                submeter(tipo, servicos.USUARIO_SISTEMA, descricao)
+
+def _agendador():
+    # Um erro (E/S, linha inválida em tarefas.csv) vai para o log e a volta seguinte tenta de novo:
+    # a thread não pode morrer segurando AGENDADOR_LOCK
+    while True:
+        try:
+            _limpar_processos()
+            inquilinos = servicos.listar_inquilinos()
+        except Exception:
+            traceback.print_exc()
+            inquilinos = []
+        for inquilino in inquilinos:
+            try:
+                _agendar(inquilino)
+            except Exception:
+                traceback.print_exc()
+        time.sleep(AGENDADOR_INTERVALO_SEGUNDOS)
+
+def _eleger_agendador():
+    # Um agendador entre todos os processos: roda quem pega a trava de AGENDADOR_LOCK;
+    # os outros tentam de novo a cada intervalo (assumem quando o dono termina)
+    f = None
+    if fcntl is not None:
+        f = open(AGENDADOR_LOCK, "a")
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(AGENDADOR_INTERVALO_SEGUNDOS)
+        _vida["agendador_trava"] = f
+    try:
+        _agendador()
+    finally:
+        # Se a thread terminar, outro processo assume; aqui iniciar_agendador pode candidatar de novo
+        with _trava:
+            _vida.pop("agendador_trava", None)
+            _vida.pop("agendador", None)
+        if f is not None:
+            f.close()  # fechar libera a trava
+
+def iniciar_agendador():
+    """Candidata este processo a rodar as tarefas periódicas (uma vez por processo; só um processo roda)."""
+    with _trava:
+        if "agendador" in _vida:
+            return
+        _vida["agendador"] = threading.Thread(target=_eleger_agendador, daemon=True, name="parma-agendador")
+        _vida["agendador"].start()
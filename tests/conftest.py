@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Cada teste roda num diretório de dados vazio (os CSVs são relativos ao diretório
+# atual) e com os caches do processo zerados.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import servicos  # noqa: E402
+
+SENHA_ADMIN = servicos.USUARIOS["admin"]["senha"]
+
+def zerar_caches():
+    with servicos._guarda_inquilinos:
+        servicos._inquilinos.clear()
+        servicos._estados.clear()
+
+@pytest.fixture
+def dados(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    zerar_caches()
+    token = servicos._inquilino.set(servicos.INQUILINO_PADRAO)
+    yield tmp_path
+    servicos._inquilino.reset(token)
+    zerar_caches()
+
+def criar_cliente(nome="ACME", **campos):
+    registro = {"Cliente": nome, "Nome": "Contato", "Cidade": "FRANCA", "UF": "SP",
+                "Telefone": "1", "E-mail": "contato@exemplo.com", **campos}
+    return servicos.criar_registros("clientes", [registro], "admin")[0]
+
+def criar_vaga(cliente_id, cargo="Analista", **campos):
+    registro = {"ClienteID": cliente_id, "Cargo": cargo, "Recrutador": "Julia", **campos}
+    return servicos.criar_registros("vagas", [registro], "admin")[0]
+
+def criar_candidato(vaga_id, nome="Maria", **campos):
+    registro = {"VagaID": vaga_id, "Nome": nome, "Telefone": "1", "Recrutador": "Julia", **campos}
+    return servicos.criar_registros("candidatos", [registro], "admin")[0]
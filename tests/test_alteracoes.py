@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Feed de alterações: sequência crescente e leitura paginada a partir de `desde`
+
+import servicos
+from conftest import criar_cliente, criar_vaga
+
+def _seqs(**kwargs):
+    return [a["seq"] for a in servicos.alteracoes_desde("admin", **kwargs)]
+
+def test_paginacao_por_sequencia(dados):
+    ids = [criar_cliente(f"C{i}") for i in range(5)]
+
+    assert servicos.ultima_sequencia() == 5
+    assert _seqs(desde=0, limite=2) == [1, 2]
+    assert _seqs(desde=2, limite=2) == [3, 4]
+    assert _seqs(desde=4, limite=2) == [5]
+    assert _seqs(desde=5) == []
+    assert [a["id"] for a in servicos.alteracoes_desde("admin", desde=0)] == ids
+
+def test_operacoes_e_filtro_por_tabela(dados):
+    cliente_id = criar_cliente()
+    vaga_id = criar_vaga(cliente_id)
+    servicos.atualizar_registros("vagas", [vaga_id], {"Status": "Fechada"}, "admin")
+    servicos.excluir_registros("vagas", [vaga_id], "admin")
+
+    eventos = list(servicos.alteracoes_desde("admin", desde=0, tabelas=["vagas"]))
+
+    assert [(e["op"], e["id"]) for e in eventos] == [("inserir", vaga_id), ("atualizar", vaga_id), ("excluir", vaga_id)]
+    assert eventos[1]["registro"]["Status"] == "Fechada"
+    assert eventos[2]["registro"] is None
+    assert all(a["seq"] > b["seq"] for a, b in zip(eventos[1:], eventos))
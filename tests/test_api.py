@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# API HTTP e linha de comando: autenticação e permissões por tabela
+
+import base64
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import api
+import servicos
+from conftest import SENHA_ADMIN, criar_cliente
+
+SENHA_LORRAYNE = servicos.USUARIOS["lorrayne"]["senha"]
+
+@pytest.fixture
+def servidor(dados):
+    http = ThreadingHTTPServer(("127.0.0.1", 0), api.ApiHandler)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{http.server_address[1]}"
+    http.shutdown()
+    http.server_close()
+
+def _get(url, usuario, senha):
+    login = base64.b64encode(f"{usuario}:{senha}".encode()).decode()
+    try:
+        with urlopen(Request(url, headers={"Authorization": f"Basic {login}"})) as resposta:
+            return resposta.status, json.loads(resposta.read())
+    except HTTPError as e:
+        return e.code, None
+
+def test_listagem_respeita_as_permissoes(servidor):
+    criar_cliente()
+
+    status, corpo = _get(f"{servidor}/tabelas/clientes", "admin", SENHA_ADMIN)
+    assert status == 200 and len(corpo["registros"]) == 1
+    assert _get(f"{servidor}/tabelas/vagas", "lorrayne", SENHA_LORRAYNE)[0] == 200
+    assert _get(f"{servidor}/tabelas/clientes", "lorrayne", SENHA_LORRAYNE)[0] == 403
+    assert _get(f"{servidor}/tabelas/comercial", "lorrayne", SENHA_LORRAYNE)[0] == 403
+    assert _get(f"{servidor}/tabelas/clientes", "admin", "errada")[0] == 401
+
+def _cli(monkeypatch, senha, *argv):
+    monkeypatch.setenv("PARMA_SENHA", senha)
+    return api.main(list(argv))
+
+def test_cli_listar_exige_login_e_permissao(dados, monkeypatch, capsys):
+    criar_cliente()
+
+    assert _cli(monkeypatch, SENHA_ADMIN, "--usuario", "admin", "listar", "clientes") == 0
+    assert [r["Cliente"] for r in json.loads(capsys.readouterr().out)] == ["ACME"]
+    assert _cli(monkeypatch, "errada", "--usuario", "admin", "listar", "clientes") == 1
+    assert _cli(monkeypatch, SENHA_LORRAYNE, "--usuario", "lorrayne", "listar", "clientes") == 1
+    assert "não tem acesso a clientes" in capsys.readouterr().err
+    assert _cli(monkeypatch, SENHA_LORRAYNE, "--usuario", "lorrayne", "listar", "vagas") == 0
+
+def test_cli_escrita_respeita_as_permissoes(dados, monkeypatch, capsys):
+    cliente_id = criar_cliente()
+
+    assert _cli(monkeypatch, SENHA_LORRAYNE, "--usuario", "lorrayne", "excluir", "clientes", "--ids", cliente_id) == 1
+    assert _cli(monkeypatch, SENHA_ADMIN, "--usuario", "admin", "atualizar", "clientes",
+                "--ids", cliente_id, "--campo", "Cidade=BARRETOS") == 0
+    assert servicos.registro_atual("clientes", cliente_id)["Cidade"] == "BARRETOS"
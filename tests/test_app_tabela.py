@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Tabelas de cadastro do app: uma página por vez num único elemento HTML (streamlit.testing)
+
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import servicos
+import tarefas
+from conftest import SENHA_ADMIN
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+LINHAS_POR_PAGINA = 100
+
+@pytest.fixture
+def app(dados, monkeypatch):
+    # Observador e agendador são threads do processo inteiro: ficam fora dos testes
+    monkeypatch.setattr(servicos, "iniciar_observador", lambda: False)
+    monkeypatch.setattr(tarefas, "iniciar_agendador", lambda: None)
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.run()
+    at.text_input[0].input("admin")
+    at.text_input[1].input(SENHA_ADMIN)
+    at.button[0].click().run()
+    assert not at.exception
+    return at
+
+def _criar_clientes(nomes):
+    registros = [{"Cliente": nome, "Nome": "Contato", "Cidade": "FRANCA", "UF": "SP", "Telefone": "1",
+                  "E-mail": "contato@exemplo.com"} for nome in nomes]
+    return servicos.criar_registros("clientes", registros, "admin")
+
+def _tabelas(at):
+    return [m.value for m in at.markdown if "<table" in m.value]
+
+def test_pagina_num_unico_elemento_escapado(app):
+    ids = _criar_clientes(["<b>ACME & Cia</b>"] + [f"Cliente {i}" for i in range(LINHAS_POR_PAGINA)])
+    app.session_state.page = "clientes"
+    app.run()
+    assert not app.exception
+
+    tabelas = _tabelas(app)
+    assert len(tabelas) == 1
+    assert tabelas[0].count("<tr>") == LINHAS_POR_PAGINA + 1  # cabeçalho + uma página
+    assert "&lt;b&gt;ACME &amp; Cia&lt;/b&gt;" in tabelas[0] and "<b>ACME" not in tabelas[0]
+    # Um seletor para a página inteira, em vez de botões por linha
+    opcoes = app.selectbox(key="sel_clientes_df").options
+    assert [o.split(" - ")[0] for o in opcoes] == [str(i) for i in ids[:LINHAS_POR_PAGINA]]
+
+    app.number_input(key="pagina_clientes_df").set_value(2).run()
+    tabela = _tabelas(app)[0]
+    assert tabela.count("<tr>") == 2 and f"Cliente {LINHAS_POR_PAGINA - 1}" in tabela
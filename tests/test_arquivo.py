@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Arquivo morto: registros encerrados saem das tabelas ativas para arquivo/<tabela>_<ano>.csv.gz
+
+import pandas as pd
+import pytest
+
+import servicos
+from conftest import criar_candidato, criar_cliente, criar_vaga
+
+def _arquivar():
+    # idade -1: tudo o que está encerrado entra, independente da data
+    return servicos.arquivar_registros(idade_dias=-1, usuario="admin")
+
+def test_vaga_fechada_e_candidatos_vao_para_o_arquivo(dados):
+    cliente_id = criar_cliente()
+    fechada = criar_vaga(cliente_id)
+    aberta = criar_vaga(cliente_id, cargo="Gerente")
+    candidato_id = criar_candidato(fechada)
+    servicos.atualizar_registros("vagas", [fechada], {"Status": "Fechada"}, "admin")
+
+    assert _arquivar() == {"vagas": 1, "candidatos": 1, "comercial": 0}
+
+    assert servicos.carregar_tabela("vagas")["ID"].tolist() == [aberta]
+    assert servicos.carregar_tabela("candidatos").empty
+    assert servicos.carregar_arquivados("vagas", servicos.VAGAS_COLS)["ID"].tolist() == [fechada]
+    assert servicos.carregar_arquivados("candidatos", servicos.CANDIDATOS_COLS)["ID"].tolist() == [candidato_id]
+
+def test_ids_arquivados_continuam_reservados(dados):
+    cliente_id = criar_cliente()
+    criar_vaga(cliente_id)
+    fechada = criar_vaga(cliente_id, Status="Fechada")
+    _arquivar()
+
+    assert int(criar_vaga(cliente_id)) == int(fechada) + 1
+
+    upload = servicos.carregar_arquivados("vagas", servicos.VAGAS_COLS).assign(Cargo="Reimportada")
+    assert servicos.importar_registros("vagas", upload, "admin") == 0
+    assert "Reimportada" not in servicos.carregar_tabela("vagas")["Cargo"].tolist()
+
+def test_falha_ao_gravar_o_arquivo_nao_perde_registros(dados, monkeypatch):
+    cliente_id = criar_cliente()
+    primeira = criar_vaga(cliente_id, Status="Fechada")
+    _arquivar()
+    segunda = criar_vaga(cliente_id, Status="Cancelada")
+
+    gravar = pd.DataFrame.to_csv
+    def disco_cheio(df, path=None, *args, **kwargs):
+        if kwargs.get("compression") == "gzip":
+            gravar(df, path, *args, **kwargs)
+            raise OSError("No space left on device")
+        return gravar(df, path, *args, **kwargs)
+    with monkeypatch.context() as m, pytest.raises(OSError):
+        m.setattr(pd.DataFrame, "to_csv", disco_cheio)
+        _arquivar()
+
+    # O arquivo do ano continua íntegro e a vaga que não foi arquivada segue ativa
+    assert servicos.carregar_arquivados("vagas", servicos.VAGAS_COLS)["ID"].tolist() == [primeira]
+    assert servicos.carregar_tabela("vagas")["ID"].tolist() == [segunda]
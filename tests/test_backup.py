@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Backup incremental: base + deltas reconstroem a tabela em qualquer momento
+
+import time
+from datetime import datetime
+
+import pytest
+
+import servicos
+from conftest import criar_cliente
+
+def _pausa():
+    # Os deltas têm carimbo em microssegundos; a pausa separa os momentos com folga
+    time.sleep(0.01)
+
+def test_tabela_em_reconstroi_cada_momento(dados):
+    primeiro = criar_cliente("A")
+    _pausa()
+    depois_de_criar = datetime.now()
+    _pausa()
+    servicos.atualizar_registros("clientes", [primeiro], {"Telefone": "2"}, "admin")
+    segundo = criar_cliente("B")
+    _pausa()
+    depois_de_editar = datetime.now()
+
+    antes = servicos.tabela_em("clientes", depois_de_criar)
+    assert list(antes["ID"]) == [primeiro]
+    assert antes.loc[0, "Telefone"] == "1"
+
+    depois = servicos.tabela_em("clientes", depois_de_editar)
+    assert list(depois["ID"]) == [primeiro, segundo]
+    assert depois.loc[0, "Telefone"] == "2"
+
+def test_tabela_em_continua_apos_nova_base(dados):
+    cliente_id = criar_cliente()
+    servicos.gerar_base_backup("admin")
+    servicos.atualizar_registros("clientes", [cliente_id], {"Cidade": "BARRETOS"}, "admin")
+    _pausa()
+
+    atual = servicos.tabela_em("clientes", datetime.now())
+
+    esperado = servicos.load_csv(servicos.CLIENTES_CSV, servicos.CLIENTES_COLS)
+    assert atual[esperado.columns].equals(esperado)
+
+def test_sem_backup_anterior_ao_momento(dados):
+    antes_de_tudo = datetime.now()
+    _pausa()
+    criar_cliente()
+
+    with pytest.raises(servicos.ErroValidacao):
+        servicos.tabela_em("clientes", antes_de_tudo)
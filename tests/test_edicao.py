@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Edição como compare-and-swap sobre a versão da linha (salvar_edicao)
+
+import servicos
+from conftest import criar_cliente
+
+def test_conflito_no_mesmo_campo(dados):
+    cliente_id = criar_cliente()
+    aberto = servicos.registro_atual("clientes", cliente_id)
+    servicos.atualizar_registros("clientes", [cliente_id], {"Telefone": "2"}, "admin")
+
+    status, detalhes = servicos.salvar_edicao("clientes", aberto, {**aberto, "Telefone": "3"}, "admin")
+
+    assert status == "conflito"
+    assert [c["Campo"] for c in detalhes["conflitos"]] == ["Telefone"]
+    assert servicos.registro_atual("clientes", cliente_id)["Telefone"] == "2"
+
+def test_campos_diferentes_sao_mesclados(dados):
+    cliente_id = criar_cliente()
+    aberto = servicos.registro_atual("clientes", cliente_id)
+    servicos.atualizar_registros("clientes", [cliente_id], {"Telefone": "2"}, "admin")
+
+    status, _ = servicos.salvar_edicao("clientes", aberto, {**aberto, "Cidade": "BARRETOS"}, "admin")
+
+    assert status == "ok"
+    atual = servicos.registro_atual("clientes", cliente_id)
+    assert (atual["Telefone"], atual["Cidade"]) == ("2", "BARRETOS")
+
+def test_versao_avanca_a_cada_gravacao(dados):
+    cliente_id = criar_cliente()
+    aberto = servicos.registro_atual("clientes", cliente_id)
+
+    status, gravado = servicos.salvar_edicao("clientes", aberto, {**aberto, "Telefone": "9"}, "admin")
+
+    assert status == "ok"
+    assert gravado[servicos.COLUNA_VERSAO] == servicos.proxima_versao(aberto[servicos.COLUNA_VERSAO])
+    # Quem abriu antes da gravação fica com a versão velha: a mesma edição agora conflita
+    status, _ = servicos.salvar_edicao("clientes", aberto, {**aberto, "Telefone": "8"}, "admin")
+    assert status == "conflito"
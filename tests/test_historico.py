@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# Histórico de status montado de forma incremental a partir de logs.csv
+
+import pandas as pd
+
+import historico
+import servicos
+from conftest import zerar_caches, criar_cliente, criar_vaga
+
+def _mudar_status(vaga_id, status):
+    servicos.atualizar_registros("vagas", [vaga_id], {"Status": status}, "admin")
+
+def test_transicoes_incrementais(dados):
+    vaga_id = criar_vaga(criar_cliente())
+    inicial = servicos.registro_atual("vagas", vaga_id)["Status"]
+    _mudar_status(vaga_id, "Fechada")
+
+    df = historico.atualizar()
+    assert df[["Tabela", "ID", "De", "Para"]].values.tolist() == [["vagas", vaga_id, "", ""], ["vagas", vaga_id, inicial, "Fechada"]]
+
+    _mudar_status(vaga_id, "Cancelada")
+    df = historico.atualizar()
+    assert df["Para"].tolist() == ["", "Fechada", "Cancelada"]
+    # Sem novidades no log, o mesmo resultado (sem reler nada)
+    assert historico.atualizar() is df
+
+def test_historico_relido_depois_de_reiniciar(dados):
+    vaga_id = criar_vaga(criar_cliente())
+    _mudar_status(vaga_id, "Fechada")
+    antes = historico.atualizar()
+
+    zerar_caches()  # como um processo novo: só o que está em disco
+    depois = historico.atualizar()
+
+    assert list(depois.columns) == historico.HISTORICO_COLS
+    pd.testing.assert_frame_equal(depois, antes, check_dtype=False)
+
+    # E continua incremental a partir do ponto de controle gravado
+    _mudar_status(vaga_id, "Cancelada")
+    assert historico.atualizar()["Para"].tolist() == ["", "Fechada", "Cancelada"]
+
+def test_tempos_por_estagio(dados):
+    cliente_id = criar_cliente()
+    fechada, aberta = criar_vaga(cliente_id), criar_vaga(cliente_id, cargo="Gerente")
+    inicial = servicos.registro_atual("vagas", aberta)["Status"]
+    _mudar_status(fechada, "Fechada")
+
+    resumo = historico.tempo_em_estagio("vagas").set_index("Status")
+    assert resumo.loc[inicial, "Passagens"] == 1
+    assert resumo.loc[inicial, "No estágio agora"] == 1
+    assert resumo.loc["Fechada", "No estágio agora"] == 1
+    assert historico.tempo_para_preencher()["ID"].tolist() == [fechada]
+
+def test_tempo_para_preencher_com_ids_repetidos(dados):
+    cliente_id = criar_cliente()
+    vaga_id = criar_vaga(cliente_id)
+    criar_vaga(cliente_id, cargo="Gerente")
+    _mudar_status(vaga_id, "Fechada")
+    df = pd.read_csv(servicos.VAGAS_CSV, dtype=str).fillna("")
+    df["ID"] = vaga_id
+    df.to_csv(servicos.VAGAS_CSV, index=False)
+
+    preencher = historico.tempo_para_preencher()
+
+    assert preencher[["ID", "Cargo"]].values.tolist() == [[vaga_id, "Analista"]]
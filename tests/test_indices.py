@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+# Índices em memória das telas (indices.py): mantidos só com as linhas que mudaram
+
+import pandas as pd
+
+import indices
+import servicos
+from conftest import criar_candidato, criar_cliente, criar_vaga, zerar_caches
+
+def _repetir_primeiro_id(arquivo):
+    # CSV editado à mão: todas as linhas com o ID da primeira (ver integridade.py)
+    df = pd.read_csv(arquivo, dtype=str).fillna("")
+    df["ID"] = df.loc[0, "ID"]
+    df.to_csv(arquivo, index=False)
+
+# ---------- rótulos dos seletores (user-040) ----------
+
+def test_busca_por_prefixo_sem_acentos(dados):
+    sao_joao, santos = criar_cliente("São João Alimentos"), criar_cliente("Santos Transportes")
+    vaga = criar_vaga(sao_joao, cargo="Analista Fiscal")
+    fechada = criar_vaga(santos, cargo="Analista de RH", Status="Fechada")
+
+    assert indices.buscar_rotulos("clientes", "sao jo") == [(sao_joao, f"{sao_joao} - São João Alimentos")]
+    assert [i for i, _ in indices.buscar_rotulos("clientes", "")] == [santos, sao_joao]
+    # Vagas fechadas não recebem candidatos: ficam fora do seletor
+    assert [i for i, _ in indices.buscar_rotulos("vagas_disponiveis", "analista")] == [vaga]
+    assert fechada not in dict(indices.buscar_rotulos("vagas_disponiveis", ""))
+
+def test_rotulos_acompanham_as_alteracoes(dados):
+    cliente_id = criar_cliente("ACME")
+    vaga = criar_vaga(cliente_id)
+    assert indices.buscar_rotulos("vagas_disponiveis", "acme") == [(vaga, f"{vaga} - ACME - Analista")]
+
+    # O nome do cliente chega à vaga pela chave, sem mudar a Versao dela
+    servicos.atualizar_registros("clientes", [cliente_id], {"Cliente": "BETA"}, "admin")
+    servicos.atualizar_registros("vagas", [vaga], {"Cargo": "Gerente"}, "admin")
+
+    assert indices.buscar_rotulos("vagas_disponiveis", "acme") == []
+    assert indices.buscar_rotulos("vagas_disponiveis", "beta ger") == [(vaga, f"{vaga} - BETA - Gerente")]
+
+def test_rotulos_com_ids_repetidos(dados):
+    primeiro = criar_cliente("ACME")
+    criar_cliente("BETA")
+    indices.buscar_rotulos("clientes", "")
+    _repetir_primeiro_id(servicos.CLIENTES_CSV)
+
+    assert indices.buscar_rotulos("clientes", "") == [(primeiro, f"{primeiro} - ACME")]
+    assert indices.buscar_rotulos("clientes", "beta") == []
+
+# ---------- carga por recrutador (user-044) ----------
+
+def _carga():
+    return indices.carga_recrutadores().set_index("Recrutador")
+
+def test_contadores_acompanham_as_gravacoes(dados):
+    cliente_id = criar_cliente()
+    primeira = criar_vaga(cliente_id)
+    segunda = criar_vaga(cliente_id, cargo="Gerente")
+    criar_candidato(primeira)
+
+    carga = _carga()
+    assert (carga.loc["Julia", "Vagas em andamento"], carga.loc["Julia", "Candidatos pendentes"]) == (2, 1)
+
+    servicos.atualizar_registros("vagas", [primeira], {"Status": "Pausada"}, "admin")
+    servicos.atualizar_registros("vagas", [segunda], {"Recrutador": "Leila"}, "admin")
+
+    carga = _carga()
+    assert carga.loc["Julia", "Vagas em andamento"] == 0
+    assert carga.loc["Leila", "Vagas em andamento"] == 1
+    # Quem tem menos carga recebe o próximo item; o peso do item conta antes do seguinte
+    assert indices.sugerir_recrutadores("vagas", 4) == ["Lorrayne", "Kaline", "Nikole", "Julia"]
+
+def test_contadores_com_ids_repetidos(dados):
+    cliente_id = criar_cliente()
+    criar_vaga(cliente_id)
+    criar_vaga(cliente_id, Recrutador="Leila")
+    _carga()
+    _repetir_primeiro_id(servicos.VAGAS_CSV)
+
+    carga = _carga()
+    assert carga["Vagas em andamento"].sum() == 1
+    # Igual a uma contagem feita do zero (como num processo novo)
+    zerar_caches()
+    pd.testing.assert_frame_equal(_carga(), carga)
+
+# ---------- vagas paradas (user-046) ----------
+
+def _vaga_desde(cliente_id, data, **campos):
+    return criar_vaga(cliente_id, **{"Data de Abertura": data, **campos})
+
+def test_vagas_paradas_ordenadas_pela_ultima_movimentacao(dados):
+    cliente_id = criar_cliente()
+    antiga = _vaga_desde(cliente_id, "01/01/2020")
+    recente = _vaga_desde(cliente_id, "01/01/2024")
+    _vaga_desde(cliente_id, "01/01/2019", Status="Fechada")
+
+    paradas, total = indices.vagas_paradas(dias=30)
+    assert total == indices.contar_vagas_paradas(30) == 2
+    assert paradas["ID"].tolist() == [antiga, recente]
+    assert paradas["Última movimentação"].tolist() == ["01/01/2020", "01/01/2024"]
+
+    # Candidato novo marca a Atualização da vaga com hoje: ela sai da lista de paradas
+    criar_candidato(antiga)
+    assert indices.vagas_paradas(dias=30)[0]["ID"].tolist() == [recente]
+    nenhuma, total = indices.vagas_paradas(dias=30, limite=0)
+    assert (nenhuma.empty, total, indices.contar_vagas_paradas(30)) == (True, 1, 1)
+
+def test_vagas_paradas_com_ids_repetidos(dados):
+    cliente_id = criar_cliente()
+    _vaga_desde(cliente_id, "01/01/2020")
+    segunda = _vaga_desde(cliente_id, "01/01/2021")
+    # Versao diferente: a linha repetida não tem a mesma chave da primeira
+    servicos.atualizar_registros("vagas", [segunda], {"Cargo": "Gerente"}, "admin")
+    indices.vagas_paradas(dias=30)
+    _repetir_primeiro_id(servicos.VAGAS_CSV)
+
+    # Vale a primeira linha do ID, como nas outras leituras por ID
+    paradas, total = indices.vagas_paradas(dias=30)
+    assert (paradas["ID"].tolist(), paradas["Última movimentação"].tolist(), total) == (["1"], ["01/01/2020"], 1)
+    # Voltar aos IDs únicos não deixa item antigo para trás na lista ordenada
+    df = pd.read_csv(servicos.VAGAS_CSV, dtype=str).fillna("")
+    df.loc[1, "ID"] = "2"
+    df.to_csv(servicos.VAGAS_CSV, index=False)
+    assert indices.vagas_paradas(dias=30)[1] == 2
+    zerar_caches()
+    assert indices.vagas_paradas(dias=30)[1] == 2
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Inquilinos: dados, caches e acesso separados por empresa/unidade
+
+import json
+import os
+
+import pytest
+
+import servicos
+from conftest import SENHA_ADMIN, criar_cliente
+
+@pytest.fixture
+def inquilinos(dados):
+    for nome, usuarios in [("a", ["admin"]), ("b", ["andre"])]:
+        os.makedirs(os.path.join(servicos.INQUILINOS_DIR, nome))
+        with open(os.path.join(servicos.INQUILINOS_DIR, nome, servicos.INQUILINO_USUARIOS_JSON), "w") as f:
+            json.dump({"usuarios": usuarios}, f)
+    return dados
+
+def test_dados_separados(inquilinos):
+    with servicos.no_inquilino("a"):
+        cliente_id = criar_cliente("SÓ NO A")
+    with servicos.no_inquilino("b"):
+        assert servicos.carregar_tabela("clientes").empty
+        assert servicos.ultima_sequencia() == 0
+        # Cada inquilino numera os seus registros
+        assert criar_cliente("SÓ NO B") == cliente_id
+    with servicos.no_inquilino("a"):
+        assert servicos.carregar_tabela("clientes")["Cliente"].tolist() == ["SÓ NO A"]
+
+    caminho_a = os.path.join(servicos.INQUILINOS_DIR, "a", servicos.CLIENTES_CSV)
+    assert os.path.exists(caminho_a)
+    assert not os.path.exists(servicos.CLIENTES_CSV)
+
+def test_usuario_so_entra_nos_inquilinos_liberados(inquilinos):
+    senha_andre = servicos.USUARIOS["andre"]["senha"]
+    assert servicos.autenticar("admin", SENHA_ADMIN, "a")
+    assert not servicos.autenticar("admin", SENHA_ADMIN, "b")
+    assert servicos.autenticar("andre", senha_andre, "b")
+    assert not servicos.autenticar("admin", SENHA_ADMIN, servicos.INQUILINO_PADRAO)
+    assert not servicos.autenticar("admin", SENHA_ADMIN, "../a")
+
+def test_inquilino_desconhecido(inquilinos):
+    assert servicos.listar_inquilinos() == ["a", "b"]
+    with pytest.raises(servicos.ErroValidacao):
+        servicos.usar_inquilino("c")
+    with pytest.raises(servicos.ErroValidacao):
+        servicos.usar_inquilino("")
+
+def test_instalacao_de_um_so_inquilino(dados):
+    assert servicos.listar_inquilinos() == [servicos.INQUILINO_PADRAO]
+    assert servicos.autenticar("andre", servicos.USUARIOS["andre"]["senha"])
+
+def test_cache_descartado_acima_do_orcamento(inquilinos, monkeypatch):
+    monkeypatch.setattr(servicos, "CACHE_ORCAMENTO_MB", 0)
+    with servicos.no_inquilino("a"):
+        criar_cliente()
+        servicos.carregar_tabela("clientes")
+    with servicos.no_inquilino("b"):
+        servicos.carregar_tabela("clientes")
+        # O atual nunca sai; o outro é descartado e relido do disco no próximo uso
+        assert list(servicos.estatisticas_cache()) == ["b"]
+    with servicos.no_inquilino("a"):
+        assert len(servicos.carregar_tabela("clientes")) == 1
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Relatório de integridade e correções em lote
+
+import pandas as pd
+
+import integridade
+import servicos
+from conftest import criar_cliente, criar_vaga
+
+def _editar_csv(arquivo, alterar):
+    # Simula um CSV editado à mão (fora das regras de servicos.py)
+    df = pd.read_csv(arquivo, dtype=str).fillna("")
+    alterar(df)
+    df.to_csv(arquivo, index=False)
+
+def test_id_repetido_e_renumerado(dados):
+    primeiro = criar_cliente("A")
+    criar_cliente("B")
+    _editar_csv(servicos.CLIENTES_CSV, lambda df: df.__setitem__("ID", primeiro))
+
+    relatorio = integridade.verificar()
+    assert relatorio[["Tabela", "ID", "Problema"]].values.tolist() == [["clientes", primeiro, integridade.PROBLEMA_ID_REPETIDO]]
+
+    assert integridade.corrigir(integridade.CORRECAO_RENUMERAR, "admin") == {"clientes": 1}
+    assert integridade.verificar().empty
+    clientes = servicos.carregar_tabela("clientes")
+    assert clientes["ID"].is_unique and list(clientes["Cliente"]) == ["A", "B"]
+
+def test_vaga_orfa_vai_para_a_lixeira(dados):
+    cliente_id = criar_cliente("A")
+    vaga_id = criar_vaga(cliente_id)
+
+    def orfa(df):
+        df.loc[df["ID"] == vaga_id, ["ClienteID", "Cliente"]] = ["999", "SEM CADASTRO"]
+    _editar_csv(servicos.VAGAS_CSV, orfa)
+
+    relatorio = integridade.verificar()
+    assert relatorio[["ID", "Correção"]].values.tolist() == [[vaga_id, integridade.CORRECAO_EXCLUIR]]
+
+    assert integridade.corrigir(integridade.CORRECAO_EXCLUIR, "admin") == {"vagas": 1}
+    assert servicos.carregar_tabela("vagas").empty
+    assert integridade.verificar().empty
+
+def test_vaga_religada_pelo_nome(dados):
+    cliente_id = criar_cliente("A")
+    vaga_id = criar_vaga(cliente_id)
+    _editar_csv(servicos.VAGAS_CSV, lambda df: df.__setitem__("ClienteID", ""))
+
+    assert integridade.verificar()["Correção"].tolist() == [integridade.CORRECAO_RELIGAR]
+
+    assert integridade.corrigir(integridade.CORRECAO_RELIGAR, "admin") == {"vagas": 1}
+    assert servicos.registro_atual("vagas", vaga_id)["ClienteID"] == cliente_id
+    assert integridade.verificar().empty
+
+def test_importacao_preserva_ids_ja_repetidos(dados):
+    primeiro = criar_cliente("A")
+    criar_cliente("B")
+    _editar_csv(servicos.CLIENTES_CSV, lambda df: df.__setitem__("ID", primeiro))
+    upload = pd.DataFrame([{c: "x" for c in servicos.CLIENTES_COLS} | {"ID": "50"}] * 2)
+
+    assert servicos.importar_registros("clientes", upload, "admin") == 1
+    assert servicos.carregar_tabela("clientes")["ID"].tolist() == [primeiro, primeiro, "50"]
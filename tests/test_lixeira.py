@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Exclusão lógica, restauração e compactação da lixeira
+
+import servicos
+from conftest import criar_cliente, criar_vaga
+
+def test_exclusao_em_cascata_e_restauracao(dados):
+    cliente_id = criar_cliente()
+    vaga_id = criar_vaga(cliente_id)
+
+    resultado = servicos.excluir_registros("clientes", [cliente_id], "admin")
+
+    assert resultado["removidos"] == {"clientes": [cliente_id], "vagas": [vaga_id]}
+    assert servicos.carregar_tabela("clientes").empty
+    assert servicos.carregar_tabela("vagas").empty
+    # Exclusão lógica: as linhas continuam no CSV até a compactação
+    assert cliente_id in set(servicos.load_csv(servicos.CLIENTES_CSV, servicos.CLIENTES_COLS)["ID"])
+
+    restaurados = servicos.restaurar_lote(resultado["lote"], "admin")
+
+    assert restaurados == {"clientes": [cliente_id], "vagas": [vaga_id]}
+    assert list(servicos.carregar_tabela("clientes")["ID"]) == [cliente_id]
+    assert list(servicos.carregar_tabela("vagas")["ID"]) == [vaga_id]
+
+def test_ids_na_lixeira_continuam_reservados(dados):
+    criar_cliente("A")
+    segundo = criar_cliente("B")
+    servicos.excluir_registros("clientes", [segundo], "admin")
+
+    assert int(criar_cliente("C")) == int(segundo) + 1
+
+def test_compactacao_expurga_e_mantem_ids_reservados(dados):
+    criar_cliente("A")
+    segundo = criar_cliente("B")
+    servicos.excluir_registros("clientes", [segundo], "admin")
+
+    assert servicos.compactar_lixeira(idade_dias=-1, usuario="admin") == {"clientes": 1}
+
+    no_arquivo = servicos.load_csv(servicos.CLIENTES_CSV, servicos.CLIENTES_COLS)
+    assert segundo not in set(no_arquivo["ID"])
+    assert int(criar_cliente("C")) == int(segundo) + 1
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Tarefas em segundo plano: execução, estado em tarefas.csv e agendador
+
+import csv
+import fcntl
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import servicos
+import tarefas
+
+class _Parar(BaseException):
+    """Interrompe o laço do agendador no teste (como o fim do processo)."""
+
+@pytest.fixture
+def tipos(dados, monkeypatch):
+    monkeypatch.setattr(tarefas, "_preparados", set())
+
+    def ok(tarefa_id, usuario, progresso, valor):
+        progresso(50, "metade")
+        return f"feito {valor}", ""
+
+    def invalida(tarefa_id, usuario, progresso):
+        raise servicos.ErroValidacao("planilha sem colunas")
+
+    monkeypatch.setitem(tarefas._tipos, "teste_ok", ok)
+    monkeypatch.setitem(tarefas._tipos, "teste_invalida", invalida)
+    yield
+    # Nada pode continuar gravando depois que o diretório temporário sair de cena
+    _esperar(*[r["ID"] for r in tarefas.ativas()])
+
+def _esperar(*ids, prazo=10):
+    fim = time.monotonic() + prazo
+    while any(tarefas.obter(i)["Status"] in tarefas.TAREFAS_STATUS_ATIVOS for i in ids):
+        assert time.monotonic() < fim, "tarefa não terminou"
+        time.sleep(0.01)
+    return [tarefas.obter(i) for i in ids]
+
+def test_tarefa_conclui_ou_registra_o_erro(tipos):
+    ok = tarefas.submeter("teste_ok", "admin", "Ok", valor=3)
+    invalida = tarefas.submeter("teste_invalida", "admin", "Inválida")
+
+    concluida, erro = _esperar(ok, invalida)
+
+    assert (concluida["Status"], concluida["Progresso"], concluida["Mensagem"]) == (tarefas.STATUS_CONCLUIDA, "100", "feito 3")
+    assert (erro["Status"], erro["Mensagem"]) == (tarefas.STATUS_ERRO, "planilha sem colunas")
+    assert [r["ID"] for r in tarefas.listar("admin")] == [invalida, ok]
+
+def test_tarefa_de_processo_encerrado_fica_interrompida(tipos):
+    registro = {c: "" for c in tarefas.TAREFAS_COLS}
+    registro.update(ID="7", Tipo="teste_ok", Usuario="admin", Status=tarefas.STATUS_EXECUTANDO,
+                    Criada=tarefas._agora(), Processo="1-encerrado")
+    with open(tarefas.TAREFAS_CSV, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=tarefas.TAREFAS_COLS)
+        escritor.writeheader()
+        escritor.writerow(registro)
+
+    assert tarefas.obter("7")["Status"] == tarefas.STATUS_EXECUTANDO
+    tarefas.listar()
+    assert tarefas.obter("7")["Status"] == tarefas.STATUS_INTERROMPIDA
+    # O próximo ID continua depois dos que já estão no arquivo
+    assert _esperar(tarefas.submeter("teste_ok", "admin", "Ok", valor=1))[0]["ID"] == "8"
+
+def test_agendador_sobrevive_a_erros_e_libera_a_trava(tipos, monkeypatch):
+    monkeypatch.setattr(tarefas, "TAREFAS_PERIODICAS", {"teste_ok": (24, "Periódica")})
+    monkeypatch.setattr(tarefas.servicos, "USUARIO_SISTEMA", "admin")
+    conferir, voltas = tarefas._conferir, []
+
+    def conferir_falha_na_primeira():
+        voltas.append(1)
+        if len(voltas) == 1:
+            raise OSError("disco indisponível")
+        conferir()
+
+    def dormir(segundos):
+        if len(voltas) >= 2:
+            raise _Parar()
+
+    monkeypatch.setattr(tarefas, "_conferir", conferir_falha_na_primeira)
+    monkeypatch.setattr(tarefas, "_vida", {})
+
+    with monkeypatch.context() as m, pytest.raises(_Parar):
+        m.setattr(tarefas, "time", SimpleNamespace(sleep=dormir))
+        tarefas._eleger_agendador()
+
+    # A segunda volta enfileirou a tarefa periódica mesmo após o erro da primeira
+    periodicas = [r for r in tarefas.listar(limite=None) if r["Tipo"] == "teste_ok"]
+    assert [r["Descricao"] for r in periodicas] == ["Periódica"]
+    _esperar(periodicas[0]["ID"])
+    # Ao terminar, a thread devolve AGENDADOR_LOCK: outro processo pode assumir
+    with open(tarefas.AGENDADOR_LOCK, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    assert "agendador_trava" not in tarefas._vida
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Visões salvas: resultado em cache atualizado só com as linhas que mudaram
+
+import servicos
+import visoes
+from conftest import criar_cliente, criar_vaga
+
+def _completo(tabela, filtros):
+    return set(visoes.filtrar(tabela, servicos.carregar_tabela(tabela), filtros)["ID"])
+
+def test_resultado_incremental_igual_ao_completo(dados):
+    acme, beta = criar_cliente("ACME"), criar_cliente("BETA")
+    vagas = [criar_vaga(acme), criar_vaga(acme, cargo="Gerente"), criar_vaga(beta)]
+    filtros = {"Cliente": "ACME", "Status": "Aberta"}
+    visoes.salvar("admin", "vagas", "ACME abertas", filtros)
+    assert visoes.ids("admin", "vagas", "ACME abertas") == set(vagas[:2])
+
+    passos = [
+        lambda: servicos.atualizar_registros("vagas", [vagas[0]], {"Status": "Pausada"}, "admin"),
+        lambda: criar_vaga(acme, cargo="Diretor"),
+        lambda: servicos.excluir_registros("vagas", [vagas[1]], "admin"),
+        # Renomear o cliente muda o nome resolvido nas vagas sem mudar a Versao delas
+        lambda: servicos.atualizar_registros("clientes", [beta], {"Cliente": "ACME"}, "admin"),
+    ]
+    for passo in passos:
+        passo()
+        assert visoes.ids("admin", "vagas", "ACME abertas") == _completo("vagas", filtros)
+
+    assert visoes.abrir("admin", "vagas", "ACME abertas")["ID"].tolist() == sorted(_completo("vagas", filtros), key=int)
+
+def test_chaves_montadas_uma_vez_por_versao(dados, monkeypatch):
+    cliente_id = criar_cliente()
+    vaga_id = criar_vaga(cliente_id)
+    visoes.salvar("admin", "vagas", "Abertas", {"Status": "Aberta"})
+    visoes.salvar("admin", "vagas", "Pausadas", {"Status": "Pausada"})
+    visoes.ids("admin", "vagas", "Abertas")
+    visoes.ids("admin", "vagas", "Pausadas")
+
+    montagens = []
+    chaves = visoes._chaves
+    monkeypatch.setattr(visoes, "_chaves", lambda tabela, df: montagens.append(len(df)) or chaves(tabela, df))
+    servicos.atualizar_registros("vagas", [vaga_id], {"Status": "Pausada"}, "admin")
+
+    assert visoes.ids("admin", "vagas", "Abertas") == set()
+    assert visoes.ids("admin", "vagas", "Pausadas") == {vaga_id}
+    # Só a versão nova: as chaves da anterior vêm do cache, e a diferença é a mesma para as duas visões
+    assert montagens == [1]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# ============================================================
+# Parma Consultoria - Visões salvas (filtros nomeados por usuário)
+# ============================================================
+# Cada visão guarda os filtros de uma tela (ex.: "Minhas vagas
+# abertas" = Recrutador + Status) em visoes.csv. Os IDs que atendem a
+# cada visão ficam em cache no processo e são atualizados de forma
+# incremental: quando a tabela muda, só as linhas novas ou alteradas
+# (ID + Versao, ou o nome vindo do cliente/da vaga, diferentes) são
+# reavaliadas. As chaves de cada versão da tabela são montadas uma vez, e a
+# diferença entre duas versões é calculada uma vez para todas as visões.
+# Abrir uma visão é uma busca pelo índice de IDs, sem refazer a cadeia de
+# filtros.
+# ============================================================
+
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+import servicos
+from servicos import COLUNA_VERSAO, REFERENCIAS, TABELAS, ErroValidacao, contidos
+
+VISOES_CSV = "visoes.csv"
+VISOES_COLS = ["Usuario", "Tabela", "Nome", "Filtros", "Criada"]
+TODOS = "(todos)"
+
+# Colunas filtradas por "contém" (busca de texto, sem diferenciar maiúsculas); as demais por igualdade
+COLUNAS_BUSCA = {"comercial": ["Empresa", "Cidade"]}
+
+_trava = threading.Lock()
+_definicoes = servicos.cache_do_inquilino("visoes.definicoes")  # "carimbo" -> (carimbo de visoes.csv, {(usuario, tabela, nome): (filtros, criada)})
+_resultados = servicos.cache_do_inquilino("visoes.resultados")  # (usuario, tabela, nome) -> (versão de _indice, filtros, set de IDs)
+_indices = servicos.cache_do_inquilino("visoes.indices")        # tabela -> versão atual: (tabela de origem, índice de IDs, índice de _chaves)
+_mudancas = servicos.cache_do_inquilino("visoes.mudancas")      # tabela -> (versão anterior, versão atual, linhas que mudaram, IDs que saíram)
+
+# ==============================
+# Filtros
+# ==============================
+
+def filtrar(nome, df, filtros):
+    """Aplica os filtros de uma visão (mesma regra das telas: "(todos)" e vazio não filtram)."""
+    busca = COLUNAS_BUSCA.get(nome, [])
+    for col, valor in filtros.items():
+        if valor in ("", TODOS, None):
+            continue
+        if col in busca:
+            df = df[df[col].str.contains(valor, case=False, na=False)]
+        else:
+            df = df[df[col] == valor]
+    return df
+
+# ==============================
+# Persistência das definições
+# ==============================
+
+def _carimbo():
+    try:
+        info = os.stat(servicos.caminho(VISOES_CSV))
+        return (info.st_mtime_ns, info.st_size, info.st_ino)
+    except FileNotFoundError:
+        return None
+
+def _todas():
+    # {(usuario, tabela, nome): (filtros, criada)}, relido só quando visoes.csv muda
+    carimbo = _carimbo()
+    em_cache = _definicoes.get("carimbo")
+    if em_cache is not None and em_cache[0] == carimbo:
+        return em_cache[1]
+    df = servicos.load_csv(servicos.caminho(VISOES_CSV), VISOES_COLS)
+    visoes = {
+        (r["Usuario"], r["Tabela"], r["Nome"]): (json.loads(r["Filtros"] or "{}"), r["Criada"])
+        for r in df.to_dict(orient="records")
+    }
+    _definicoes["carimbo"] = (carimbo, visoes)
+    return visoes
+
+def _regravar(alterar):
+    # Relê do disco sob a trava (outro processo pode ter gravado), aplica a alteração e grava
+    visoes_csv = servicos.caminho(VISOES_CSV)
+    with servicos.trava_arquivo(visoes_csv):
+        _definicoes.clear()
+        visoes = dict(_todas())
+        alterar(visoes)
+        linhas = [
+            {"Usuario": u, "Tabela": t, "Nome": n, "Filtros": json.dumps(f, ensure_ascii=False), "Criada": criada}
+            for (u, t, n), (f, criada) in visoes.items()
+        ]
+        servicos.save_csv(pd.DataFrame(linhas, columns=VISOES_COLS), visoes_csv)
+
+def listar(usuario, tabela):
+    """Visões do usuário para a tabela: {nome: filtros}, em ordem alfabética."""
+    return {n: f for (u, t, n), (f, _) in sorted(_todas().items()) if u == usuario and t == tabela}
+
+def salvar(usuario, tabela, nome, filtros):
+    """Cria (ou substitui) a visão `nome` do usuário com os filtros atuais da tela."""
+    nome = (nome or "").strip()
+    if not nome:
+        raise ErroValidacao("Dê um nome para a visão.")
+    servicos.verificar_permissao(usuario, tabela, "consultar")
+    desconhecidas = sorted(set(filtros) - set(TABELAS[tabela][1]))
+    if desconhecidas:
+        raise ErroValidacao(f"Colunas desconhecidas para {tabela}: {desconhecidas}")
+    filtros = {c: str(v) for c, v in filtros.items() if v not in ("", TODOS, None)}
+    chave = (usuario, tabela, nome)
+
+    def alterar(visoes):
+        criada = visoes.get(chave, (None, datetime.now().strftime("%d/%m/%Y %H:%M:%S")))[1]
+        visoes[chave] = (filtros, criada)
+
+    _regravar(alterar)
+    _resultados.pop(chave, None)
+
+def excluir(usuario, tabela, nome):
+    chave = (usuario, tabela, nome)
+    _regravar(lambda visoes: visoes.pop(chave, None))
+    _resultados.pop(chave, None)
+
+# ==============================
+# Resultado em cache (incremental)
+# ==============================
+
+def _chaves(tabela, df):
+    # Toda alteração de linha incrementa a Versao; os nomes preenchidos pela chave (Cliente da
+    # vaga, Cliente/Cargo do candidato) mudam sem mudar a Versao e por isso entram na chave
+    chaves = df["ID"] + "#" + df[COLUNA_VERSAO]
+    for col in REFERENCIAS.get(tabela, (None, None, {}))[2]:
+        chaves = chaves + "#" + df[col]
+    return chaves
+
+def _indice(tabela, df):
+    # Por versão da tabela: índice de IDs e das chaves (_chaves) de cada linha. Os resultados
+    # guardam a versão de que partiram, então as chaves anteriores nunca são remontadas
+    em_cache = _indices.get(tabela)
+    if em_cache is not None and em_cache[0] is df:
+        return em_cache
+    versao = (df, pd.Index(df["ID"]), pd.Index(_chaves(tabela, df)))
+    _indices[tabela] = versao
+    return versao
+
+def _diferenca(tabela, anterior, atual):
+    # Linhas novas/alteradas e IDs que saíram entre duas versões; com várias visões da
+    # mesma tabela, a comparação é feita uma vez por versão
+    em_cache = _mudancas.get(tabela)
+    if em_cache is not None and em_cache[0] is anterior and em_cache[1] is atual:
+        return em_cache[2], em_cache[3]
+    df, indice, chaves = atual
+    _, indice_anterior, chaves_anteriores = anterior
+    mudaram = df[~contidos(chaves, chaves_anteriores)]
+    sairam = set(indice_anterior[~contidos(indice_anterior, indice)])
+    _mudancas[tabela] = (anterior, atual, mudaram, sairam)
+    return mudaram, sairam
+
+def ids(usuario, tabela, nome):
+    """IDs que atendem à visão, atualizados só com as linhas que mudaram desde a última consulta."""
+    definicao = _todas().get((usuario, tabela, nome))
+    if definicao is None:
+        raise ErroValidacao(f"Visão não encontrada: {nome}")
+    filtros = definicao[0]
+    df = servicos.carregar_tabela(tabela)
+    chave = (usuario, tabela, nome)
+    with _trava:
+        versao = _indice(tabela, df)
+        em_cache = _resultados.get(chave)
+        if em_cache is not None and em_cache[0] is versao and em_cache[1] == filtros:
+            return em_cache[2]
+        if em_cache is None or em_cache[1] != filtros:
+            resultado = set(filtrar(tabela, df, filtros)["ID"])
+        else:
+            anterior, _, resultado = em_cache
+            mudaram, sairam = _diferenca(tabela, anterior, versao)
+            resultado = (resultado - sairam - set(mudaram["ID"])) | set(filtrar(tabela, mudaram, filtros)["ID"])
+        _resultados[chave] = (versao, filtros, resultado)
+        return resultado
+
+def abrir(usuario, tabela, nome):
+    """Linhas da visão, na ordem da tabela, buscadas pelo índice de IDs."""
+    df = servicos.carregar_tabela(tabela)
+    selecionados = ids(usuario, tabela, nome)
+    _, indice, _ = _indice(tabela, df)
+    # Tabela hash dos IDs selecionados: vale também com IDs repetidos na tabela (ver integridade.py)
+    return df[contidos(indice, pd.Index(list(selecionados), dtype=str))]